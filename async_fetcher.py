@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator
+
+import requests
+
+import fetcher
+from logger import get_logger
+
+log = get_logger(__name__)
+
+
+
+class TokenBucket:
+    """
+    Shared asyncio rate limiter. Tokens refill at `rate` per second up to
+    `capacity`; each request takes one. rate <= 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate     = rate
+        self.capacity = max(1, capacity)
+        self._tokens  = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock    = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens  = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+def _bucket_from_config(config: dict) -> TokenBucket:
+    rate_limit = config["rate_limit"]
+    rate = 1.0 / rate_limit if rate_limit > 0 else 0.0
+    # Start with a single token so the first burst is no faster than the
+    # sequential engine; after that the refill rate is what bounds us.
+    return TokenBucket(rate, capacity=1)
+
+
+
+async def aiter_raw_pages(
+    session: requests.Session,
+    config: dict,
+    failed: list[tuple[int, int]] | None = None,
+    stop: threading.Event | None = None,
+) -> AsyncIterator[tuple[list[dict], int, int]]:
+
+    limit       = config["limit"]
+    page_size   = config["page_size"]
+    timeout     = config["timeout"]
+    retries     = config["retries"]
+    concurrency = max(1, config["concurrency"])
+    first       = config.get("start_offset", 0)
+    api_url     = config.get("base_url", fetcher.BASE_URL) + fetcher.API_PATH
+
+    loop      = asyncio.get_running_loop()
+    bucket    = _bucket_from_config(config)
+    envelopes = fetcher.EnvelopeBuilder()
+    tuner     = fetcher.PageSizeTuner() if config.get("auto_page_size") else None
+    policy    = fetcher.policy_from_config(config)
+
+    async def fetch(start: int, size: int, stats: dict, stoppable: bool = False) -> dict | None:
+        await bucket.acquire()
+        # A scheduled page can wait on the rate limit for a while; if the
+        # stop comes in meanwhile it is not requested at all.
+        if stoppable and stop is not None and stop.is_set():
+            return None
+        return await loop.run_in_executor(
+            None, fetcher.fetch_page,
+            session, start, size, timeout, retries, envelopes, api_url, stats, policy,
+        )
+
+    def stopped(start: int) -> bool:
+        if stop is None or not stop.is_set():
+            return False
+        log.info("Stop requested -- not fetching from %d", start)
+        return True
+
+    async def fetch_shrinking(start: int, stats: dict) -> tuple[dict, int]:
+        # Sequential requests only: retry the same offset at a smaller size
+        # when the tuner's current size keeps failing.
+        while True:
+            size = tuner.next_size() if tuner else page_size
+            try:
+                return await fetch(start, size, stats), size
+            except RuntimeError:
+                if not (tuner and tuner.failed(size)):
+                    raise
+
+    stats = {}
+    log.info("Fetching first page (start=%d)…", first)
+    data, size = await fetch_shrinking(first, stats)
+    total = data.get("iTotalRecords", 0)
+    log.info("Server reports %d total tenders", total)
+
+    if limit:
+        total = min(total, limit)
+        log.info("--limit applied: will fetch at most %d tenders", total)
+
+    rows = data.get("data", [])
+    if tuner:
+        tuner.record(size, len(rows), min(size, total - first), stats)
+    yield rows, total, first
+    start = first + (len(rows) if tuner else page_size)
+
+    # --page-size auto: probe candidate sizes one request at a time, since a
+    # server that clamps iDisplayLength would leave gaps between offsets
+    # computed in advance. Once a size is chosen, fan out as usual.
+    while tuner and start < total:
+        tuner.next_size()
+        if tuner.chosen is not None:
+            break
+        if stopped(start):
+            return
+        try:
+            data, size = await fetch_shrinking(start, stats)
+        except RuntimeError as exc:
+            if failed is None:
+                raise
+            size = tuner.next_size()
+            fetcher.defer_page(failed, start, size, exc)
+            start += size
+            continue
+        rows = data.get("data", [])
+        tuner.record(size, len(rows), min(size, total - start), stats)
+        if not rows:
+            log.warning("Empty page at start=%d before reaching %d -- stopping", start, total)
+            return
+        yield rows, total, start
+        start += len(rows)
+
+    log.info("Fetching records %d–%d with %d workers", start, total, concurrency)
+
+    # Keep at most `concurrency` requests in flight and hand pages back in
+    # offset order: a finished page waits for any slower page ahead of it.
+    # Offsets are assigned as requests are scheduled, so a tuner backing
+    # off to a smaller size takes effect for every later page. After
+    # `stop` is set nothing new is scheduled, and the pages already in
+    # flight are still handed back.
+    in_flight: deque[tuple[int, int, dict, asyncio.Task]] = deque()
+    try:
+        while start < total or in_flight:
+            if start < total and stopped(start):
+                start = total
+            while start < total and len(in_flight) < concurrency:
+                size  = tuner.next_size() if tuner else page_size
+                stats = {}
+                in_flight.append((start, size, stats, asyncio.ensure_future(fetch(start, size, stats, True))))
+                start += size
+            if not in_flight:
+                break
+
+            offset, size, stats, task = in_flight.popleft()
+            try:
+                data = await task
+            except RuntimeError as exc:
+                if failed is None:
+                    raise
+                fetcher.defer_page(failed, offset, size, exc)
+                continue
+            if data is None:
+                continue
+            rows = data.get("data", [])
+            if tuner:
+                tuner.record(size, len(rows), min(size, total - offset), stats)
+            log.info(
+                "Fetched records %d–%d / %d",
+                offset, min(offset + size, total), total,
+            )
+            yield rows, total, offset
+    finally:
+        for *_, task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*(t for *_, t in in_flight), return_exceptions=True)
+
+
+def iter_raw_pages_concurrent(
+    session: requests.Session,
+    config: dict,
+    failed: list[tuple[int, int]] | None = None,
+    stop: threading.Event | None = None,
+) -> Iterator[tuple[list[dict], int, int]]:
+    """
+    Synchronous facade over aiter_raw_pages so scrape.main can consume it
+    exactly like fetcher.iter_raw_pages.
+    """
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=max(1, config["concurrency"]),
+                           thread_name_prefix="fetch")
+    )
+    agen = aiter_raw_pages(session, config, failed, stop)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
@@ -0,0 +1,88 @@
+"""
+benchmarks/bench_adversarial.py
+-------------------------------
+Worst-case parse time per row on pathological cells (mock_server.ADVERSARIAL_CELLS)
+at growing sizes, for every installed --html-backend, plus a seeded fuzz
+run over random mixes of label and markup fragments. Time should grow at
+most linearly with size and stop growing past parser.MAX_CELL_CHARS; the
+default sizes include parser.DEFUSE_ABOVE_CHARS, the largest cell parsed
+without the "<" rewrite.
+Exits 1 if any single row takes longer than --budget seconds.
+
+Usage:
+    python benchmarks/bench_adversarial.py
+    python benchmarks/bench_adversarial.py --sizes 10000 100000 1000000 --fuzz 2000
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("bench", level=logging.ERROR)
+
+import mock_server
+from parser import BACKENDS, DEFUSE_ABOVE_CHARS, MAX_CELL_CHARS, parse_raw_record, raw_tender_id
+
+FRAGMENTS = [
+    "Tender Id", " :", "Name Of Work", "Corrigendum", "Estimated Contract Value",
+    "Last Date & Time For Submission", "12.5", "01-02-2026", " ", "\n", "<", ">",
+    "<input name=tenderid value=", "<span style=color:#f44336;>", "</span>", "<p>",
+    "&amp;", "&", "<!--", "-->", "'", '"', "x" * 50,
+]
+
+
+def time_row(item: dict, backend: str) -> float:
+    t0 = time.perf_counter()
+    raw_tender_id(item)
+    parse_raw_record(item, backend)
+    return time.perf_counter() - t0
+
+
+def fuzz_rows(count: int, max_size: int, seed: int):
+    rng = random.Random(seed)
+    for _ in range(count):
+        size  = rng.randint(1, max_size)
+        parts = []
+        while sum(map(len, parts)) < size:
+            frag = rng.choice(FRAGMENTS)
+            parts.append(frag * rng.choice((1, 1, 1, 10, 100)))
+        cell = "".join(parts)[:size]
+        yield {"1": "FUZZ", "2": cell, "3": cell}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[DEFUSE_ABOVE_CHARS, 16_000, 64_000, 256_000])
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    ap.add_argument("--fuzz", type=int, default=500, metavar="N", help="Random rows per backend.")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--budget", type=float, default=1.0, metavar="SECONDS")
+    args = ap.parse_args()
+
+    print(f"cap: {MAX_CELL_CHARS} chars, budget: {args.budget}s per row")
+    print(f"{'cell':>16}{'backend':>12}" + "".join(f"{n:>10}" for n in args.sizes))
+    worst = 0.0
+    for kind in mock_server.ADVERSARIAL_CELLS:
+        for backend in args.backends:
+            times = [time_row(mock_server.adversarial_row(kind, n), backend) for n in args.sizes]
+            worst = max(worst, *times)
+            print(f"{kind:>16}{backend:>12}" + "".join(f"{t:>10.4f}" for t in times))
+
+    for backend in args.backends:
+        times = [time_row(item, backend) for item in fuzz_rows(args.fuzz, MAX_CELL_CHARS, args.seed)]
+        worst = max(worst, *times)
+        print(f"{'fuzz':>16}{backend:>12}  {len(times)} rows, slowest {max(times):.4f}s")
+
+    print(f"\nslowest row: {worst:.4f}s")
+    return 1 if worst > args.budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
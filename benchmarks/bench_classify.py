@@ -0,0 +1,99 @@
+"""
+benchmarks/bench_classify.py
+----------------------------
+Per-record cost of the tender_type column as clean_columns builds it, per
+page: the keyword rules alone (no --type-model) vs a
+classifier.HashedNgramModel scoring the page in one predict() with the
+rules run only on the rows it is not sure of (--type-model). The model is
+trained on the golden corpus; the timed records are its rows with a
+numbered suffix on each name of work, since the corpus repeats a few
+names and both paths type each distinct name once per page. A second
+model column times the worst case, a model that is sure of nothing.
+Exits 1 if the model path at --page-size costs more per record than the
+rules alone, plus --slack (none by default).
+
+Usage:
+    python benchmarks/bench_classify.py
+    python benchmarks/bench_classify.py --page-sizes 10 50 200 --repeat 20
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("bench", level=logging.WARNING)
+
+import classifier
+from cleaner import _clean_description_column, _clean_text_column, _tender_type_column, clean_columns
+from parser import parse_raw_record
+
+
+def corpus_columns() -> tuple[list[str], list[str]]:
+    """Cleaned names of work and keyword-rule tender_types of the golden corpus."""
+    with open(os.path.join(ROOT, "benchmarks", "corpus", "golden-v2.json"), encoding="utf-8") as f:
+        rows = json.load(f)["rows"]
+    parsed = [p for p in map(parse_raw_record, rows) if p is not None and (p.get("tender_id") or "").strip()]
+    names  = _clean_text_column([p.get("name_of_work", "") for p in parsed])
+    return names, clean_columns(parsed)[0]["tender_type"]
+
+
+def per_record_us(fn, count: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best / count * 1e6
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--page-sizes", type=int, nargs="+", default=[1, 10, 50, 200])
+    ap.add_argument("--page-size", type=int, default=50, help="Page size checked against the budget.")
+    ap.add_argument("--repeat", type=int, default=15)
+    ap.add_argument("--slack", type=float, default=0.0,
+                    help="Allowed excess over the rules' per-record cost (0.25 = 25%%).")
+    args = ap.parse_args()
+
+    if classifier.np is None:
+        print("numpy is not installed; nothing to compare")
+        return 0
+
+    names, labels = corpus_columns()
+    model  = classifier.train_model(_clean_description_column(names), labels)
+    unsure = classifier.HashedNgramModel(model.weights, model.bias, model.labels, threshold=1.01)
+    # Four copies, so a page of 200 is not the whole corpus.
+    names = [f"{name} - package {i}" for i, name in enumerate(names * 4)]
+    texts = _clean_description_column(names)
+    n     = len(texts)
+    share = sum(label is None for label in model.predict(texts)) / n
+
+    print(f"{n} records, model unsure of {share:.0%} (typed by the rules)")
+    print(f"{'page size':>10}{'rules us/rec':>14}{'model us/rec':>14}{'vs rules':>10}{'unsure model':>14}{'vs rules':>10}")
+    at_budget = None
+    for size in sorted(set(args.page_sizes) | {args.page_size}):
+        pages = [(names[i:i + size], texts[i:i + size]) for i in range(0, n, size)]
+        rules = per_record_us(lambda: [_tender_type_column(*p) for p in pages], n, args.repeat)
+        cost  = per_record_us(lambda: [_tender_type_column(*p, model) for p in pages], n, args.repeat)
+        worst = per_record_us(lambda: [_tender_type_column(*p, unsure) for p in pages], n, args.repeat)
+        if size == args.page_size:
+            at_budget = (cost, rules)
+        print(f"{size:>10}{rules:>14.2f}{cost:>14.2f}{cost / rules:>9.2f}x{worst:>14.2f}{worst / rules:>9.2f}x")
+
+    cost, rules = at_budget
+    over = cost > rules * (1 + args.slack)
+    print(f"\npage size {args.page_size}: {cost:.2f} us/record against a budget of {rules:.2f}"
+          f"{' -- OVER BUDGET' if over else ''}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
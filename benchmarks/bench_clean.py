@@ -0,0 +1,106 @@
+"""
+benchmarks/bench_clean.py
+-------------------------
+Cleaning a backfill-sized batch: clean_record once per record vs
+cleaner.clean_columns, which cleans each field across the whole batch
+(and clean_records, which adds the conversion to TenderRecords). Records
+are parsed mock_server rows with the tender names varied, so descriptions
+do not simply repeat. Both paths must produce the same records before
+anything is timed. Also reports the memory a cleaned record takes as a
+TenderRecord and as the equivalent dict.
+
+Usage:
+    python benchmarks/bench_clean.py
+    python benchmarks/bench_clean.py --rows 300000 --repeat 3
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("bench", level=logging.WARNING)
+
+import mock_server
+from cleaner import clean_columns, clean_record, clean_records, columns_to_records
+from parser import parse_raw_record
+
+
+def parsed_rows(n: int) -> list[dict]:
+    # Parse a few thousand distinct rows, then copy them with new ids and
+    # a varying suffix on the name of work.
+    base = [parse_raw_record(mock_server.synthetic_row(i)) for i in range(min(n, 5000))]
+    rows = []
+    for i in range(n):
+        row = dict(base[i % len(base)])
+        row["tender_id"]    = str(400000 + i)
+        row["name_of_work"] = f"{row['name_of_work']}  - package {i % 997}\n"
+        rows.append(row)
+    return rows
+
+
+def row_by_row(rows: list[dict]) -> list[dict]:
+    return [r for r in map(clean_record, rows) if r]
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def allocated(build) -> int:
+    tracemalloc.start()
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--rows", type=int, default=300_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    rows = parsed_rows(args.rows)
+    if clean_records(rows)[0] != row_by_row(rows):
+        print("clean_records and clean_record disagree")
+        return 1
+
+    print(f"{len(rows)} parsed records")
+    print(f"{'mode':<26}{'seconds':>9}{'records/s':>12}")
+    results = [
+        ("clean_record per row", best_of(lambda: row_by_row(rows), args.repeat)),
+        ("clean_columns",        best_of(lambda: clean_columns(rows), args.repeat)),
+        ("clean_records",        best_of(lambda: clean_records(rows), args.repeat)),
+    ]
+    columns, _ = clean_columns(rows)
+    results.append(("columns_to_records only", best_of(lambda: columns_to_records(columns), args.repeat)))
+    for name, seconds in results:
+        print(f"{name:<26}{seconds:>9.2f}{len(rows) / seconds:>12,.0f}")
+
+    # Strings passed through unchanged (e.g. raw_html_snippet) are shared
+    # with the parsed rows and not counted.
+    sample = min(len(rows), 20_000)
+    print(f"\nbytes allocated per cleaned record, {sample} records")
+    for name, build in [
+        ("TenderRecord", lambda: [clean_record(r) for r in rows[:sample]]),
+        ("dict",         lambda: [clean_record(r).to_dict() for r in rows[:sample]]),
+    ]:
+        print(f"{name:<26}{allocated(build) / sample:>9,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
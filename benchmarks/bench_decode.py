@@ -0,0 +1,82 @@
+"""
+benchmarks/bench_decode.py
+--------------------------
+Decode time and peak memory for one API page: resp.json()-style (whole
+body, then json.loads) vs jsonstream.iter_rows over 64 KiB chunks.
+
+Usage:
+    python benchmarks/bench_decode.py
+    python benchmarks/bench_decode.py --page-sizes 50 500 5000 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("bench")
+
+import mock_server
+from jsonstream import iter_rows
+
+CHUNK = 64 * 1024
+
+
+def _body(rows: int) -> bytes:
+    page = {
+        "sEcho": 1, "iTotalRecords": rows, "iTotalDisplayRecords": rows,
+        "data": [mock_server.synthetic_row(i) for i in range(rows)],
+    }
+    return json.dumps(page).encode("utf-8")
+
+
+def whole(body: bytes) -> dict:
+    # What requests does for resp.json(): join the body, decode, then parse.
+    chunks = [body[i:i + CHUNK] for i in range(0, len(body), CHUNK)]
+    return json.loads(b"".join(chunks).decode("utf-8"))
+
+
+def streamed(body: bytes) -> dict:
+    chunks = (body[i:i + CHUNK] for i in range(0, len(body), CHUNK))
+    page = {}
+    page["data"] = list(iter_rows(chunks, page))
+    return page
+
+
+def measure(fn, body: bytes, repeat: int) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(body)
+    elapsed = (time.perf_counter() - t0) / repeat
+
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--page-sizes", type=int, nargs="+", default=[50, 500, 2000])
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    print(f"{'rows':>6}{'body KiB':>10}{'variant':>10}{'ms/page':>10}{'peak KiB':>10}")
+    for rows in args.page_sizes:
+        body = _body(rows)
+        for name, fn in (("json()", whole), ("stream", streamed)):
+            elapsed, peak = measure(fn, body, args.repeat)
+            print(f"{rows:>6}{len(body) / 1024:>10.0f}{name:>10}{elapsed * 1000:>10.2f}"
+                  f"{peak / 1024:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+benchmarks/bench_envelope.py
+----------------------------
+Envelopes per second: per-request PBKDF2 (_build_envelope) vs the pooled
+EnvelopeBuilder.
+
+Usage:
+    python benchmarks/bench_envelope.py
+    python benchmarks/bench_envelope.py --seconds 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("bench")
+
+from fetcher import EnvelopeBuilder, _build_envelope, _build_req_data
+
+
+def _rate(fn, seconds: float) -> float:
+    count = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while time.perf_counter() < deadline:
+        fn(count * 50)
+        count += 1
+    return count / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--seconds", type=float, default=2.0, help="Time budget per variant.")
+    ap.add_argument("--pool-size", type=int, default=4)
+    args = ap.parse_args()
+
+    builder = EnvelopeBuilder(pool_size=args.pool_size)
+
+    before = _rate(lambda start: _build_envelope(_build_req_data(start, 50)), args.seconds)
+    after  = _rate(lambda start: builder.build(start, 50), args.seconds)
+
+    print(f"{'variant':<28}{'envelopes/s':>14}")
+    print(f"{'_build_envelope (per-call)':<28}{before:>14,.0f}")
+    print(f"{'EnvelopeBuilder (pooled)':<28}{after:>14,.0f}")
+    print(f"speedup: {after / before:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+benchmarks/bench_fetch.py
+-------------------------
+Pages per second against the local mock portal at several concurrency levels.
+
+Usage:
+    python benchmarks/bench_fetch.py
+    python benchmarks/bench_fetch.py --latency 0.2 --total 2000 --concurrency 1 2 4 8
+    python benchmarks/bench_fetch.py --error-rate 0.02 --burst-every 50 --burst-length 3
+    python benchmarks/bench_fetch.py --page-size auto --row-latency 0.002 --fail-above 150
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("bench", level=logging.WARNING)
+
+import mock_server
+from async_fetcher import iter_raw_pages_concurrent
+from fetcher import iter_raw_pages, make_session
+
+
+def run(base_url: str, concurrency: int, args) -> tuple[int, int, float]:
+    config = {
+        "limit":       None,
+        "rate_limit":  args.rate_limit,
+        "concurrency": concurrency,
+        "retries":     args.retries,
+        "timeout":     30,
+        "page_size":   50 if args.page_size == "auto" else int(args.page_size),
+        "auto_page_size": args.page_size == "auto",
+        "base_url":    base_url,
+    }
+    session = make_session("bench/1.0", 30, base_url)
+    pages   = iter_raw_pages_concurrent if concurrency > 1 else iter_raw_pages
+    n_pages = n_rows = 0
+    t0 = time.perf_counter()
+    for rows, _, _ in pages(session, config):
+        n_pages += 1
+        n_rows  += len(rows)
+    return n_pages, n_rows, time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--total", type=int, default=1000)
+    ap.add_argument("--page-size", default="50", help="N or 'auto'")
+    ap.add_argument("--latency", type=float, default=0.1)
+    ap.add_argument("--jitter", type=float, default=0.05)
+    ap.add_argument("--row-latency", type=float, default=0.0)
+    ap.add_argument("--max-length", type=int, default=0)
+    ap.add_argument("--fail-above", type=int, default=0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--burst-every", type=int, default=0)
+    ap.add_argument("--burst-length", type=int, default=0)
+    ap.add_argument("--rate-limit", type=float, default=0.0)
+    ap.add_argument("--retries", type=int, default=3)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = ap.parse_args()
+
+    server, base_url = mock_server.start_in_thread(
+        total=args.total, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, burst_every=args.burst_every,
+        burst_length=args.burst_length, row_latency=args.row_latency,
+        max_length=args.max_length, fail_above=args.fail_above, seed=1,
+    )
+    try:
+        print(f"{'concurrency':>11}{'pages':>8}{'records':>9}{'seconds':>9}{'pages/s':>9}{'rec/s':>9}")
+        for n in args.concurrency:
+            pages, rows, elapsed = run(base_url, n, args)
+            print(f"{n:>11}{pages:>8}{rows:>9}{elapsed:>9.2f}{pages / elapsed:>9.1f}"
+                  f"{rows / elapsed:>9.0f}")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+benchmarks/bench_fields.py
+--------------------------
+Field extraction from a tender cell's text: the single-pass label scanner
+(parser._scan_fields) vs one re.search per field, as parse_raw_record did
+before. Both run on the same pre-extracted text, so HTML parsing is not
+part of the timing. The two must agree on every row before anything is
+timed.
+
+Usage:
+    python benchmarks/bench_fields.py
+    python benchmarks/bench_fields.py --rows 5000 --repeat 5
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("bench", level=logging.WARNING)
+
+import mock_server
+from parser import _extract_bs4, _scan_fields
+
+
+def per_field_search(text: str) -> dict[str, str]:
+    fields = dict.fromkeys(("tender_id", "name_of_work", "corrigendum",
+                            "estimated_value_raw", "last_submission_raw"), "")
+    m = re.search(r"Tender Id\s*:(\d+)", text)
+    if m:
+        fields["tender_id"] = m.group(1)
+    m = re.search(
+        r"Name Of Work\s*:(.*?)(?:Corrigendum\s*:|Estimated Contract Value|Last Date|$)",
+        text, re.DOTALL,
+    )
+    if m:
+        fields["name_of_work"] = m.group(1).strip()
+    m = re.search(r"Estimated Contract Value\s*:\s*([\d.]+)", text)
+    if m:
+        fields["estimated_value_raw"] = m.group(1)
+    m = re.search(r"Last Date & Time For Submission\s*:\s*([\d\-:/ ]+)", text)
+    if m:
+        fields["last_submission_raw"] = m.group(1).strip()
+    m = re.search(r"Corrigendum\s*:\s*([^\n<]+)", text)
+    if m:
+        fields["corrigendum"] = m.group(1).strip()
+    return fields
+
+
+def timed(fn, texts: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    texts = [_extract_bs4(mock_server.synthetic_row(i)["2"])[0] for i in range(args.rows)]
+    for text in texts:
+        assert _scan_fields(text) == per_field_search(text), text
+
+    print(f"{'extraction':>12}{'seconds':>9}{'rows/s':>10}")
+    base = None
+    for name, fn in (("re.search", per_field_search), ("scanner", _scan_fields)):
+        elapsed = timed(fn, texts, args.repeat)
+        base    = base or elapsed
+        print(f"{name:>12}{elapsed:>9.3f}{args.rows / elapsed:>10.0f}  x{base / elapsed:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
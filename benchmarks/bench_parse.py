@@ -0,0 +1,73 @@
+"""
+benchmarks/bench_parse.py
+-------------------------
+Rows parsed per second, on synthetic mock-portal rows: in-process
+parse_page for each installed --html-backend, then ParsePool at several
+--parse-workers counts with the default backend.
+
+Usage:
+    python benchmarks/bench_parse.py
+    python benchmarks/bench_parse.py --backends bs4 lxml --workers 1
+    python benchmarks/bench_parse.py --workers 1 4 8 16 --pages 40 --page-size 100
+"""
+
+import argparse
+import functools
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("bench", level=logging.WARNING)
+
+import mock_server
+from parser import BACKENDS, DEFAULT_BACKEND, ParsePool, parse_page
+
+
+def run(parse, pages: list[list[dict]]) -> float:
+    t0 = time.perf_counter()
+    for page in pages:
+        parse(page)
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--pages", type=int, default=20)
+    ap.add_argument("--page-size", type=int, default=50)
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = ap.parse_args()
+
+    pages = [
+        [mock_server.synthetic_row(p * args.page_size + i) for i in range(args.page_size)]
+        for p in range(args.pages)
+    ]
+    rows = args.pages * args.page_size
+    print(f"{'backend':>10}{'seconds':>9}{'rows/s':>9}")
+    base = None
+    for name in args.backends:
+        elapsed = run(functools.partial(parse_page, backend=name), pages)
+        base    = base or elapsed
+        print(f"{name:>10}{elapsed:>9.2f}{rows / elapsed:>9.0f}  x{base / elapsed:.1f}")
+
+    print(f"\ncpus: {os.cpu_count()}, backend: {DEFAULT_BACKEND}")
+    print(f"{'workers':>8}{'seconds':>9}{'rows/s':>9}")
+    for n in sorted(set(args.workers)):
+        if n <= 1:
+            elapsed = run(parse_page, pages)
+        else:
+            pool = ParsePool(n, "bench")
+            pool.parse_page(pages[0])          # start the workers outside the timing
+            elapsed = run(pool.parse_page, pages)
+            pool.close()
+        print(f"{n:>8}{elapsed:>9.2f}{rows / elapsed:>9.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+benchmarks/bench_suite.py
+-------------------------
+Parser and cleaner throughput on a versioned golden corpus of raw API rows
+(benchmarks/corpus/golden-v<N>.json), checked against a stored baseline.
+
+The corpus holds the fixture shapes from tests/conftest.py, generated
+variants of them (whitespace, CRLF, date formats, missing fields,
+corrigenda, entities, long descriptions, malformed tags) and mock_server
+rows, plus a digest of the expected parse_raw_record and clean_record
+output for every row. Outputs are checked against those digests before
+anything is timed.
+
+parse_raw_record, parse_page, clean_record, clean_records and
+cleaner._parse_date are timed in records/second with peak traced memory,
+followed by the date cache's hit rate on the corpus. Each of the --repeat
+runs is paired with a fixed pure-Python calibration loop and the baseline
+compares the median of those ratios, so it tolerates a noisy machine and a
+baseline recorded on one machine is still meaningful on another. The run fails
+(exit 1) when any operation falls more than --tolerance below the
+baseline, and exits 2 if any output differs from the golden digests.
+
+Usage:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --update-baseline
+    python benchmarks/bench_suite.py --update-golden      # after an intended output change
+    python benchmarks/bench_suite.py --write-corpus       # new CORPUS_VERSION only
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("bench", level=logging.ERROR)
+
+import mock_server
+from cleaner import DATE_CACHE_SIZE, _parse_date, clean_record, clean_records
+from parser import BACKENDS, DEFAULT_BACKEND, parse_page, parse_raw_record
+from schema import json_default
+
+CORPUS_VERSION = 2
+CORPUS_DIR     = os.path.join(ROOT, "benchmarks", "corpus")
+BASELINE_PATH  = os.path.join(ROOT, "benchmarks", "baseline.json")
+PAGE_SIZE      = 50
+CALIBRATION_ITERS = 50_000
+
+
+def corpus_path(version: int = CORPUS_VERSION) -> str:
+    return os.path.join(CORPUS_DIR, f"golden-v{version}.json")
+
+
+# ── Corpus ───────────────────────────────────────────────────────────────────
+
+def _fixture_cells() -> dict[str, str]:
+    # Read the SAMPLE_* strings without importing conftest (which would set
+    # up the test logger).
+    with open(os.path.join(ROOT, "tests", "conftest.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    cells = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name.startswith("SAMPLE_"):
+                cells[name] = ast.literal_eval(node.value)
+    return cells
+
+
+def _variants(html: str, doc: str, rng: random.Random) -> list[tuple[str, str]]:
+    long_work = " ".join(" ".join(rng.choice(mock_server._WORKS).split()[:6]) for _ in range(12))
+    return [
+        (html, doc),
+        (" ".join(html.split()), " ".join(doc.split())),
+        (html.replace("\n", "\r\n"), doc.replace("\n", "\r\n")),
+        (html.replace("-2026", "/2026").replace("-0", "/0"), doc),
+        ("\n".join(l for l in html.split("\n") if "Estimated" not in l), doc),
+        (html.replace("</body>", "<p style=color:#000000;> Corrigendum : Date extended\n</body>"), doc),
+        (html.replace("R&B", "R&amp;B").replace("AMC-", "AMC&nbsp;-"), doc),
+        (html.replace("Khanpur", long_work).replace("veterinary staff", long_work), doc),
+        (html.replace("<span", "<SPAN").replace("</span>", "</SPAN>"), doc.replace("<a", "<A").replace("</a>", "</A>")),
+        (html.replace("<p ", "<p><b></b> <p ").replace("18:", "18 :"), doc),
+        # Malformed tags, which html.parser reads in its own way ("<input <b>"
+        # is one tag, "<b</a>" closes the <a>).
+        (html.replace("</body>", "<p>Corrigendum : a <input <b>bold</b></p></body>"), doc),
+        ("<b</a>".join(html.rsplit("</a>", 1)), doc.replace("</a>", "<b</a>")),
+        (html.replace("</form></span>", "</form><input <i>x</i></span>", 1), doc),
+    ]
+
+
+def build_corpus() -> list[dict]:
+    cells = _fixture_cells()
+    doc   = cells["SAMPLE_DOC_CELL"]
+    rng   = random.Random(CORPUS_VERSION)
+    rows  = []
+    fixtures = [
+        ("15 of 2025-26", cells["SAMPLE_HTML_WORKS"], doc, "280210"),
+        ("44 of 2025-2026", cells["SAMPLE_HTML_GOODS"], "<a>Total No:1</a>", "280056"),
+        ("2026-HK AND SSA", cells["SAMPLE_HTML_SERVICES"], "<a>Total No:4</a>", "279385"),
+        ("BAD-001", cells["SAMPLE_HTML_NO_TENDER_ID"], "", None),
+    ]
+    next_id = 300000
+    for ifb_no, html, doc_cell, tender_id in fixtures:
+        for html_v, doc_v in _variants(html, doc_cell, rng):
+            if tender_id:
+                html_v = html_v.replace(tender_id, str(next_id))
+                doc_v  = doc_v.replace(tender_id, str(next_id))
+                next_id += 1
+            rows.append({"1": ifb_no, "2": html_v, "3": doc_v})
+    rows.extend(mock_server.synthetic_row(i) for i in range(200))
+    return rows
+
+
+def _digest(obj) -> str:
+    blob = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=json_default)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def expected_digests(rows: list[dict], backend: str) -> list[dict]:
+    out = []
+    for row in rows:
+        parsed = parse_raw_record(row, backend)
+        cleaned = clean_record(parsed) if parsed is not None else None
+        out.append({"parsed": _digest(parsed), "cleaned": _digest(cleaned)})
+    return out
+
+
+def load_corpus(version: int = CORPUS_VERSION) -> dict:
+    with open(corpus_path(version), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_corpus(corpus: dict) -> None:
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    with open(corpus_path(corpus["version"]), "w", encoding="utf-8") as f:
+        json.dump(corpus, f, ensure_ascii=False, indent=0)
+        f.write("\n")
+
+
+def check_golden(corpus: dict) -> list[str]:
+    """Mismatches between current outputs and the corpus digests, per backend."""
+    problems = []
+    for backend in BACKENDS:
+        for i, (row, want) in enumerate(zip(corpus["rows"], corpus["expected"])):
+            parsed = parse_raw_record(row, backend)
+            if _digest(parsed) != want["parsed"]:
+                problems.append(f"row {i} [{backend}]: parse_raw_record output changed")
+            elif parsed is not None and _digest(clean_record(parsed)) != want["cleaned"]:
+                problems.append(f"row {i} [{backend}]: clean_record output changed")
+    return problems
+
+
+# ── Timing ───────────────────────────────────────────────────────────────────
+
+def _calibration_loop() -> None:
+    # Fixed pure-Python str, dict and int work; rates are stored relative to it.
+    d = {}
+    for i in range(CALIBRATION_ITERS):
+        s = str(i)
+        d[s[-3:]] = d.get(s[-3:], 0) + len(s)
+
+
+def _timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def _peak_kib(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def operations(rows: list[dict], backend: str) -> dict[str, tuple]:
+    pages  = [rows[i:i + PAGE_SIZE] for i in range(0, len(rows), PAGE_SIZE)]
+    parsed = [p for p in (parse_raw_record(r, backend) for r in rows) if p is not None]
+    parsed_pages = [parsed[i:i + PAGE_SIZE] for i in range(0, len(parsed), PAGE_SIZE)]
+    dates  = [p.get("last_submission_raw", "") for p in parsed]
+    return {
+        f"parse_raw_record[{backend}]": (lambda: [parse_raw_record(r, backend) for r in rows], len(rows)),
+        f"parse_page[{backend}]":       (lambda: [parse_page(p, backend) for p in pages], len(rows)),
+        "clean_record":                 (lambda: [clean_record(p) for p in parsed], len(parsed)),
+        "clean_records":                (lambda: [clean_records(p) for p in parsed_pages], len(parsed)),
+        # From an empty cache each run, so repeats within the corpus are
+        # the only hits.
+        "parse_date":                   (lambda: (_parse_date.cache_clear(), [_parse_date(d) for d in dates]), len(dates)),
+    }
+
+
+def date_cache_stats(rows: list[dict]) -> str:
+    parsed = [p for p in (parse_raw_record(r, "bs4") for r in rows) if p is not None]
+    _parse_date.cache_clear()
+    for p in parsed:
+        _parse_date(p.get("last_submission_raw", ""))
+    info = _parse_date.cache_info()
+    return (f"date cache: {info.hits / (info.hits + info.misses):.0%} hit rate over "
+            f"{info.hits + info.misses} dates ({info.currsize} distinct, capacity {DATE_CACHE_SIZE})")
+
+
+def measure(rows: list[dict], backend: str, repeat: int) -> dict[str, dict]:
+    results = {}
+    for name, (fn, count) in operations(rows, backend).items():
+        fn()                                        # warm caches and imports
+        times, ratios = [], []
+        for _ in range(repeat):
+            # Each run is paired with a calibration run right before it, so a
+            # noisy moment on the machine slows both sides of the ratio.
+            cal = _timed(_calibration_loop)
+            op  = _timed(fn)
+            times.append(op)
+            ratios.append(cal / op * count / CALIBRATION_ITERS)
+        results[name] = {
+            "records_per_s": round(count / min(times), 1),
+            "normalized":    round(statistics.median(ratios), 5),
+            "peak_kib":      round(_peak_kib(fn), 1),
+        }
+    return results
+
+
+def load_baseline() -> dict:
+    try:
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--backend", default=DEFAULT_BACKEND, choices=list(BACKENDS))
+    ap.add_argument("--repeat", type=int, default=15)
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="Allowed drop below the baseline's normalised rate (0.25 = 25%%).")
+    ap.add_argument("--update-baseline", action="store_true",
+                    help="Store this run's rates for --backend in benchmarks/baseline.json.")
+    ap.add_argument("--update-golden", action="store_true",
+                    help="Re-record the expected-output digests for the current corpus.")
+    ap.add_argument("--write-corpus", action="store_true",
+                    help=f"Generate golden-v{CORPUS_VERSION}.json (refuses to overwrite).")
+    args = ap.parse_args()
+
+    if args.write_corpus:
+        if os.path.exists(corpus_path()):
+            print(f"{corpus_path()} exists; bump CORPUS_VERSION to build a new corpus")
+            return 2
+        rows = build_corpus()
+        write_corpus({"version": CORPUS_VERSION, "rows": rows, "expected": expected_digests(rows, "bs4")})
+        print(f"wrote {len(rows)} rows to {corpus_path()}")
+        return 0
+
+    corpus = load_corpus()
+    rows   = corpus["rows"]
+    if args.update_golden:
+        corpus["expected"] = expected_digests(rows, "bs4")
+        write_corpus(corpus)
+        print(f"re-recorded expected outputs in {corpus_path()}")
+        return 0
+
+    problems = check_golden(corpus)
+    if problems:
+        print("\n".join(problems[:20]))
+        print(f"{len(problems)} output mismatch(es) against golden-v{CORPUS_VERSION}; "
+              "fix the change or run --update-golden if it is intended")
+        return 2
+
+    results     = measure(rows, args.backend, args.repeat)
+    baseline    = load_baseline()
+    base_ops    = baseline.get("results", {}) if baseline.get("corpus") == CORPUS_VERSION else {}
+
+    print(f"corpus: golden-v{CORPUS_VERSION} ({len(rows)} rows), backend: {args.backend}")
+    print(f"{'operation':>26}{'rec/s':>10}{'vs base':>9}{'peak KiB':>10}  status")
+    failed = False
+    for name, r in results.items():
+        base   = base_ops.get(name)
+        change = ""
+        status = "no baseline"
+        if base:
+            ratio  = r["normalized"] / base["normalized"]
+            change = f"{(ratio - 1) * 100:+.0f}%"
+            status = "ok"
+            if ratio < 1 - args.tolerance:
+                status = "REGRESSION"
+                failed = True
+        print(f"{name:>26}{r['records_per_s']:>10,.0f}{change:>9}{r['peak_kib']:>10,.0f}  {status}")
+    print(date_cache_stats(rows))
+
+    if args.update_baseline:
+        merged = dict(base_ops)
+        merged.update(results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({
+                "corpus":      CORPUS_VERSION,
+                "python":      platform.python_version(),
+                "results":     merged,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {BASELINE_PATH}")
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
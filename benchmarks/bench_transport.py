@@ -0,0 +1,98 @@
+"""
+benchmarks/bench_transport.py
+-----------------------------
+Small-page POSTs per second against the local mock portal for each HTTP
+transport: a stock requests.Session, the pooled adapter from transport.py,
+and the httpx HTTP/2 client (if installed). Also shows how many TCP
+connections the server saw; --connect-latency charges each new connection
+a TLS-handshake-like delay so pool churn shows up in the timings.
+
+The mock portal speaks plain HTTP/1.1, so the http2 row measures httpx
+over HTTP/1.1 here; multiplexing only kicks in against a TLS server that
+offers h2 via ALPN.
+
+Usage:
+    python benchmarks/bench_transport.py
+    python benchmarks/bench_transport.py --requests 2000 --concurrency 4 16 32 --connect-latency 0.1
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("bench", level=logging.ERROR)
+
+from requests.adapters import HTTPAdapter
+
+import mock_server
+import transport
+from fetcher import API_PATH, EnvelopeBuilder, fetch_page, make_session
+
+
+def _stock_session(base_url: str, concurrency: int):
+    # What make_session built before transport.py: default 10-connection pool.
+    s = make_session("bench/1.0", 30, base_url, pool_size=concurrency)
+    s.mount("http://", HTTPAdapter())
+    s.mount("https://", HTTPAdapter())
+    return s
+
+
+VARIANTS = {
+    "requests (stock pool)": _stock_session,
+    "requests (pooled)":     lambda url, n: make_session("bench/1.0", 30, url, pool_size=n),
+    "httpx http2":           lambda url, n: make_session("bench/1.0", 30, url, transport="http2", pool_size=n),
+}
+
+
+def run(server, base_url: str, variant: str, concurrency: int, args) -> tuple[float, int]:
+    session   = VARIANTS[variant](base_url, concurrency)
+    envelopes = EnvelopeBuilder()
+    api_url   = base_url + API_PATH
+    before    = server.state.connections
+
+    def one(i: int) -> None:
+        fetch_page(session, (i * args.page_size) % args.total, args.page_size, 30, 0, envelopes, api_url)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        list(ex.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - t0
+    session.close()
+    return args.requests / elapsed, server.state.connections - before
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--total", type=int, default=500)
+    ap.add_argument("--page-size", type=int, default=10)
+    ap.add_argument("--latency", type=float, default=0.005)
+    ap.add_argument("--connect-latency", type=float, default=0.05)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[4, 16, 32])
+    args = ap.parse_args()
+
+    variants = [v for v in VARIANTS if transport.httpx is not None or "http2" not in v]
+    server, base_url = mock_server.start_in_thread(
+        total=args.total, latency=args.latency, connect_latency=args.connect_latency, seed=1,
+    )
+    try:
+        print(f"{'transport':<24}{'concurrency':>12}{'req/s':>9}{'connections':>13}")
+        for n in args.concurrency:
+            for variant in variants:
+                rate, conns = run(server, base_url, variant, n, args)
+                print(f"{variant:<24}{n:>12}{rate:>9.0f}{conns:>13}")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import json
+import os
+import re
+import string
+import zlib
+from typing import NamedTuple, Optional
+
+try:
+    import numpy as np
+except ImportError:                 # optional: only needed for --type-model
+    np = None
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tender_types.json")
+
+
+class Match(NamedTuple):
+    label:   str
+    keyword: str
+    start:   int
+    end:     int
+
+
+def _trie_pattern(words: list[str]) -> str:
+    # One alternation factored by shared prefixes, e.g. ["drug", "drugs",
+    # "dam"] -> "d(?:am|rug(?:s)?)". re tries branches in order, so a
+    # prefix tree rejects a position after a character or two instead of
+    # trying every keyword there.
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class KeywordClassifier:
+    """
+    Tender-type rules compiled into one case-insensitive whole-word scan.
+    `rules` is a list of (label, keywords) in priority order; a text gets
+    the label of its highest-priority keyword, or `default` if none occurs.
+    """
+
+    def __init__(self, rules: list[tuple[str, list[str]]], default: str):
+        self.labels  = [label for label, _ in rules]
+        self.default = default
+        self._rank: dict[str, int] = {}
+        for rank, (label, keywords) in enumerate(rules):
+            for kw in keywords:
+                if not (kw and kw[0].isalnum() and kw[-1].isalnum()):
+                    raise ValueError(f"Keyword {kw!r} for {label} must start and end with a letter or digit")
+                self._rank.setdefault(kw.lower(), rank)
+        if not self._rank:
+            raise ValueError("Tender type rules have no keywords")
+        self._scan = re.compile(rf"(?<!\w){_trie_pattern(list(self._rank))}(?!\w)", re.I)
+        self._fallback = [
+            re.compile(rf"(?<!\w)(?:{'|'.join(map(re.escape, kws))})(?!\w)", re.I) for _, kws in rules
+        ]
+
+    @classmethod
+    def from_file(cls, path: str = RULES_PATH) -> "KeywordClassifier":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls([(r["label"], r["keywords"]) for r in data["rules"]], data["default"])
+
+    def _rank_of(self, word: str) -> int:
+        rank = self._rank.get(word.lower())
+        if rank is None:
+            # re.I also folds a few non-ASCII letters (e.g. "ſ" to "s") that
+            # str.lower() leaves alone.
+            rank = next(i for i, p in enumerate(self._fallback) if p.fullmatch(word))
+        return rank
+
+    def matches(self, text: str) -> list[Match]:
+        """Every keyword occurrence in `text`, left to right."""
+        return [
+            Match(self.labels[self._rank_of(m.group())], m.group(), m.start(), m.end())
+            for m in self._scan.finditer(text)
+        ]
+
+    def classify(self, text: str) -> str:
+        best: Optional[int] = None
+        for m in self._scan.finditer(text):
+            rank = self._rank_of(m.group())
+            if rank == 0:
+                return self.labels[0]
+            if best is None or rank < best:
+                best = rank
+        return self.default if best is None else self.labels[best]
+
+
+# Words are split on whitespace and ASCII punctuation.
+_PUNCTUATION = str.maketrans({ch: " " for ch in string.punctuation})
+_END   = 1 << 32                # hash of the "\x00" end-of-text token; crc32 never reaches it
+
+MODEL_VERSION = 1
+
+
+class _TokenHashes(dict):
+    """crc32 of each word token, computed once per distinct token."""
+
+    def __missing__(self, tok: str) -> int:
+        h = self[tok] = _END if tok == "\x00" else zlib.crc32(tok.encode("utf-8"))
+        return h
+
+
+class HashedNgramModel:
+    """
+    Linear tender-type classifier over hashed word unigrams and bigrams
+    (softmax regression, trained by train_classifier.py). `predict` scores
+    a whole page of descriptions with a few NumPy calls and returns None
+    for texts it is not confident about, which keep their rule-based type.
+    """
+
+    def __init__(self, weights, bias, labels: list[str], threshold: float = 0.7):
+        if np is None:
+            raise RuntimeError("--type-model needs numpy: pip install numpy")
+        self.weights    = np.asarray(weights, dtype=np.float32)
+        self.bias       = np.asarray(bias, dtype=np.float32)
+        self.labels     = list(labels)
+        self.threshold  = threshold
+        self.n_features = self.weights.shape[0]
+        # Features with any weight, i.e. seen in training.
+        self._seen = np.abs(self.weights).sum(axis=1) > 0
+        self._ids  = _TokenHashes()
+
+    def features(self, texts: list[str]):
+        """(row, column) indices of the hashed features of each text."""
+        # One split over the whole page; a "\x00" token marks where a text ends.
+        page = " \x00 ".join(texts)
+        if page.count("\x00") != len(texts) - 1:
+            page = " \x00 ".join(t.replace("\x00", " ") for t in texts)
+        tokens = (page + " \x00").lower().translate(_PUNCTUATION).split()
+        if len(self._ids) > 200_000:
+            self._ids.clear()
+        hashes = np.fromiter(map(self._ids.__getitem__, tokens), dtype=np.uint64, count=len(tokens))
+        ends   = hashes == _END
+        rows   = np.cumsum(ends)[~ends]
+        hashes = hashes[~ends]
+        # Bigrams combine the two word hashes, only within one text.
+        same    = rows[1:] == rows[:-1]
+        bigrams = hashes[:-1][same] * np.uint64(1_000_003) + hashes[1:][same] + np.uint64(1)
+        cols    = np.concatenate([hashes, bigrams]) % np.uint64(self.n_features)
+        return np.concatenate([rows, rows[1:][same]]), cols.astype(np.intp)
+
+    def scores(self, rows, cols, n: int):
+        """Raw class scores, shape (n, labels)."""
+        # One gather of whole weight rows and one bincount over (row, class).
+        k   = len(self.labels)
+        idx = (rows[:, None] * k + np.arange(k)).ravel()
+        out = np.bincount(idx, weights=self.weights[cols].ravel(), minlength=n * k)
+        return out.reshape(n, k) + self.bias
+
+    def predict(self, texts: list[str]) -> list[Optional[str]]:
+        if not texts:
+            return []
+        n = len(texts)
+        rows, cols = self.features(texts)
+        z    = self.scores(rows, cols, n)
+        best = z.argmax(axis=1)
+        # The best class's softmax probability is 1 / sum(exp(z - z_best)).
+        sure = np.exp(z - z[np.arange(n), best][:, None]).sum(axis=1) * self.threshold <= 1
+        # A text none of whose features were seen in training only gets the
+        # class prior from the bias; leave it to the rules.
+        sure &= np.bincount(rows, weights=self._seen[cols], minlength=n) > 0
+        return [self.labels[b] if ok else None for b, ok in zip(best.tolist(), sure.tolist())]
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f, version=MODEL_VERSION, weights=self.weights, bias=self.bias,
+                labels=np.array(self.labels), threshold=self.threshold,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNgramModel":
+        if np is None:
+            raise RuntimeError("--type-model needs numpy: pip install numpy")
+        with np.load(path) as data:
+            if int(data["version"]) != MODEL_VERSION:
+                raise ValueError(f"{path}: model version {int(data['version'])}, expected {MODEL_VERSION}")
+            return cls(data["weights"], data["bias"], [str(l) for l in data["labels"]], float(data["threshold"]))
+
+
+def load_type_model(path: str) -> Optional[HashedNgramModel]:
+    """The --type-model file, or None (rules only) if it cannot be used."""
+    if not path:
+        return None
+    try:
+        model = HashedNgramModel.load(path)
+    except (RuntimeError, OSError, ValueError, KeyError) as exc:
+        log.warning("Type model %s not used, classifying by keyword rules only: %s", path, exc)
+        return None
+    log.info("Type model %s loaded (%s, threshold %.2f)", path, "/".join(model.labels), model.threshold)
+    return model
+
+
+def train_model(
+    texts: list[str],
+    labels: list[str],
+    n_features: int = 2 ** 18,
+    epochs: int = 200,
+    l2: float = 1e-4,
+    lr: float = 0.5,
+    threshold: float = 0.7,
+) -> HashedNgramModel:
+    """Full-batch softmax regression with Adagrad steps, in NumPy."""
+    names  = sorted(set(labels))
+    model  = HashedNgramModel(np.zeros((n_features, len(names))), np.zeros(len(names)), names, threshold)
+    n      = len(texts)
+    target = np.zeros((n, len(names)))
+    target[np.arange(n), [names.index(l) for l in labels]] = 1.0
+    rows, cols = model.features(texts)
+    weights = np.zeros((n_features, len(names)))
+    bias    = np.zeros(len(names))
+    g_w     = np.full_like(weights, 1e-8)
+    g_b     = np.full_like(bias, 1e-8)
+    for _ in range(epochs):
+        model.weights, model.bias = weights, bias
+        z = model.scores(rows, cols, n)
+        z = np.exp(z - z.max(axis=1, keepdims=True))
+        err = z / z.sum(axis=1, keepdims=True) - target
+        grad_w = np.empty_like(weights)
+        for c in range(len(names)):
+            grad_w[:, c] = np.bincount(cols, weights=err[rows, c], minlength=n_features)
+        grad_w = grad_w / n + l2 * weights
+        grad_b = err.mean(axis=0)
+        g_w += grad_w ** 2
+        g_b += grad_b ** 2
+        weights = weights - lr * grad_w / np.sqrt(g_w)
+        bias    = bias - lr * grad_b / np.sqrt(g_b)
+    return HashedNgramModel(weights, bias, names, threshold)
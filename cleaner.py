@@ -1,8 +1,11 @@
 import re
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
+from classifier import KeywordClassifier
 from logger import get_logger
+from schema import RECORD_FIELDS, TenderRecord
 
 log = get_logger(__name__)
 
@@ -17,32 +20,14 @@ _DATE_FORMATS = [
     "%d/%m/%Y",
 ]
 
-_TYPE_RULES = [
-    (
-        "Goods",
-        re.compile(
-            r"\b(supply|purchase|procurement|material|equipment|goods|item|"
-            r"glassware|drugs?|medicine|instruments?|furnish)\b",
-            re.I,
-        ),
-    ),
-    (
-        "Services",
-        re.compile(
-            r"\b(service|maintenance|housekeep|security|consultanc|management|"
-            r"operation|O&M|hire|outsourc|facility|software|AMC|annual)\b",
-            re.I,
-        ),
-    ),
-    (
-        "Works",
-        re.compile(
-            r"\b(construct|civil|erect|repair|renovate|road|building|pipeline|"
-            r"bridge|dam|canal|laying|install|work)\b",
-            re.I,
-        ),
-    ),
-]
+# dd-mm-yyyy or dd/mm/yyyy, then optionally " hh:mm" or " hh:mm:ss".
+_DATE_SHAPE = re.compile(r"(\d\d)([-/])(\d\d)\2(\d{4})(?: (\d\d):(\d\d)(?::(\d\d))?)?", re.ASCII)
+
+# Closing dates repeat heavily across tenders, so parsed dates are memoised.
+DATE_CACHE_SIZE = 4096
+
+# Keyword rules per tender type, in priority order (tender_types.json).
+_TYPE_CLASSIFIER = KeywordClassifier.from_file()
 
 _BOILERPLATE = re.compile(
     r"(bid documents? (for|to)|please refer|as per (the )?requirement|"
@@ -50,20 +35,44 @@ _BOILERPLATE = re.compile(
     re.I,
 )
 
+_SPACES     = re.compile(r"  +")
+_ORG_PREFIX = re.compile(r"^[A-Z0-9&\-]+\s*-\s*(.+)")
+_DIGITS     = re.compile(r"(\d+)")
 
 def _clean_text(value: str) -> str:
     if not value:
         return ""
     value = value.replace("\n", " ").replace("\r", " ")
-    value = re.sub(r"  +", " ", value)
+    value = _SPACES.sub(" ", value)
     return value.strip()
 
 
+def _date_from_shape(raw: str) -> Optional[str]:
+    # The zero-padded _DATE_FORMATS shapes are matched in one step instead
+    # of trying each format with strptime. None means "not one of those
+    # shapes"; datetime() still rejects impossible dates with ValueError.
+    m = _DATE_SHAPE.fullmatch(raw)
+    if m is None:
+        return None
+    day, _, month, year, hour, minute, second = m.groups()
+    if year < "1000":
+        return None                     # strftime's %Y padding is platform-specific
+    datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    return f"{year}-{month}-{day}"
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def _parse_date(raw: str) -> Optional[str]:
- 
     raw = _clean_text(raw)
     if not raw:
         return None
+    try:
+        date = _date_from_shape(raw)
+        if date:
+            return date
+    except ValueError:
+        pass
+    # Unpadded or otherwise unusual input: let strptime decide.
     for fmt in _DATE_FORMATS:
         try:
             dt = datetime.strptime(raw, fmt)
@@ -75,16 +84,13 @@ def _parse_date(raw: str) -> Optional[str]:
 
 
 def _classify_tender_type(text: str) -> str:
-    for label, pattern in _TYPE_RULES:
-        if pattern.search(text):
-            return label
-    return "Works"  
+    return _TYPE_CLASSIFIER.classify(text)
 
 
 def _clean_organisation(dept: str) -> str:
    
     dept = _clean_text(dept)
-    m = re.match(r"^[A-Z0-9&\-]+\s*-\s*(.+)", dept)
+    m = _ORG_PREFIX.match(dept)
     if m:
         return m.group(1).strip()
     return dept
@@ -93,7 +99,7 @@ def _clean_organisation(dept: str) -> str:
 def _clean_description(raw: str) -> str:
     desc = _clean_text(raw)
     desc = _BOILERPLATE.sub("", desc).strip()
-    desc = re.sub(r"  +", " ", desc)
+    desc = _SPACES.sub(" ", desc)
     return desc
 
 
@@ -106,12 +112,12 @@ def _parse_value(raw: str) -> Optional[float]:
 
 
 def _parse_doc_count(raw: str) -> int:
-    m = re.search(r"(\d+)", raw or "")
+    m = _DIGITS.search(raw or "")
     return int(m.group(1)) if m else 0
 
 
 
-def clean_record(raw: dict) -> dict:
+def clean_record(raw: dict) -> Optional[TenderRecord]:
     
     tender_id = raw.get("tender_id", "").strip()
     if not tender_id:
@@ -126,30 +132,114 @@ def clean_record(raw: dict) -> dict:
     est_value    = _parse_value(raw.get("estimated_value_raw", ""))
     doc_count    = _parse_doc_count(raw.get("doc_count", ""))
 
-    return {
-        "tender_id":        tender_id,
-        "tender_type":      tender_type,
-        "title":            _clean_text(raw.get("ifb_no", "")),
-        "organisation":     organisation,
-        "publish_date":     None,           # not exposed by this endpoint
-        "closing_date":     closing_date,
-        "description":      description,
-        "source_url":       raw.get("source_url", ""),
-        "estimated_value":  est_value,
-        "attachments":      doc_count,
-        "corrigendum":      _clean_text(raw.get("corrigendum", "")),
-        "raw_html_snippet": raw.get("raw_html_snippet", ""),
+    return TenderRecord(
+        tender_id        = tender_id,
+        tender_type      = tender_type,
+        title            = _clean_text(raw.get("ifb_no", "")),
+        organisation     = organisation,
+        publish_date     = None,            # not exposed by this endpoint
+        closing_date     = closing_date,
+        description      = description,
+        source_url       = raw.get("source_url") or "",
+        estimated_value  = est_value,
+        attachments      = doc_count,
+        corrigendum      = _clean_text(raw.get("corrigendum", "")),
+        raw_html_snippet = raw.get("raw_html_snippet") or "",
+    )
+
+
+def _joined(values: list[str]) -> Optional[str]:
+    # The values of a column as one string, "\x00" between them, so a
+    # replace or regex pass handles the whole batch in one call. None if a
+    # value itself contains "\x00".
+    joined = "\x00".join(values)
+    return joined if joined.count("\x00") == len(values) - 1 else None
+
+
+def _clean_text_column(values: list) -> list[str]:
+    values = [v or "" for v in values]
+    joined = _joined(values)
+    if joined is None:
+        return list(map(_clean_text, values))
+    joined = _SPACES.sub(" ", joined.replace("\n", " ").replace("\r", " "))
+    return [v.strip() for v in joined.split("\x00")]
+
+
+def _clean_description_column(names: list[str]) -> list[str]:
+    # `names` are already _clean_text'ed, as in clean_record.
+    joined = _joined(names)
+    if joined is None:
+        return list(map(_clean_description, names))
+    joined = _SPACES.sub(" ", _BOILERPLATE.sub("", joined))
+    return [d.strip() for d in joined.split("\x00")]
+
+
+def _map_distinct(fn, values: list) -> list:
+    # Departments, dates, values and document counts repeat heavily within
+    # a batch; each distinct one is computed once.
+    results = {v: fn(v) for v in set(values)}
+    return [results[v] for v in values]
+
+
+def _tender_type_column(names: list[str], descriptions: list[str], type_model=None) -> list[str]:
+    # Each distinct name is typed once, like _map_distinct does. With a
+    # model the keyword rules only run on the names it is not sure of.
+    if type_model is None or not names:
+        return _map_distinct(_classify_tender_type, names)
+    first = {}
+    for i, name in enumerate(names):
+        first.setdefault(name, i)
+    labels = dict(zip(first, type_model.predict([descriptions[i] for i in first.values()])))
+    unsure = [name for name, label in labels.items() if label is None]
+    labels.update(zip(unsure, map(_classify_tender_type, unsure)))
+    return [labels[name] for name in names]
+
+
+def clean_columns(raw_list: list[dict], type_model=None) -> tuple[dict[str, list], int]:
+    """
+    clean_records in columnar form: one list per RECORD_FIELDS key, each
+    cleaned across the whole batch at once. Row i of every column is the
+    record clean_record would return for the i-th raw record that has a
+    tender_id. columns_to_records turns the result into TenderRecords.
+    """
+    ids  = [(raw.get("tender_id") or "").strip() for raw in raw_list]
+    keep = [raw for raw, tender_id in zip(raw_list, ids) if tender_id]
+    for raw, tender_id in zip(raw_list, ids):
+        if not tender_id:
+            log.debug("Skipping record with no tender_id (ifb_no=%s)", raw.get("ifb_no"))
+
+    def column(key: str) -> list:
+        return [raw.get(key, "") for raw in keep]
+
+    names        = _clean_text_column(column("name_of_work"))
+    descriptions = _clean_description_column(names)
+    columns = {
+        "tender_id":        [tender_id for tender_id in ids if tender_id],
+        "tender_type":      _tender_type_column(names, descriptions, type_model),
+        "title":            _clean_text_column(column("ifb_no")),
+        "organisation":     _map_distinct(_clean_organisation, column("department")),
+        "publish_date":     [None] * len(keep),
+        "closing_date":     _map_distinct(_parse_date, column("last_submission_raw")),
+        "description":      descriptions,
+        "source_url":       [v or "" for v in column("source_url")],
+        "estimated_value":  _map_distinct(_parse_value, column("estimated_value_raw")),
+        "attachments":      _map_distinct(_parse_doc_count, column("doc_count")),
+        "corrigendum":      _clean_text_column(column("corrigendum")),
+        "raw_html_snippet": [v or "" for v in column("raw_html_snippet")],
     }
+    return columns, len(raw_list) - len(keep)
 
 
-def clean_records(raw_list: list[dict]) -> tuple[list[dict], int]:
-   
-    cleaned = []
-    skipped = 0
-    for raw in raw_list:
-        record = clean_record(raw)
-        if record:
-            cleaned.append(record)
-        else:
-            skipped += 1
-    return cleaned, skipped
+def columns_to_records(columns: dict[str, list]) -> list[TenderRecord]:
+    return [TenderRecord(*row) for row in zip(*(columns[k] for k in RECORD_FIELDS))]
+
+
+def clean_records(raw_list: list[dict], type_model=None) -> tuple[list[TenderRecord], int]:
+    """
+    clean_record over a page, done column by column (clean_columns). With
+    a classifier.HashedNgramModel, the page's descriptions are scored in
+    one batch; the keyword rules only type the records it is not confident
+    about.
+    """
+    columns, skipped = clean_columns(raw_list, type_model)
+    return columns_to_records(columns), skipped
@@ -3,6 +3,12 @@ import os
 import uuid
 
 
+def _page_size(value: str) -> int | str:
+    if value == "auto":
+        return value
+    return int(value)
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         prog="scrape.py",
@@ -31,6 +37,35 @@ def parse_args() -> argparse.Namespace:
         metavar="N",
         help="Number of concurrent fetch workers (keep ≤2 for polite scraping).",
     )
+    parser.add_argument(
+        "--sessions",
+        type=int,
+        default=int(os.environ.get("SESSIONS", "1")),
+        metavar="N",
+        help="Warm portal sessions to spread requests over. Expired sessions "
+             "are re-authenticated in the background.",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=("requests", "http2"),
+        default=os.environ.get("TRANSPORT", "requests"),
+        help="HTTP client. 'http2' multiplexes requests over one connection "
+             "(needs httpx[http2]); both keep --concurrency connections alive.",
+    )
+    parser.add_argument(
+        "--session-cache",
+        default=os.environ.get("SESSION_CACHE", ""),
+        metavar="PATH",
+        help="JSON file that keeps TSESSIONIDs between runs (off by default; "
+             "the file holds live session cookies).",
+    )
+    parser.add_argument(
+        "--session-ttl",
+        type=float,
+        default=float(os.environ.get("SESSION_TTL", "1200")),
+        metavar="SECONDS",
+        help="Ignore cached TSESSIONIDs older than this.",
+    )
     parser.add_argument(
         "--retries",
         type=int,
@@ -38,6 +73,22 @@ def parse_args() -> argparse.Namespace:
         metavar="N",
         help="Max retry attempts per failed request.",
     )
+    parser.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=int(os.environ.get("BREAKER_THRESHOLD", "5")),
+        metavar="N",
+        help="Failures within 30s that open the circuit breaker and pause "
+             "every worker. 0 disables the breaker.",
+    )
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=float(os.environ.get("BREAKER_COOLDOWN", "5")),
+        metavar="SECONDS",
+        help="Initial pause before a single probe request tests the server "
+             "again (doubles while probes keep failing).",
+    )
     parser.add_argument(
         "--timeout",
         type=int,
@@ -68,12 +119,63 @@ def parse_args() -> argparse.Namespace:
         metavar="UA",
         help="User-Agent header sent with every request.",
     )
+    parser.add_argument(
+        "--base-url",
+        default=os.environ.get("BASE_URL", "https://tender.nprocure.com"),
+        metavar="URL",
+        help="Portal base URL. Point at mock_server.py for offline load tests.",
+    )
     parser.add_argument(
         "--page-size",
-        type=int,
+        type=_page_size,
         default=50,
+        metavar="N|auto",
+        help="Records to request per API call. 'auto' measures several sizes "
+             "and keeps the one with the best records/second.",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=int(os.environ.get("PARSE_WORKERS", "1")),
+        metavar="N",
+        help="Worker processes for HTML parsing. 1 parses in-process.",
+    )
+    parser.add_argument(
+        "--parse-cache-size",
+        type=int,
+        default=int(os.environ.get("PARSE_CACHE_SIZE", "10000")),
+        metavar="N",
+        help="Parsed rows kept in memory, keyed by a hash of the raw row, so "
+             "unchanged rows are not parsed twice. 0 disables the cache.",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        default=os.environ.get("PARSE_CACHE", ""),
+        metavar="PATH",
+        help="SQLite file that keeps the parse cache between runs. "
+             "Empty string (default) keeps it in memory only.",
+    )
+    parser.add_argument(
+        "--type-model",
+        default=os.environ.get("TYPE_MODEL", ""),
+        metavar="PATH",
+        help="tender_type model from train_classifier.py (needs numpy). "
+             "Records it is unsure about keep the keyword-rule type.",
+    )
+    parser.add_argument(
+        "--html-backend",
+        choices=("auto", "bs4", "lxml", "selectolax"),
+        default=os.environ.get("HTML_BACKEND", "auto"),
+        help="HTML parser for the tender cells. 'auto' picks lxml, then "
+             "selectolax, then BeautifulSoup, whichever is installed.",
+    )
+    parser.add_argument(
+        "--pipeline-depth",
+        type=int,
+        default=int(os.environ.get("PIPELINE_DEPTH", "4")),
         metavar="N",
-        help="Records to request per API call (max 100).",
+        help="Pages that may wait between the fetch, parse, clean and "
+             "persist stages before the fetcher pauses.",
     )
     parser.add_argument(
         "--dry-run",
@@ -82,6 +184,34 @@ def parse_args() -> argparse.Namespace:
         help="Fetch and parse but do NOT write output or metadata. "
              "Useful for validating connectivity.",
     )
+    parser.add_argument(
+        "--parse-known",
+        action="store_true",
+        default=False,
+        help="Parse every row. By default rows of tenders already in --output "
+             "are skipped before parsing unless their raw content changed.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=False,
+        help="Stop paginating once --stop-after-known consecutive pages hold "
+             "only stored tender_ids, while the pages come newest first.",
+    )
+    parser.add_argument(
+        "--stop-after-known",
+        type=int,
+        default=int(os.environ.get("STOP_AFTER_KNOWN", "2")),
+        metavar="N",
+        help="With --incremental: consecutive all-known pages before stopping.",
+    )
+    parser.add_argument(
+        "--resume",
+        default=None,
+        metavar="RUN_ID",
+        help="Continue an interrupted run from its last checkpointed page "
+             "(reuses that run_id and its metadata row).",
+    )
     parser.add_argument(
         "--version",
         action="version",
@@ -100,11 +230,29 @@ def build_config(args: argparse.Namespace) -> dict:
         "limit":        args.limit,
         "rate_limit":   args.rate_limit,
         "concurrency":  args.concurrency,
+        "sessions":     args.sessions,
+        "transport":    args.transport,
+        "session_cache": args.session_cache,
+        "session_ttl":  args.session_ttl,
         "retries":      args.retries,
+        "breaker_threshold": args.breaker_threshold,
+        "breaker_cooldown":  args.breaker_cooldown,
         "timeout":      args.timeout,
         "output":       args.output,
         "metadata_db":  args.metadata_db,
         "user_agent":   args.user_agent,
-        "page_size":    args.page_size,
+        "base_url":     args.base_url.rstrip("/"),
+        "page_size":    50 if args.page_size == "auto" else args.page_size,
+        "auto_page_size": args.page_size == "auto",
+        "pipeline_depth": args.pipeline_depth,
+        "parse_workers":  args.parse_workers,
+        "html_backend":   args.html_backend,
+        "parse_cache_size": args.parse_cache_size,
+        "parse_cache":    args.parse_cache,
+        "type_model":     args.type_model,
         "dry_run":      args.dry_run,
+        "parse_known":  args.parse_known,
+        "resume":       args.resume,
+        "incremental":  args.incremental,
+        "stop_after_known": args.stop_after_known,
     }
@@ -1,25 +1,33 @@
 import base64
+import itertools
 import json
 import re
 import secrets
+import threading
 import time
 from typing import Iterator
 
 import requests
 import urllib3
+from requests.exceptions import ChunkedEncodingError
 from Crypto.Cipher import AES
 from Crypto.Hash import HMAC, SHA1
 from Crypto.Protocol.KDF import PBKDF2
 from Crypto.Util.Padding import pad
 
+from jsonstream import iter_rows
 from logger import get_logger
+from retry import RETRYABLE_STATUS, CircuitOpenError, RetryPolicy, parse_retry_after, policy_from_config
+from sessions import SessionCache
+from transport import new_http_session
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 log = get_logger(__name__)
 
 BASE_URL    = "https://tender.nprocure.com"
-API_URL     = f"{BASE_URL}/beforeLoginTenderTableList"
+API_PATH    = "/beforeLoginTenderTableList"
+API_URL     = f"{BASE_URL}{API_PATH}"
 HOMEPAGE    = f"{BASE_URL}/"
 
 _PASSPHRASE = base64.b64decode("ejdNcmw=").decode()
@@ -27,24 +35,30 @@ _KEY_B64    = "ejdNcmw="
 _PBKDF2_ITER = 1000
 _KEY_BYTES   = 16
 _BLOCK_SIZE  = 16
+_STREAM_CHUNK = 64 * 1024
 
 
 
-def _aes_encrypt(plaintext: str, salt_hex: str, iv_hex: str) -> str:
-    
-    salt = bytes.fromhex(salt_hex)
-    iv   = bytes.fromhex(iv_hex)
-    key  = PBKDF2(
+def _derive_key(salt: bytes) -> bytes:
+    return PBKDF2(
         _PASSPHRASE.encode(), salt,
         dkLen=_KEY_BYTES,
         count=_PBKDF2_ITER,
         prf=lambda p, s: HMAC.new(p, s, SHA1).digest(),
     )
+
+
+def _encrypt_with_key(plaintext: str, key: bytes, iv: bytes) -> str:
     cipher = AES.new(key, AES.MODE_CBC, iv)
     ct = cipher.encrypt(pad(plaintext.encode("utf-8"), _BLOCK_SIZE))
     return base64.b64encode(ct).decode()
 
 
+def _aes_encrypt(plaintext: str, salt_hex: str, iv_hex: str) -> str:
+    key = _derive_key(bytes.fromhex(salt_hex))
+    return _encrypt_with_key(plaintext, key, bytes.fromhex(iv_hex))
+
+
 def _build_envelope(plain_dict: dict) -> dict:
     plaintext = json.dumps(plain_dict, separators=(",", ":"))
     iv_hex    = secrets.token_hex(_BLOCK_SIZE)
@@ -57,8 +71,55 @@ def _build_envelope(plain_dict: dict) -> dict:
     }
 
 
+class EnvelopeBuilder:
+    """
+    Cheap request envelopes for one scraping session.
+
+    PBKDF2 runs once per pooled salt at construction instead of once per
+    request; every envelope still gets a fresh random IV. The constant
+    _build_req_data skeleton is serialised once and only the offset fields
+    are spliced in, so the plaintext is byte-identical to _build_envelope's.
+    """
+
+    _START_MARK  = 987654321
+    _LENGTH_MARK = 123456789
+
+    def __init__(self, pool_size: int = 4):
+        self._keys = []
+        for _ in range(max(1, pool_size)):
+            salt = secrets.token_bytes(_BLOCK_SIZE)
+            self._keys.append((salt.hex(), _derive_key(salt)))
+        self._cycle = itertools.cycle(self._keys)
+
+        skeleton = json.dumps(
+            _build_req_data(self._START_MARK, self._LENGTH_MARK),
+            separators=(",", ":"),
+        )
+        head, rest = skeleton.split(str(self._START_MARK))
+        mid, tail  = rest.split(str(self._LENGTH_MARK))
+        self._parts = (head, mid, tail)
+
+    def plaintext(self, start: int, length: int) -> str:
+        head, mid, tail = self._parts
+        return f"{head}{int(start)}{mid}{int(length)}{tail}"
+
+    def build(self, start: int, length: int) -> dict:
+        salt_hex, key = next(self._cycle)
+        iv = secrets.token_bytes(_BLOCK_SIZE)
+        return {
+            "jsonData": _encrypt_with_key(self.plaintext(start, length), key, iv),
+            "iv":       iv.hex(),
+            "salt":     salt_hex,
+            "key":      _KEY_B64,
+        }
+
+
 def _build_req_data(display_start: int, display_length: int) -> dict:
-  
+    """
+    DataTables v1.9 request body, as the portal's own page sends it. The
+    sort is on column 0, the free-text IFB No; no column holds a date, so
+    the portal cannot be asked for newest-first (see KnownPageStreak).
+    """
     return {
         "reqData": [
             {"name": "sEcho",          "value": 1},
@@ -83,9 +144,8 @@ def _build_req_data(display_start: int, display_length: int) -> dict:
 
 
 
-def make_session(user_agent: str, timeout: int) -> requests.Session:
-  
-    s = requests.Session()
+def _new_session(user_agent: str, transport: str = "requests", pool_size: int = 10) -> requests.Session:
+    s = new_http_session(transport, pool_size)
     s.verify = False
 
     s.headers.update({
@@ -94,9 +154,12 @@ def make_session(user_agent: str, timeout: int) -> requests.Session:
         "Accept-Language":   "en-US,en;q=0.9",
         "Connection":        "keep-alive",
     })
+    return s
+
 
+def _handshake(s: requests.Session, timeout: int, base_url: str) -> str:
     session_id = ""
-    for url in [HOMEPAGE, f"{BASE_URL}/tenderSearchResult"]:
+    for url in [f"{base_url}/", f"{base_url}/tenderSearchResult"]:
         try:
             resp = s.get(url, timeout=timeout)
             log.info("GET %s → HTTP %d", url, resp.status_code)
@@ -122,65 +185,171 @@ def make_session(user_agent: str, timeout: int) -> requests.Session:
             "TSESSIONID not found — API calls will likely return HTTP 500. "
             "Set TSESSIONID env var or ensure the site is reachable."
         )
-        session_id = ""
+    return session_id
+
 
+def _apply_api_headers(s: requests.Session, session_id: str, base_url: str) -> None:
     s.headers.update({
         "Accept":            "application/json, text/javascript, */*; q=0.01",
         "Content-Type":      "application/json",
         "X-Requested-With":  "XMLHttpRequest",
-        "Origin":            BASE_URL,
-        "Referer":           HOMEPAGE,
+        "Origin":            base_url,
+        "Referer":           f"{base_url}/",
         "Cookie":            f"TSESSIONID={session_id}; {session_id}",
     })
 
+
+def _session_accepted(s: requests.Session, timeout: int, base_url: str) -> bool:
+    """One-row API call: does the portal still accept this session's cookie?"""
+    payload = _build_envelope(_build_req_data(0, 1))
+    try:
+        resp = s.post(base_url + API_PATH, json=payload, timeout=timeout)
+    except requests.RequestException as exc:
+        log.debug("Session probe failed: %s", exc)
+        return False
+    return resp.status_code == 200
+
+
+def make_session(
+    user_agent: str,
+    timeout: int,
+    base_url: str = BASE_URL,
+    cache: SessionCache | None = None,
+    transport: str = "requests",
+    pool_size: int = 10,
+) -> requests.Session:
+    """
+    A requests.Session carrying a portal TSESSIONID. With a SessionCache, a
+    recent cookie from an earlier run is tried first (one small probe
+    request); the two-GET handshake only runs when the portal rejects it.
+    `transport` and `pool_size` pick the HTTP client (see transport.py).
+    """
+    if cache is not None:
+        while True:
+            cached = cache.checkout(base_url)
+            if not cached:
+                break
+            s = _new_session(user_agent, transport, pool_size)
+            _apply_api_headers(s, cached, base_url)
+            if _session_accepted(s, timeout, base_url):
+                log.info("Reusing cached TSESSIONID %s…", cached[:8])
+                return s
+            log.info("Cached TSESSIONID %s… rejected", cached[:8])
+            cache.discard(base_url, cached)
+            s.close()
+
+    s = _new_session(user_agent, transport, pool_size)
+    session_id = _handshake(s, timeout, base_url)
+    _apply_api_headers(s, session_id, base_url)
+    if cache is not None and session_id:
+        cache.store(base_url, session_id)
     return s
 
 
 
+def _read_page(resp: requests.Response) -> tuple[dict, int]:
+    """
+    Decode a streamed page response row by row (jsonstream.iter_rows)
+    rather than via resp.json(), which keeps the raw body, its decoded text
+    and the parsed rows in memory at once. Returns the page dict and the
+    number of body bytes read.
+    """
+    nbytes = 0
+
+    def chunks():
+        nonlocal nbytes
+        for chunk in resp.iter_content(_STREAM_CHUNK):
+            nbytes += len(chunk)
+            yield chunk
+
+    page = {}
+    try:
+        page["data"] = list(iter_rows(chunks(), page))
+    finally:
+        resp.close()
+    return page, nbytes
+
+
 def fetch_page(
     session: requests.Session,
     start: int,
     length: int,
     timeout: int,
     retries: int,
+    envelopes: EnvelopeBuilder | None = None,
+    api_url: str = API_URL,
+    stats: dict | None = None,
+    policy: RetryPolicy | None = None,
 ) -> dict:
-   
-    plain   = _build_req_data(start, length)
-    payload = _build_envelope(plain)
+    """
+    POST one page request, retrying 429/5xx and network errors. Delays and
+    the shared circuit breaker come from `policy` (a plain jittered
+    RetryPolicy(retries) if omitted). If `stats` is given it is filled with
+    the successful attempt's `elapsed` seconds and response `bytes`, plus
+    the number of 5xx `errors` seen along the way.
+    """
+    if stats is not None:
+        stats.update(elapsed=0.0, bytes=0, errors=0)
+    if policy is None:
+        policy = RetryPolicy(retries)
+    retries = policy.retries
+
+    if envelopes is not None:
+        payload = envelopes.build(start, length)
+    else:
+        payload = _build_envelope(_build_req_data(start, length))
 
     last_exc = None
-    for attempt in range(1, retries + 2):        
+    delay    = policy.base
+    for attempt in range(1, retries + 2):
+        retry_after = None
+        policy.before_attempt()
         try:
-            resp = session.post(API_URL, json=payload, timeout=timeout)
+            t0   = time.perf_counter()
+            resp = session.post(api_url, json=payload, timeout=timeout, stream=True)
 
             if resp.status_code == 200:
-                data = resp.json()
+                data, nbytes = _read_page(resp)
+                policy.record_success()
+                if stats is not None:
+                    stats["elapsed"] = time.perf_counter() - t0
+                    stats["bytes"]   = nbytes
                 log.debug(
                     "Page start=%d length=%d → %d records in response",
                     start, length, len(data.get("data", [])),
                 )
                 return data
 
-            if resp.status_code in (500, 502, 503, 504):
+            if resp.status_code in RETRYABLE_STATUS:
                 log.warning(
                     "HTTP %d at start=%d (attempt %d/%d) — retrying",
                     resp.status_code, start, attempt, retries + 1,
                 )
-                last_exc = requests.HTTPError(f"HTTP {resp.status_code}")
+                last_exc    = requests.HTTPError(f"HTTP {resp.status_code}")
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                policy.record_failure()
+                if stats is not None:
+                    stats["errors"] += 1
+                resp.content            # drain the error body so the connection is reused
             else:
+                # Any other answer means the server is up; don't hold the
+                # breaker half-open on a 4xx.
+                policy.record_success()
+                resp.close()
                 resp.raise_for_status()
 
-        except (requests.Timeout, requests.ConnectionError) as exc:
+        except (requests.Timeout, requests.ConnectionError, ChunkedEncodingError) as exc:
             log.warning(
                 "Network error at start=%d (attempt %d/%d): %s",
                 start, attempt, retries + 1, exc,
             )
             last_exc = exc
+            policy.record_failure()
 
         if attempt <= retries:
-            wait = 2 ** attempt
-            log.info("Backing off %ds before retry…", wait)
-            time.sleep(wait)
+            delay = policy.next_delay(delay, retry_after)
+            log.info("Backing off %.1fs before retry…", delay)
+            time.sleep(delay)
 
     raise RuntimeError(
         f"All {retries + 1} attempts failed for start={start}"
@@ -188,19 +357,133 @@ def fetch_page(
 
 
 
+class PageSizeTuner:
+    """
+    --page-size auto: pick iDisplayLength by measurement.
+
+    Each candidate size is tried `samples` times, smallest first, and the
+    one with the most records per second of server time wins. A size that
+    draws 5xx responses caps the search (and the chosen size) below it; a
+    short page that is not the end of the list means the server clamps
+    iDisplayLength, so the cap drops to what it actually returned.
+    """
+
+    CANDIDATES = (25, 50, 75, 100, 150, 200)
+
+    def __init__(self, candidates: tuple[int, ...] = CANDIDATES, samples: int = 1):
+        self.candidates = sorted(candidates)
+        self.samples    = samples
+        self.ceiling    = self.candidates[-1]
+        self.chosen: int | None = None
+        self._rates: dict[int, list[float]] = {size: [] for size in self.candidates}
+
+    def _allowed(self) -> list[int]:
+        allowed = [size for size in self.candidates if size <= self.ceiling]
+        return allowed or [self.ceiling]
+
+    def next_size(self) -> int:
+        if self.chosen is not None:
+            return self.chosen
+        for size in self._allowed():
+            if len(self._rates.get(size, [])) < self.samples:
+                return size
+        self._settle()
+        return self.chosen
+
+    def _settle(self) -> None:
+        measured = {
+            size: sum(rates) / len(rates)
+            for size, rates in self._rates.items()
+            if rates and size <= self.ceiling
+        }
+        self.chosen = max(measured, key=measured.get) if measured else self._allowed()[0]
+        log.info(
+            "Page size settled at %d (records/s by size: %s)",
+            self.chosen, {k: round(v, 1) for k, v in sorted(measured.items())},
+        )
+
+    def _lower_ceiling(self, limit: int, reason: str) -> None:
+        if limit >= self.ceiling:
+            return
+        self.ceiling = max(1, limit)
+        log.warning("Page size capped at %d: %s", self.ceiling, reason)
+        if self.chosen is not None and self.chosen > self.ceiling:
+            self.chosen = self._allowed()[-1]
+            log.info("Page size backed off to %d", self.chosen)
+
+    def failed(self, size: int) -> bool:
+        """A request at `size` exhausted its retries. True if a smaller size is left to try."""
+        smaller = [c for c in self.candidates if c < size]
+        if not smaller:
+            return False
+        self._lower_ceiling(smaller[-1], f"request failed at size {size}")
+        return True
+
+    def record(self, size: int, records: int, expected: int, stats: dict) -> None:
+        if stats.get("errors"):
+            smaller = [c for c in self.candidates if c < size]
+            self._lower_ceiling(smaller[-1] if smaller else size,
+                                f"{stats['errors']} server error(s) at size {size}")
+        if 0 < records < expected:
+            self._lower_ceiling(records, f"server returned {records} of {expected} rows")
+
+        if records and stats.get("elapsed"):
+            if size in self._rates:
+                self._rates[size].append(records / stats["elapsed"])
+            log.debug(
+                "size=%d: %d records in %.3fs (%.0f rec/s, %.0f bytes/record)",
+                size, records, stats["elapsed"], records / stats["elapsed"],
+                stats["bytes"] / records,
+            )
+
+
+def defer_page(failed: list[tuple[int, int]], start: int, size: int, exc: Exception) -> None:
+    """Queue a page that ran out of retries for retry_failed_pages."""
+    if isinstance(exc, CircuitOpenError):
+        raise exc
+    log.error("Giving up on start=%d for now (%s) -- deferred to the retry pass", start, exc)
+    failed.append((start, size))
+
+
 def iter_raw_pages(
     session: requests.Session,
     config: dict,
-) -> Iterator[tuple[list[dict], int]]:
-   
+    failed: list[tuple[int, int]] | None = None,
+    stop: threading.Event | None = None,
+) -> Iterator[tuple[list[dict], int, int]]:
+    """
+    Yield (raw_items, total, offset) per page, starting at
+    config["start_offset"] (0 unless resuming a checkpointed run).
+
+    With a `failed` list, a page that exhausts its retries is appended to it
+    as (offset, size) and the crawl carries on; without one it raises. The
+    first page is always fatal, since it carries the record count. Once
+    `stop` is set, no further page is requested.
+    """
     limit     = config["limit"]
     page_size = config["page_size"]
     rate_limit = config["rate_limit"]
     timeout   = config["timeout"]
     retries   = config["retries"]
-
-    log.info("Fetching page 1 (start=0, length=%d)…", page_size)
-    data  = fetch_page(session, 0, page_size, timeout, retries)
+    first     = config.get("start_offset", 0)
+    api_url   = config.get("base_url", BASE_URL) + API_PATH
+    envelopes = EnvelopeBuilder()
+    tuner     = PageSizeTuner() if config.get("auto_page_size") else None
+    policy    = policy_from_config(config)
+    stats     = {}
+
+    def fetch(start: int) -> tuple[dict, int]:
+        while True:
+            size = tuner.next_size() if tuner else page_size
+            try:
+                data = fetch_page(session, start, size, timeout, retries, envelopes, api_url, stats, policy)
+                return data, size
+            except RuntimeError:
+                if not (tuner and tuner.failed(size)):
+                    raise
+
+    log.info("Fetching first page (start=%d)…", first)
+    data, size = fetch(first)
     total = data.get("iTotalRecords", 0)
     log.info("Server reports %d total tenders", total)
 
@@ -208,13 +491,67 @@ def iter_raw_pages(
         total = min(total, limit)
         log.info("--limit applied: will fetch at most %d tenders", total)
 
-    yield data.get("data", []), total
+    rows = data.get("data", [])
+    if tuner:
+        tuner.record(size, len(rows), min(size, total - first), stats)
+    yield rows, total, first
 
-    start = page_size
+    # In auto mode the size can change between requests (and the server
+    # may clamp it), so advance by the rows actually returned.
+    start = first + (len(rows) if tuner else page_size)
     while start < total:
         time.sleep(rate_limit)
-        batch_end = min(start + page_size, total)
-        log.info("Fetching records %d–%d / %d…", start, batch_end, total)
-        data = fetch_page(session, start, page_size, timeout, retries)
-        yield data.get("data", []), total
-        start += page_size
+        if stop is not None and stop.is_set():
+            log.info("Stop requested -- not fetching from %d", start)
+            return
+        log.info("Fetching records from %d / %d…", start, total)
+        try:
+            data, size = fetch(start)
+        except RuntimeError as exc:
+            if failed is None:
+                raise
+            size = tuner.next_size() if tuner else page_size
+            defer_page(failed, start, size, exc)
+            start += size
+            continue
+        rows = data.get("data", [])
+        if tuner:
+            tuner.record(size, len(rows), min(size, total - start), stats)
+            if not rows:
+                log.warning("Empty page at start=%d before reaching %d -- stopping", start, total)
+                return
+        yield rows, total, start
+        start += len(rows) if tuner else page_size
+
+
+def retry_failed_pages(
+    session: requests.Session,
+    config: dict,
+    failed: list[tuple[int, int]],
+    total: int,
+) -> Iterator[tuple[list[dict], int, int]]:
+    """
+    Second pass over the pages in `failed`, one at a time. Recovered pages
+    are yielded like iter_raw_pages does; the ones that fail again are left
+    in `failed`.
+    """
+    timeout   = config["timeout"]
+    api_url   = config.get("base_url", BASE_URL) + API_PATH
+    envelopes = EnvelopeBuilder()
+    policy    = policy_from_config(config)
+
+    pending = sorted(failed)
+    failed.clear()
+    for start, size in pending:
+        time.sleep(config["rate_limit"])
+        log.info("Retrying deferred page start=%d length=%d…", start, size)
+        try:
+            data = fetch_page(session, start, size, timeout, policy.retries, envelopes, api_url, None, policy)
+        except RuntimeError as exc:
+            log.error("Deferred page start=%d failed again: %s", start, exc)
+            failed.append((start, size))
+            if isinstance(exc, CircuitOpenError):
+                failed.extend(p for p in pending if p[0] > start)
+                return
+            continue
+        yield data.get("data", []), total, start
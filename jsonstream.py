@@ -0,0 +1,100 @@
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+_WS      = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class StreamDecodeError(ValueError):
+    """The response body is not the JSON object iter_rows expects."""
+
+
+class _Buffer:
+    """Text decoded so far from a byte-chunk iterator, consumed left to right."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks  = iter(chunks)
+        self._utf8    = codecs.getincrementaldecoder("utf-8")()
+        self.text     = ""
+        self.pos      = 0
+        self.eof      = False
+
+    def more(self) -> bool:
+        if self.eof:
+            return False
+        # Drop what has been consumed so the buffer holds about one row.
+        if self.pos:
+            self.text = self.text[self.pos:]
+            self.pos  = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.text += self._utf8.decode(chunk)
+                return True
+        self.text += self._utf8.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WS.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                raise StreamDecodeError("unexpected end of response body")
+
+    def expect(self, chars: str) -> str:
+        ch = self.peek()
+        if ch not in chars:
+            raise StreamDecodeError(f"expected {chars!r} at offset {self.pos}, got {ch!r}")
+        self.pos += 1
+        return ch
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.more():
+                    raise
+                continue
+            # A number (or literal) that ends exactly at the buffer edge may
+            # continue in the next chunk: only trust it once more text arrives.
+            if end == len(self.text) and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_rows(chunks: Iterable[bytes], meta: dict, key: str = "data") -> Iterator[Any]:
+    """
+    Decode a top-level JSON object from `chunks`, yielding each element of
+    its `key` array as soon as it is complete. Every other member (e.g.
+    iTotalRecords) is stored in `meta` as it is read, so totals sent ahead
+    of the array are available before the first row.
+    """
+    buf = _Buffer(chunks)
+    buf.expect("{")
+    if buf.peek() == "}":
+        buf.pos += 1
+        return
+    while True:
+        if buf.peek() != '"':
+            raise StreamDecodeError(f"expected a member name at offset {buf.pos}")
+        name = buf.value()
+        buf.expect(":")
+        if name == key and buf.peek() == "[":
+            buf.pos += 1
+            if buf.peek() == "]":
+                buf.pos += 1
+            else:
+                while True:
+                    yield buf.value()
+                    if buf.expect(",]") == "]":
+                        break
+        else:
+            meta[name] = buf.value()
+        if buf.expect(",}") == "}":
+            return
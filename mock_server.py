@@ -0,0 +1,426 @@
+"""
+mock_server.py
+--------------
+Local stand-in for tender.nprocure.com, for offline and load testing.
+
+Implements the two homepage GETs that hand out TSESSIONID (plus the odd
+`null` cookie) and POST /beforeLoginTenderTableList, decrypting the
+AES/PBKDF2 envelope the same way the portal's AesUtil.js does and serving
+DataTables v1.9 rows built from synthetic HTML.
+
+Usage:
+    python mock_server.py --port 8080 --total 4000
+    python mock_server.py --latency 0.2 --error-rate 0.05 --burst-every 100 --burst-length 5
+    python scrape.py --base-url http://127.0.0.1:8080 --rate-limit 0 --concurrency 4 --dry-run
+"""
+
+import argparse
+import base64
+import json
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Crypto.Cipher import AES
+from Crypto.Hash import HMAC, SHA1
+from Crypto.Protocol.KDF import PBKDF2
+from Crypto.Util.Padding import unpad
+
+import logger as _logger_mod
+
+try:
+    log = _logger_mod.get_logger("mock_server")
+except RuntimeError:                    # run as a script rather than imported
+    _logger_mod.setup_logger("mock")
+    log = _logger_mod.get_logger("mock_server")
+
+API_PATH = "/beforeLoginTenderTableList"
+
+_DEPARTMENTS = [
+    "R&B-R&B Division, Mahisagar",
+    "AMC-Cattle Nuisance Control Department - Ahmedabad",
+    "EDUCATION-L. M. College of Pharmacy - Ahmedabad",
+    "GWSSB-Public Health Circle - Junagadh",
+    "HEALTH-Civil Hospital - Rajkot",
+]
+
+_WORKS = [
+    "Renovation and Repairing work of Emergency Exit at I.T.I. Khanpur",
+    "Supply of drugs, medicine and instruments for veterinary staff",
+    "Provide service for College Security Services and housekeeping services",
+    "Construction of approach road and pipeline laying at Village Vadgam",
+    "Annual maintenance contract for computer hardware and software",
+    "Purchase of laboratory glassware items",
+]
+
+_ROW_TEMPLATE = """
+<html><body>
+<span style=color:#f44336; >{department}
+<form action='/view-nit-home' method='POST' target='_blank'>
+<input type='hidden' name='tenderid' value='{tender_id}'/>
+<a href='#' id='tenderInProgress'>Tender Id :{tender_id}</a>
+</form></span>
+<span style=color:#FF9933; >
+<form action='/view-nit-home' method='POST'>
+<input type='hidden' name='tenderid' value='{tender_id}'/>
+<a href='#'><strong style='color: maroon;'>Name Of Work :</strong>
+{name_of_work}</a>
+</form></span>{corrigendum}
+<p style=color:#FF9933;> Estimated Contract Value : {value}
+<p style=color:#000000;> Last Date &amp; Time For Submission : {last_date}
+</body></html>
+"""
+
+_DOC_TEMPLATE = """
+<form action='/view-nit-document' method='POST'>
+<input type='hidden' name='tenderid' value='{tender_id}'/>
+<a href='#'>Total No:{docs}</a>
+</form>
+"""
+
+
+def synthetic_row(index: int, first_id: int = 270000) -> dict:
+    """Deterministic DataTables row shaped like the fixtures in tests/conftest.py."""
+    tender_id   = first_id + index
+    corrigendum = ""
+    if index % 7 == 0:
+        corrigendum = f"\n<p style=color:#000000;> Corrigendum : Date extended ({index % 5 + 1})"
+    html = _ROW_TEMPLATE.format(
+        department   = _DEPARTMENTS[index % len(_DEPARTMENTS)],
+        tender_id    = tender_id,
+        name_of_work = _WORKS[index % len(_WORKS)],
+        corrigendum  = corrigendum,
+        value        = f"{(index * 7919) % 9000000 + 1000:.2f}" if index % 4 else "0.00",
+        last_date    = f"{index % 28 + 1:02d}-{index % 12 + 1:02d}-2026 18:00:00",
+    )
+    return {
+        "1": f"{index % 90 + 1} of 2025-26",
+        "2": html,
+        "3": _DOC_TEMPLATE.format(tender_id=tender_id, docs=index % 12),
+    }
+
+
+# Pathological cell contents for parser stress tests, each built to `n`
+# characters: labels with no terminator, floods of "<" that never close,
+# unbalanced nesting, runs of whitespace after a label.
+ADVERSARIAL_CELLS = {
+    "name_no_end":    lambda n: "Name Of Work :" + "x" * (n - 14),
+    "label_flood":    lambda n: ("Name Of Work : Corrigendum : Last Date Tender Id " * n)[:n],
+    "label_spaces":   lambda n: "Tender Id" + " " * (n - 10) + ":",
+    "corrigendum_ws": lambda n: "Corrigendum :" + " \n" * ((n - 13) // 2),
+    "open_inputs":    lambda n: ("<input " * n)[:n],
+    "tenderid_attrs": lambda n: ("<input name=tenderid " + "a=b " * n)[:n],
+    "nested_spans":   lambda n: ("<span style=color:#f44336;>" * n)[:n],
+    "open_paras":     lambda n: ("<p>" * n)[:n],
+    "lt_flood":       lambda n: "<" * n,
+    "amp_flood":      lambda n: "&" * n,
+    "date_digits":    lambda n: "Last Date & Time For Submission : " + ("1 " * n)[:n - 34],
+}
+
+
+def adversarial_row(kind: str, size: int) -> dict:
+    """A DataTables row whose html_cell and doc_cell are ADVERSARIAL_CELLS[kind] at `size` chars."""
+    cell = ADVERSARIAL_CELLS[kind](size)
+    return {"1": f"ADV-{kind}", "2": cell, "3": cell}
+
+
+@lru_cache(maxsize=256)
+def _derive_key(passphrase: bytes, salt: bytes) -> bytes:
+    return PBKDF2(
+        passphrase, salt,
+        dkLen=16,
+        count=1000,
+        prf=lambda p, s: HMAC.new(p, s, SHA1).digest(),
+    )
+
+
+def decrypt_envelope(envelope: dict) -> dict:
+    """Reverse of fetcher._build_envelope: passphrase comes from the `key` field."""
+    passphrase = base64.b64decode(envelope["key"])
+    key    = _derive_key(passphrase, bytes.fromhex(envelope["salt"]))
+    cipher = AES.new(key, AES.MODE_CBC, bytes.fromhex(envelope["iv"]))
+    plain  = unpad(cipher.decrypt(base64.b64decode(envelope["jsonData"])), 16)
+    return json.loads(plain.decode("utf-8"))
+
+
+
+class PortalState:
+    """Dataset, session table and failure knobs shared by all handler threads."""
+
+    def __init__(
+        self,
+        total: int = 500,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        burst_every: int = 0,
+        burst_length: int = 0,
+        cookie_ttl: float = 0.0,
+        row_latency: float = 0.0,
+        max_length: int = 0,
+        fail_above: int = 0,
+        retry_after: float = 0.0,
+        connect_latency: float = 0.0,
+        adversarial_every: int = 0,
+        adversarial_size: int = 100_000,
+        newest_first: bool = False,
+        seed: int | None = None,
+    ):
+        self.total        = total
+        self.latency      = latency
+        self.jitter       = jitter
+        self.error_rate   = error_rate
+        self.burst_every  = burst_every
+        self.burst_length = burst_length
+        self.cookie_ttl   = cookie_ttl
+        self.row_latency  = row_latency
+        self.max_length   = max_length
+        self.fail_above   = fail_above
+        self.retry_after  = retry_after
+        self.connect_latency = connect_latency
+        self.adversarial_every = adversarial_every
+        self.adversarial_size  = adversarial_size
+        self.newest_first      = newest_first
+
+        self.sessions: dict[str, float] = {}
+        self.requests  = 0
+        self.served    = 0
+        self.rejected  = 0
+        self.connections = 0
+        self._rng      = random.Random(seed)
+        self._lock     = threading.Lock()
+
+    def new_session(self) -> str:
+        session_id = secrets.token_hex(16).upper()
+        with self._lock:
+            self.sessions[session_id] = time.monotonic()
+        return session_id
+
+    def session_valid(self, cookie_header: str) -> bool:
+        m = re.search(r"TSESSIONID=([0-9A-F]+)", cookie_header or "", re.I)
+        if not m:
+            return False
+        session_id = m.group(1)
+        # The portal only accepts the `TSESSIONID=VALUE; VALUE` form.
+        if f"; {session_id}" not in cookie_header:
+            return False
+        with self._lock:
+            issued = self.sessions.get(session_id)
+        if issued is None:
+            return False
+        return not self.cookie_ttl or time.monotonic() - issued <= self.cookie_ttl
+
+    def next_failure(self) -> int | None:
+        """Status code to fail this request with, or None to serve it."""
+        with self._lock:
+            n = self.requests
+            self.requests += 1
+            if self.burst_every and n % self.burst_every >= self.burst_every - self.burst_length:
+                return 503
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return 500
+        return None
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def delay(self) -> float:
+        with self._lock:
+            return self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def row(self, index: int) -> dict:
+        if self.adversarial_every and index % self.adversarial_every == self.adversarial_every - 1:
+            kinds = list(ADVERSARIAL_CELLS)
+            return adversarial_row(kinds[index // self.adversarial_every % len(kinds)], self.adversarial_size)
+        return synthetic_row(index)
+
+    def page(self, start: int, length: int) -> list[dict]:
+        # Rows come in listing order whatever the request's sort fields say:
+        # oldest tender first, or newest first with newest_first.
+        start = max(0, start)
+        end   = min(self.total, start + max(0, length))
+        if self.newest_first:
+            return [self.row(self.total - 1 - i) for i in range(start, end)]
+        return [self.row(i) for i in range(start, end)]
+
+
+class PortalHandler(BaseHTTPRequestHandler):
+
+    server_version   = "Apache"
+    protocol_version = "HTTP/1.1"
+    state: PortalState
+
+    def setup(self):
+        super().setup()
+        self.state.count("connections")
+        if self.state.connect_latency:
+            time.sleep(self.state.connect_latency)     # stands in for a TLS handshake
+
+    def log_message(self, fmt, *args):
+        log.debug("%s %s", self.address_string(), fmt % args)
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/html",
+              cookies: list[str] | None = None, headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        for cookie in cookies or []:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/tenderSearchResult"):
+            self._send(404)
+            return
+        session_id = self.state.new_session()
+        self._send(200, b"<html><body>nprocure mock</body></html>", cookies=[
+            f"TSESSIONID={session_id}; Path=/; HttpOnly",
+            "null; Path=/",
+        ])
+
+    def do_POST(self):
+        if self.path != API_PATH:
+            self._send(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body   = self.rfile.read(length)
+
+        delay = self.state.delay()
+        if delay:
+            time.sleep(delay)
+
+        if not self.state.session_valid(self.headers.get("Cookie", "")):
+            self.state.count("rejected")
+            self._send(500, b"Session expired")
+            return
+
+        status = self.state.next_failure()
+        if status:
+            headers = None
+            if status == 503 and self.state.retry_after:
+                headers = {"Retry-After": f"{self.state.retry_after:g}"}
+            self._send(status, b"Service unavailable", headers=headers)
+            return
+
+        try:
+            plain  = decrypt_envelope(json.loads(body))
+            params = {e["name"]: e["value"] for e in plain["reqData"]}
+            start  = int(params["iDisplayStart"])
+            size   = int(params["iDisplayLength"])
+        except Exception as exc:
+            # The real portal answers a malformed envelope with a bare 500.
+            log.debug("Bad envelope: %s", exc)
+            self._send(500, b"Internal Server Error")
+            return
+
+        if self.state.fail_above and size > self.state.fail_above:
+            self._send(503, b"Service unavailable")
+            return
+        if self.state.max_length:
+            size = min(size, self.state.max_length)
+        if self.state.row_latency:
+            time.sleep(self.state.row_latency * max(0, min(size, self.state.total - start)))
+
+        payload = {
+            "sEcho":                params.get("sEcho", 1),
+            "iTotalRecords":        self.state.total,
+            "iTotalDisplayRecords": self.state.total,
+            "data":                 self.state.page(start, size),
+        }
+        self.state.count("served")
+        self._send(200, json.dumps(payload).encode("utf-8"), "application/json")
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, **knobs) -> ThreadingHTTPServer:
+    state   = PortalState(**knobs)
+    handler = type("BoundPortalHandler", (PortalHandler,), {"state": state})
+    server  = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def start_in_thread(**knobs) -> tuple[ThreadingHTTPServer, str]:
+    """Start a server on a free port in a daemon thread; returns (server, base_url)."""
+    server = make_server(**knobs)
+    threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05},
+        daemon=True, name="mock-portal",
+    ).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        prog="mock_server.py",
+        description="Local stand-in for the nprocure tender list API",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--total", type=int, default=4000, help="Tenders in the synthetic list.")
+    ap.add_argument("--latency", type=float, default=0.0, metavar="SECONDS",
+                    help="Fixed delay added to every API response.")
+    ap.add_argument("--jitter", type=float, default=0.0, metavar="SECONDS",
+                    help="Extra uniform random delay on top of --latency.")
+    ap.add_argument("--error-rate", type=float, default=0.0, metavar="P",
+                    help="Probability that an API call returns HTTP 500.")
+    ap.add_argument("--burst-every", type=int, default=0, metavar="N",
+                    help="Every N API calls, return a burst of 503s.")
+    ap.add_argument("--burst-length", type=int, default=0, metavar="N",
+                    help="Length of each 503 burst.")
+    ap.add_argument("--cookie-ttl", type=float, default=0.0, metavar="SECONDS",
+                    help="Expire TSESSIONID after this long (0 = never).")
+    ap.add_argument("--row-latency", type=float, default=0.0, metavar="SECONDS",
+                    help="Extra delay per row served (models server-side page cost).")
+    ap.add_argument("--max-length", type=int, default=0, metavar="N",
+                    help="Silently clamp iDisplayLength to N (0 = no clamp).")
+    ap.add_argument("--fail-above", type=int, default=0, metavar="N",
+                    help="Return 503 for any iDisplayLength above N (0 = never).")
+    ap.add_argument("--retry-after", type=float, default=0.0, metavar="SECONDS",
+                    help="Send Retry-After with burst 503s (0 = omit).")
+    ap.add_argument("--connect-latency", type=float, default=0.0, metavar="SECONDS",
+                    help="Delay before serving a new TCP connection (models TLS setup).")
+    ap.add_argument("--adversarial-every", type=int, default=0, metavar="N",
+                    help="Replace every Nth row with a pathological cell (0 = never).")
+    ap.add_argument("--adversarial-size", type=int, default=100_000, metavar="CHARS",
+                    help="Size of each pathological cell.")
+    ap.add_argument("--newest-first", action="store_true",
+                    help="List the newest tenders first (default: oldest first).")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    server = make_server(
+        args.host, args.port,
+        total=args.total, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, burst_every=args.burst_every,
+        burst_length=args.burst_length, cookie_ttl=args.cookie_ttl,
+        row_latency=args.row_latency, max_length=args.max_length,
+        fail_above=args.fail_above, retry_after=args.retry_after,
+        connect_latency=args.connect_latency,
+        adversarial_every=args.adversarial_every, adversarial_size=args.adversarial_size,
+        newest_first=args.newest_first, seed=args.seed,
+    )
+    log.info("Mock portal on http://%s:%d (%d tenders)", args.host, args.port, args.total)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
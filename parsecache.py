@@ -0,0 +1,176 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import parser
+from logger import get_logger
+
+log = get_logger(__name__)
+
+
+def _parser_version() -> str:
+    # Cached records are only valid for the parser that produced them, so
+    # any edit to parser.py starts a fresh cache instead of serving stale
+    # fields. ParseCache adds the HTML backend to this tag.
+    with open(parser.__file__, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+PARSER_VERSION = _parser_version()
+
+
+def row_key(item: dict) -> str:
+    """Hash of the cells parse_raw_record reads."""
+    h = hashlib.sha1()
+    for cell in ("1", "2", "3"):
+        h.update((item.get(cell) or "").encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS parse_cache (
+    row_key             TEXT PRIMARY KEY,  -- row_key() of the raw row
+    parser_version      TEXT NOT NULL,     -- PARSER_VERSION:backend that parsed it
+    record              TEXT NOT NULL,     -- parse_raw_record result as JSON
+    created_at          TEXT NOT NULL
+);
+"""
+
+
+class ParseCache:
+    """
+    parse_raw_record results keyed by a hash of the raw row (--parse-cache-size
+    entries in an in-process LRU, optionally backed by a SQLite file that
+    survives between runs). Rows whose cells are unchanged come back from
+    the cache instead of being parsed again; rows that fail to parse are
+    never cached. Entries from another parser version or HTML backend are
+    dropped when the file is opened.
+    """
+
+    def __init__(self, size: int = 10000, db_path: str = "", backend: Optional[str] = None):
+        self.size      = max(1, size)
+        self.version   = f"{PARSER_VERSION}:{parser.resolve_backend(backend)}"
+        self.hits      = 0
+        self.disk_hits = 0
+        self.misses    = 0
+        self.evictions = 0
+        self._lru: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db   = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(_CREATE_TABLE)
+                stale = self._db.execute(
+                    "DELETE FROM parse_cache WHERE parser_version != ?", (self.version,),
+                ).rowcount
+                self._db.commit()
+                if stale:
+                    log.info("Dropped %d parse cache entries from another parser or backend", stale)
+            except sqlite3.Error as exc:
+                log.warning("Parse cache %s unavailable, using memory only: %s", db_path, exc)
+                self._db = None
+
+    def _remember(self, key: str, record: dict) -> None:
+        self._lru[key] = record
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.size:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, keys: list[str]) -> dict[str, dict]:
+        if self._db is None or not keys:
+            return {}
+        found = {}
+        try:
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT row_key, record FROM parse_cache WHERE row_key IN ({','.join('?' * len(part))})",
+                    part,
+                )
+                found.update((k, json.loads(r)) for k, r in rows)
+        except sqlite3.Error as exc:
+            log.warning("Could not read parse cache: %s", exc)
+        return found
+
+    def _store(self, entries: dict[str, dict]) -> None:
+        if self._db is None or not entries:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO parse_cache (row_key, parser_version, record, created_at) VALUES (?, ?, ?, ?)",
+                [(k, self.version, json.dumps(r, ensure_ascii=False), now) for k, r in entries.items()],
+            )
+            self._db.commit()
+        except sqlite3.Error as exc:
+            log.warning("Could not write parse cache: %s", exc)
+
+    def parse_page(
+        self,
+        raw_items: list[dict],
+        parse_rows: Callable[[list[dict]], list[Optional[dict]]] = parser.parse_rows,
+    ) -> list[dict]:
+        """parse_page(raw_items), parsing only the rows not seen before with `parse_rows`."""
+        keys    = [row_key(item) for item in raw_items]
+        results: list[Optional[dict]] = [None] * len(raw_items)
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                record = self._lru.get(key)
+                if record is None:
+                    missing.append(i)
+                else:
+                    self._lru.move_to_end(key)
+                    results[i] = record
+                    self.hits += 1
+            if missing:
+                on_disk = self._load([keys[i] for i in missing])
+                still   = []
+                for i in missing:
+                    record = on_disk.get(keys[i])
+                    if record is None:
+                        still.append(i)
+                    else:
+                        self._remember(keys[i], record)
+                        results[i] = record
+                        self.hits      += 1
+                        self.disk_hits += 1
+                missing = still
+
+        if missing:
+            fresh = {}
+            for i, record in zip(missing, parse_rows([raw_items[i] for i in missing])):
+                results[i] = record
+                if record is not None:
+                    fresh[keys[i]] = record
+            with self._lock:
+                self.misses += len(missing)
+                for key, record in fresh.items():
+                    self._remember(key, record)
+                self._store(fresh)
+
+        # Copies, so nothing downstream can change what the cache holds.
+        return [dict(r) for r in results if r is not None]
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def log_stats(self) -> None:
+        log.info(
+            "Parse cache: %d hits (%d from disk), %d misses, %d evictions, hit rate %.1f%%",
+            self.hits, self.disk_hits, self.misses, self.evictions, 100 * self.hit_rate,
+        )
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -1,56 +1,295 @@
+import html
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+
 from bs4 import BeautifulSoup
 
-from logger import get_logger
+from logger import get_logger, setup_logger
 
 log = get_logger(__name__)
 
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+except ImportError:          # optional: faster --html-backend lxml
+    lxml = None
 
-def parse_raw_record(item: dict) -> dict:
-   
-    ifb_no        = item.get("1", "")
-    html_cell     = item.get("2", "")
-    doc_cell      = item.get("3", "")
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:          # optional: faster --html-backend selectolax
+    LexborHTMLParser = None
 
-    soup = BeautifulSoup(html_cell, "html.parser")
-    text = soup.get_text(" ", strip=True)
+_RED       = "f44336"        # department span colour
+# html.parser reads "<" as a tag only before a letter ("</" too); any
+# other "<" is left in a piece below and sends the cell to bs4.
+_TAG       = re.compile(r"</?[A-Za-z][^<>]*>")
+_DOC_SKIP  = re.compile(r"<[!?]|<script|<style", re.IGNORECASE)
+# A start or end tag, or any other "<".
+_MARKUP    = re.compile(r"<(/?)([A-Za-z][A-Za-z0-9]*)([\s/][^<>]*)?>|<")
+_WRAP_OPEN = re.compile(r"\s*(?:<html(?:\s[^<>]*)?>\s*)?(?:<body(?:\s[^<>]*)?>)?", re.IGNORECASE)
+_WRAP_END  = re.compile(r"(?:</body\s*>)?\s*(?:</html\s*>)?\s*\Z", re.IGNORECASE)
+_TENDERID  = re.compile(r"""\bname=["']?tenderid\b""", re.IGNORECASE)
+_ID_VALUE  = re.compile(r"""\bvalue=["']?(\d+)""", re.IGNORECASE)
 
-    tender_id = ""
-    m = re.search(r"Tender Id\s*:(\d+)", text)
-    if m:
-        tender_id = m.group(1)
+# Real cells are a few KB. Anything past this is cut off before parsing so
+# one runaway row cannot hold up a parse worker.
+MAX_CELL_CHARS = 64 * 1024
 
-    department = ""
-    red_span = soup.find("span", style=lambda s: s and "f44336" in s)
-    if red_span:
-        raw = red_span.get_text(" ", strip=True)
-        department = re.sub(r"Tender Id\s*:\d+", "", raw).strip()
-
-    name_of_work = ""
-    m = re.search(
-        r"Name Of Work\s*:(.*?)(?:Corrigendum\s*:|Estimated Contract Value|Last Date|$)",
-        text, re.DOTALL,
+# Cells up to this size are parsed exactly as given; larger ones first get
+# the "<" rewrite in _defuse.
+DEFUSE_ABOVE_CHARS = 4 * 1024
+
+
+
+# Every backend turns html_cell into (text, department_raw): the cell's text
+# nodes stripped and joined with single spaces, and the same for the first
+# red <span> ("" when there is none) -- i.e. BeautifulSoup's
+# get_text(" ", strip=True). Field extraction below runs on that text, so
+# backends only differ in how fast they get there.
+
+def _join(strings) -> str:
+    return " ".join(s for s in (s.strip() for s in strings) if s)
+
+
+# lxml and lexbor build the tree by the HTML5 rules: they drop stray and
+# misplaced tags, close elements early and move misnested content, which
+# merges or reorders text nodes. html.parser keeps every tag where it
+# stands. The fast trees are only used for markup both read the same
+# way: the tags below, properly nested, with <p> left open only until
+# the next <p> or the end of a block, and <html>/<body> only around the
+# whole cell (anywhere else they move text together).
+_VOID, _INLINE, _BLOCK = range(3)
+_TAG_KIND  = {
+    **dict.fromkeys(("br", "hr", "img", "input", "wbr"), _VOID),
+    **dict.fromkeys(("a", "b", "em", "font", "i", "label", "small", "span", "strong", "u"), _INLINE),
+    **dict.fromkeys(("center", "div", "form", "p"), _BLOCK),
+}
+
+
+def _plain_markup(html_cell: str) -> bool:
+    """True if the fast backends give the same text nodes as html.parser for `html_cell`."""
+    start  = _WRAP_OPEN.match(html_cell).end()
+    end    = _WRAP_END.search(html_cell, max(start, len(html_cell) - 32)).start()
+    stack  = []
+    for close, name, attrs in _MARKUP.findall(html_cell, start, end):
+        kind = _TAG_KIND.get(name)
+        if kind is None:
+            name = name.lower()
+            kind = _TAG_KIND.get(name)
+            if kind is None:
+                return False          # "<!", "<?", a lone "<" or a tag not listed
+        if attrs and (attrs.count('"') % 2 or attrs.count("'") % 2):
+            return False
+        if kind == _VOID:
+            if close:
+                return False
+            continue
+        if attrs.endswith("/"):
+            return False
+        block = kind >= _BLOCK
+        if close:
+            # An open <p> is closed by the end of a block, nothing else.
+            while block and name != "p" and stack and stack[-1] == "p":
+                stack.pop()
+            if not stack or stack[-1] != name:
+                return False
+            stack.pop()
+            continue
+        if name in ("a", "form") and name in stack:
+            return False
+        if block and "p" in stack:
+            if stack[-1] != "p":
+                return False
+            stack.pop()
+        stack.append(name)
+    return True
+
+
+def _extract_bs4(html_cell: str) -> tuple[str, str]:
+    soup     = BeautifulSoup(html_cell, "html.parser")
+    red_span = soup.find("span", style=lambda s: s and _RED in s)
+    return (
+        soup.get_text(" ", strip=True),
+        red_span.get_text(" ", strip=True) if red_span else "",
     )
-    if m:
-        name_of_work = m.group(1).strip()
 
-    estimated_value = ""
-    m = re.search(r"Estimated Contract Value\s*:\s*([\d.]+)", text)
-    if m:
-        estimated_value = m.group(1)
 
-    last_submission_raw = ""
-    m = re.search(r"Last Date & Time For Submission\s*:\s*([\d\-:/ ]+)", text)
-    if m:
-        last_submission_raw = m.group(1).strip()
+def _extract_lxml(html_cell: str) -> Optional[tuple[str, str]]:
+    try:
+        root = lxml.html.document_fromstring(html_cell)
+    except ParserError:
+        return None
+    spans = root.xpath(f'//span[contains(@style, "{_RED}")]')
+    return _join(root.itertext()), _join(spans[0].itertext()) if spans else ""
+
+
+def _extract_selectolax(html_cell: str) -> Optional[tuple[str, str]]:
+    tree = LexborHTMLParser(html_cell)
+    if tree.root is None:
+        return None
+    span = tree.css_first(f'span[style*="{_RED}"]')
+    # "\x00" separates text nodes so they can be stripped one by one.
+    text = lambda node: _join(node.text(separator="\x00", strip=True).split("\x00"))
+    return text(tree.root), text(span) if span else ""
+
+
+BACKENDS: dict[str, Callable[[str], Optional[tuple[str, str]]]] = {"bs4": _extract_bs4}
+if lxml is not None:
+    BACKENDS["lxml"] = _extract_lxml
+if LexborHTMLParser is not None:
+    BACKENDS["selectolax"] = _extract_selectolax
+
+# Fastest installed backend first (see benchmarks/bench_parse.py).
+DEFAULT_BACKEND = next(b for b in ("lxml", "selectolax", "bs4") if b in BACKENDS)
+
 
-    corrigendum = ""
-    m = re.search(r"Corrigendum\s*:\s*([^\n<]+)", text)
-    if m:
-        corrigendum = m.group(1).strip()
+def resolve_backend(name: Optional[str]) -> str:
+    """Map --html-backend (None/'auto' = DEFAULT_BACKEND) to an installed backend."""
+    if not name or name == "auto":
+        return DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"HTML backend {name!r} is not installed (available: {', '.join(BACKENDS)})")
+    return name
+
+
+def _defuse(cell: str) -> str:
+    """
+    `cell` capped at MAX_CELL_CHARS and, past DEFUSE_ABOVE_CHARS, with the
+    "<"s that cannot start a tag escaped.
+    """
+    if len(cell) > MAX_CELL_CHARS:
+        log.warning("Cell of %d chars truncated to %d before parsing", len(cell), MAX_CELL_CHARS)
+        cell = cell[:MAX_CELL_CHARS]
+    if len(cell) <= DEFUSE_ABOVE_CHARS:
+        return cell
+    # A "<" with no ">" before the next "<" (or the end) does not close a
+    # tag where it stands, and html.parser rescans the rest of the cell for
+    # each one, which is quadratic; as "&lt;" it parses in one pass. The
+    # text can change (html.parser reads "<input <b>" as one tag, and keeps
+    # unfinished markup at the end verbatim), so only cells far larger
+    # than real ones are rewritten. Below the threshold the worst case is
+    # about 0.05s per cell.
+    pieces = cell.split("<")
+    if all(">" in p for p in pieces[1:]):
+        return cell
+    return pieces[0] + "".join(("<" if ">" in p else "&lt;") + p for p in pieces[1:])
+
+
+def _extract(html_cell: str, backend: str) -> tuple[str, str]:
+    if backend != "bs4" and _plain_markup(html_cell):
+        # Markup the fast parser would read differently (see _plain_markup;
+        # that includes comments, CDATA and <script>/<style>, which
+        # get_text skips or splits its own way), anything it cannot
+        # handle, and cells where it finds no department span that is
+        # clearly there all go back to html.parser.
+        try:
+            result = BACKENDS[backend](html_cell)
+        except Exception as exc:
+            log.debug("%s backend failed (%s); falling back to bs4", backend, exc)
+            result = None
+        if result is not None and (result[1] or _RED not in html_cell):
+            return result
+    return _extract_bs4(html_cell)
 
-    doc_soup  = BeautifulSoup(doc_cell, "html.parser")
-    doc_count = doc_soup.get_text(strip=True)
+
+def _doc_text(doc_cell: str) -> str:
+    """get_text(strip=True) of the doc cell, without building a DOM when the markup is plain tags."""
+    if not doc_cell:
+        return ""
+    pieces = _TAG.split(doc_cell)
+    if _DOC_SKIP.search(doc_cell) or any("<" in p or ">" in p for p in pieces):
+        return BeautifulSoup(doc_cell, "html.parser").get_text(strip=True)
+    return "".join(html.unescape(p).strip() for p in pieces)
+
+
+# Every field label in one alternation, so the cell text is scanned once.
+# "Estimated Contract Value" and "Last Date" match without their colon
+# because either one ends Name Of Work even when malformed. The labels
+# start with different letters, which names the field that matched
+# (capturing groups would stop re from skipping ahead on those letters).
+_LABELS = re.compile(
+    r"Tender Id\s*:|Name Of Work\s*:|Corrigendum\s*:|Estimated Contract Value|Last Date"
+)
+_LABEL_FIELD = {
+    "T": "tender_id",
+    "N": "name_of_work",
+    "C": "corrigendum",
+    "E": "estimated_value_raw",
+    "L": "last_submission_raw",
+}
+_VALUES = {
+    "tender_id":           re.compile(r"(\d+)"),
+    "corrigendum":         re.compile(r"\s*([^\n<]+)"),
+    "estimated_value_raw": re.compile(r"\s*:\s*([\d.]+)"),
+    "last_submission_raw": re.compile(r" & Time For Submission\s*:\s*([\d\-:/ ]+)"),
+}
+_ENDS_NAME  = frozenset(("corrigendum", "estimated_value_raw", "last_submission_raw"))
+_TENDER_ID  = re.compile(r"Tender Id\s*:\d+")
+
+
+def _scan_fields(text: str) -> dict[str, str]:
+    """The labelled fields of a tender cell's text, "" for any that are missing."""
+    fields     = dict.fromkeys(("tender_id", "name_of_work", "corrigendum",
+                                "estimated_value_raw", "last_submission_raw"), "")
+    found      = set()
+    name_start = None            # set while Name Of Work is waiting for its end
+    name_done  = False
+    for m in _LABELS.finditer(text):
+        label = _LABEL_FIELD[text[m.start()]]
+        if label == "name_of_work":
+            if not name_done and name_start is None:
+                name_start = m.end()
+            continue
+        if name_start is not None and label in _ENDS_NAME:
+            fields["name_of_work"] = text[name_start:m.start()].strip()
+            name_start, name_done  = None, True
+        if label not in found:
+            v = _VALUES[label].match(text, m.end())
+            if v:
+                fields[label] = v.group(1).strip()
+                found.add(label)
+    if name_start is not None:
+        fields["name_of_work"] = text[name_start:].strip()
+    return fields
+
+
+def raw_tender_id(item: dict) -> str:
+    """tender_id from the hidden tenderid input of html_cell, without parsing the HTML ("" if absent)."""
+    cell  = (item.get("2") or "")[:MAX_CELL_CHARS]
+    lower = cell.lower()
+    pos   = lower.find("<input")
+    while pos != -1:
+        end = lower.find(">", pos)
+        if end == -1:
+            break
+        tag = cell[pos:end]
+        if _TENDERID.search(tag):
+            v = _ID_VALUE.search(tag)
+            if v:
+                return v.group(1)
+        # Resume after this tag, not inside it, so each char is read once.
+        pos = lower.find("<input", end)
+    return ""
+
+
+def parse_raw_record(item: dict, backend: Optional[str] = None) -> dict:
+
+    ifb_no        = item.get("1", "")
+    html_cell     = item.get("2", "")
+    doc_cell      = item.get("3", "")
+
+    text, red_text = _extract(_defuse(html_cell), backend or DEFAULT_BACKEND)
+
+    fields    = _scan_fields(text)
+    tender_id = fields["tender_id"]
+
+    department = ""
+    if red_text:
+        department = _TENDER_ID.sub("", red_text).strip()
+
+    doc_count = _doc_text(_defuse(doc_cell))
 
     source_url = ""
     if tender_id:
@@ -63,22 +302,61 @@ def parse_raw_record(item: dict) -> dict:
         "tender_id":            tender_id,
         "ifb_no":               ifb_no,
         "department":           department,
-        "name_of_work":         name_of_work,
-        "estimated_value_raw":  estimated_value,
-        "last_submission_raw":  last_submission_raw,
-        "corrigendum":          corrigendum,
+        "name_of_work":         fields["name_of_work"],
+        "estimated_value_raw":  fields["estimated_value_raw"],
+        "last_submission_raw":  fields["last_submission_raw"],
+        "corrigendum":          fields["corrigendum"],
         "doc_count":            doc_count,
         "source_url":           source_url,
         "raw_html_snippet":     html_cell[:500],   # first 500 chars for debugging
     }
 
 
-def parse_page(raw_items: list[dict]) -> list[dict]:
+def parse_rows(raw_items: list[dict], backend: Optional[str] = None) -> list[Optional[dict]]:
+    """One result per row, in order; None (logged) for rows that fail to parse."""
     parsed = []
     for item in raw_items:
         try:
-            record = parse_raw_record(item)
-            parsed.append(record)
+            parsed.append(parse_raw_record(item, backend))
         except Exception as exc:
             log.warning("Failed to parse item: %s — %s", item.get("1", "?"), exc)
+            parsed.append(None)
     return parsed
+
+
+def parse_page(raw_items: list[dict], backend: Optional[str] = None) -> list[dict]:
+    return [r for r in parse_rows(raw_items, backend) if r is not None]
+
+
+class ParsePool:
+    """
+    parse_rows/parse_page on a process pool (--parse-workers N). Each page is
+    cut into one chunk of rows per worker and every chunk goes through
+    parse_rows itself, so bad records are logged and skipped exactly as
+    in-process. Chunks come back in row order.
+    """
+
+    def __init__(self, workers: int, run_id: str, backend: Optional[str] = None):
+        self.workers = max(1, workers)
+        self.backend = backend
+        # setup_logger is the initializer (not a parser function) so workers
+        # started with spawn/forkserver have a logger before importing parser.
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=setup_logger, initargs=(run_id,),
+        )
+
+    def parse_rows(self, raw_items: list[dict]) -> list[Optional[dict]]:
+        if not raw_items:
+            return []
+        size   = -(-len(raw_items) // self.workers)
+        chunks = [raw_items[i:i + size] for i in range(0, len(raw_items), size)]
+        parsed = []
+        for part in self._pool.map(partial(parse_rows, backend=self.backend), chunks):
+            parsed.extend(part)
+        return parsed
+
+    def parse_page(self, raw_items: list[dict]) -> list[dict]:
+        return [r for r in self.parse_rows(raw_items) if r is not None]
+
+    def close(self) -> None:
+        self._pool.shutdown(cancel_futures=True)
@@ -1,10 +1,14 @@
+import hashlib
 import json
 import os
 import sqlite3
+import time
 from datetime import datetime, timezone
-from typing import Optional
+from functools import partial
+from typing import Callable, Optional
 
 from logger import get_logger
+from schema import json_default
 
 log = get_logger(__name__)
 
@@ -34,6 +38,128 @@ def _load_existing_ids(output_path: str) -> set[str]:
     return existing
 
 
+def known_tender_ids(output_path: str) -> set[str]:
+    """tender_ids already stored in the output file (empty set if none yet)."""
+    return _load_existing_ids(output_path)
+
+
+def load_records(output_path: str) -> list[dict]:
+    """
+    The stored records, one per tender_id. In NDJSON output the last line
+    for a tender_id is the current one (see save_records).
+    """
+    if os.path.splitext(output_path)[1].lower() != ".ndjson":
+        return _read_json(output_path)
+    records = {}
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                r = json.loads(line)
+                if r.get("tender_id"):
+                    records[r["tender_id"]] = r
+    return list(records.values())
+
+
+class KnownPageStreak:
+    """
+    Early-stop signal for --incremental runs: once `threshold` consecutive
+    pages contain only stored tender_ids, everything further down the list
+    is older and already stored too -- if the list is newest first.
+
+    The portal cannot be asked for that order (none of its columns is a
+    date), so it is checked instead. tender_ids are handed out in
+    sequence; the first page whose ids rise, within the page or from the
+    page before it, turns the signal off for the rest of the run
+    (`newest_first` is then False). Pages are passed in offset order with
+    the ids in row order; a page at or below the last offset seen (a
+    retried page) is not checked.
+    """
+
+    def __init__(self, known_ids: set[str], threshold: int):
+        self.known_ids    = known_ids
+        self.threshold    = max(1, threshold)
+        self.streak       = 0
+        self.newest_first = True
+        self._offset      = -1
+        self._oldest      = None
+
+    def update(self, tender_ids: list[str], offset: Optional[int] = None) -> bool:
+        if offset is None:
+            offset = self._offset + 1
+        if offset <= self._offset or not self.newest_first:
+            return False
+        self._offset = offset
+        numbers = [int(tid) for tid in tender_ids if tid.isdigit()]
+        if self._oldest is not None:
+            numbers.insert(0, self._oldest)
+        if any(a < b for a, b in zip(numbers, numbers[1:])):
+            self.newest_first = False
+            self.streak       = 0
+            return False
+        if numbers:
+            self._oldest = numbers[-1]
+        ids = {tid for tid in tender_ids if tid}
+        if ids and ids <= self.known_ids:
+            self.streak += 1
+        else:
+            self.streak = 0
+        return self.streak >= self.threshold
+
+
+class TenderIndex:
+    """
+    In-memory index of stored tender_ids, each with the hash of the raw API
+    row it was saved from (None for tenders stored before hashes were kept).
+    split() runs before parsing: a row whose hidden tenderid is stored with
+    the same hash -- or no hash yet -- is skipped, and a row whose hash
+    differs goes on to be parsed and replaces the stored record.
+    """
+
+    def __init__(self, hashes: dict[str, Optional[str]]):
+        self.hashes = hashes
+
+    @classmethod
+    def load(cls, output_path: str, db_path: str, stored_ids: Optional[set[str]] = None) -> "TenderIndex":
+        if stored_ids is None:
+            stored_ids = known_tender_ids(output_path)
+        stored = load_row_hashes(db_path)
+        return cls({tid: stored.get(tid) for tid in stored_ids})
+
+    def __contains__(self, tender_id: str) -> bool:
+        return tender_id in self.hashes
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def split(
+        self,
+        raw_items: list[dict],
+        tender_id_of: Callable[[dict], str],
+    ) -> tuple[list[dict], int, dict[str, str]]:
+        """
+        (rows to parse, rows skipped, tender_id -> row hash for every row
+        with a readable id). Rows without one are always parsed.
+        """
+        to_parse = []
+        skipped  = 0
+        hashes   = {}
+        for item in raw_items:
+            tid = tender_id_of(item)
+            if not tid:
+                to_parse.append(item)
+                continue
+            h = hashes[tid] = row_hash(item)
+            if tid in self.hashes and self.hashes[tid] in (None, h):
+                skipped += 1
+            else:
+                to_parse.append(item)
+        return to_parse, skipped, hashes
+
+    def update(self, hashes: dict[str, str]) -> None:
+        self.hashes.update(hashes)
+
+
 def deduplicate(records: list[dict]) -> tuple[list[dict], int]:
     
     seen   = set()
@@ -51,45 +177,121 @@ def deduplicate(records: list[dict]) -> tuple[list[dict], int]:
     return unique, dupes
 
 
-def save_records(
-    records: list[dict],
-    output_path: str,
-    dry_run: bool = False,
-) -> tuple[int, int]:
-    
-    records, within_dupes = deduplicate(records)
+JSON_FLUSH_SECONDS = 30.0
 
-    existing_ids  = _load_existing_ids(output_path)
-    new_records   = [r for r in records if r.get("tender_id") not in existing_ids]
-    cross_dupes   = len(records) - len(new_records)
 
-    total_deduped = within_dupes + cross_dupes
-    if cross_dupes:
-        log.info("%d records already in output file — skipping (incremental)", cross_dupes)
+class RecordStore:
+    """
+    The output file for one run. Stored tender_ids are read once and kept
+    up to date in memory as pages are saved. NDJSON pages are appended as
+    they come; a .json array is held in memory and rewritten atomically
+    (temp file + rename) at most every `flush_every` seconds and on
+    close(). A save's `on_written` callback runs once its records are on
+    disk, with the save's (saved, deduplicated) counts, so page checkpoints
+    never get ahead of the output file.
+    """
 
-    if dry_run:
-        log.info("[dry-run] Would save %d records to %s", len(new_records), output_path)
-        return len(new_records), total_deduped
+    def __init__(
+        self,
+        output_path: str,
+        stored_ids: Optional[set[str]] = None,
+        flush_every: float = JSON_FLUSH_SECONDS,
+        dry_run: bool = False,
+    ):
+        self.path        = output_path
+        self.ndjson      = os.path.splitext(output_path)[1].lower() == ".ndjson"
+        self.ids         = set(_load_existing_ids(output_path) if stored_ids is None else stored_ids)
+        self.flush_every = flush_every
+        self.dry_run     = dry_run
+        self._records: Optional[dict] = None       # .json only: tender_id -> record
+        self._dirty      = False
+        self._pending: list[Callable[[], None]] = []
+        self._last_flush = time.monotonic()
+
+    def save(
+        self,
+        records: list[dict],
+        refresh: frozenset[str] = frozenset(),
+        on_written: Optional[Callable[[int, int], None]] = None,
+    ) -> tuple[int, int]:
+        """
+        Store the records whose tender_id is not stored yet. Ids in
+        `refresh` replace the stored record instead (the .json entry is
+        replaced; NDJSON gets a newer line for the same tender_id, which
+        supersedes the old one). Returns (saved, deduplicated).
+        """
+        records, within_dupes = deduplicate(records)
+
+        new_records = [r for r in records
+                       if r.get("tender_id") not in self.ids or r["tender_id"] in refresh]
+        cross_dupes = len(records) - len(new_records)
+        refreshed   = sum(1 for r in new_records if r.get("tender_id") in self.ids)
 
-    if not new_records:
-        log.info("No new records to save.")
-        return 0, total_deduped
+        total_deduped = within_dupes + cross_dupes
+        if cross_dupes:
+            log.info("%d records already in output file — skipping (incremental)", cross_dupes)
+        if refreshed:
+            log.info("%d stored records changed on the portal — refreshing", refreshed)
 
-    ext = os.path.splitext(output_path)[1].lower()
+        if self.dry_run:
+            log.info("[dry-run] Would save %d records to %s", len(new_records), self.path)
+            return len(new_records), total_deduped
 
-    if ext == ".ndjson":
-        with open(output_path, "a", encoding="utf-8") as f:
+        if not new_records:
+            log.info("No new records to save.")
+        elif self.ndjson:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for r in new_records:
+                    f.write(json.dumps(r, ensure_ascii=False, default=json_default) + "\n")
+            log.info("Saved %d new records → %s", len(new_records), self.path)
+        else:
+            if self._records is None:
+                self._records = {r["tender_id"]: r for r in _read_json(self.path)}
             for r in new_records:
-                f.write(json.dumps(r, ensure_ascii=False) + "\n")
-    else:
-        all_records = list({r["tender_id"]: r for r in (
-            _read_json(output_path) + new_records
-        )}.values())
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(all_records, f, ensure_ascii=False, indent=2)
+                self._records[r["tender_id"]] = r
+            self._dirty = True
+            log.info("Saved %d new records → %s (written at the next flush)", len(new_records), self.path)
+        self.ids.update(r["tender_id"] for r in new_records if r.get("tender_id"))
+
+        if on_written is not None:
+            self._pending.append(partial(on_written, len(new_records), total_deduped))
+        if self.ndjson or time.monotonic() - self._last_flush >= self.flush_every:
+            self.flush()
+        return len(new_records), total_deduped
 
-    log.info("Saved %d new records → %s", len(new_records), output_path)
-    return len(new_records), total_deduped
+    def flush(self) -> None:
+        """Write any buffered .json records, then run the pending callbacks."""
+        if self._dirty:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(list(self._records.values()), f, ensure_ascii=False, indent=2,
+                          default=json_default)
+            os.replace(tmp, self.path)
+            self._dirty = False
+            log.info("Wrote %d records → %s", len(self._records), self.path)
+        self._last_flush = time.monotonic()
+        pending, self._pending = self._pending, []
+        for fn in pending:
+            fn()
+
+    def close(self) -> None:
+        self.flush()
+
+
+def save_records(
+    records: list[dict],
+    output_path: str,
+    dry_run: bool = False,
+    refresh: frozenset[str] = frozenset(),
+) -> tuple[int, int]:
+    """
+    One-off RecordStore.save: reads the stored ids and writes the file on
+    every call. A crawl keeps one RecordStore for the whole run instead.
+    """
+    store  = RecordStore(output_path, dry_run=dry_run)
+    result = store.save(records, refresh=refresh)
+    store.close()
+    return result
 
 
 def _read_json(path: str) -> list[dict]:
@@ -117,44 +319,245 @@ CREATE TABLE IF NOT EXISTS runs_metadata (
     tenders_saved       INTEGER,
     failures            INTEGER,
     deduped_count       INTEGER,
-    error_summary       TEXT           -- JSON list of error messages
+    error_summary       TEXT,          -- JSON list of error messages
+    failed_offsets      TEXT           -- JSON list of page offsets never fetched
+);
+"""
+
+
+_CREATE_PAGES_TABLE = """
+CREATE TABLE IF NOT EXISTS run_pages (
+    run_id              TEXT NOT NULL,
+    page_offset         INTEGER NOT NULL,  -- iDisplayStart of the page
+    record_count        INTEGER NOT NULL,  -- raw rows returned by the API
+    content_hash        TEXT,              -- sha1 of the raw rows
+    tenders_parsed      INTEGER,           -- the page's share of the run's counters
+    tenders_saved       INTEGER,
+    deduped_count       INTEGER,
+    completed_at        TEXT NOT NULL,
+    PRIMARY KEY (run_id, page_offset)
+);
+"""
+
+
+_CREATE_TENDERS_TABLE = """
+CREATE TABLE IF NOT EXISTS stored_tenders (
+    tender_id           TEXT PRIMARY KEY,
+    row_hash            TEXT NOT NULL,     -- sha1 of the raw row last stored
+    updated_at          TEXT NOT NULL
 );
 """
 
 
+# Columns added after the first release; older DBs get them on first open.
+_ADDED_COLUMNS = {
+    "runs_metadata": {
+        "failed_offsets": "TEXT",
+    },
+    "run_pages": {
+        "tenders_parsed": "INTEGER",
+        "tenders_saved":  "INTEGER",
+        "deduped_count":  "INTEGER",
+    },
+}
+
+
 def _get_conn(db_path: str) -> sqlite3.Connection:
     conn = sqlite3.connect(db_path)
     conn.execute(_CREATE_TABLE)
+    conn.execute(_CREATE_PAGES_TABLE)
+    conn.execute(_CREATE_TENDERS_TABLE)
+    for table, columns in _ADDED_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column, kind in columns.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
     conn.commit()
     return conn
 
 
+def page_hash(raw_items: list[dict]) -> str:
+    blob = json.dumps(raw_items, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def row_hash(item: dict) -> str:
+    return page_hash([item])
+
+
+def load_row_hashes(db_path: str) -> dict[str, str]:
+    """tender_id -> hash of the raw row it was last stored from."""
+    if not os.path.exists(db_path):
+        return {}
+    try:
+        conn = _get_conn(db_path)
+        rows = conn.execute("SELECT tender_id, row_hash FROM stored_tenders").fetchall()
+        conn.close()
+    except Exception as exc:
+        log.warning("Could not read stored row hashes: %s", exc)
+        return {}
+    return dict(rows)
+
+
+def record_row_hashes(db_path: str, hashes: dict[str, str]) -> None:
+    """Remember the raw row each saved (or already stored) tender came from."""
+    if not hashes:
+        return
+    try:
+        now  = datetime.now(timezone.utc).isoformat()
+        conn = _get_conn(db_path)
+        conn.executemany(
+            "INSERT OR REPLACE INTO stored_tenders (tender_id, row_hash, updated_at) VALUES (?, ?, ?)",
+            [(tid, h, now) for tid, h in hashes.items()],
+        )
+        conn.commit()
+        conn.close()
+    except Exception as exc:
+        log.warning("Could not write stored row hashes: %s", exc)
+
+
+def record_page_checkpoint(
+    db_path: str,
+    run_id: str,
+    offset: int,
+    record_count: int,
+    content_hash: str,
+    parsed: int = 0,
+    saved: int = 0,
+    deduped: int = 0,
+) -> None:
+    """
+    Mark one page as committed, with what it added to the run's counters.
+    Call only after the page's records have been written, so a resumed run
+    never skips data that was not saved.
+    """
+    try:
+        conn = _get_conn(db_path)
+        conn.execute(
+            """INSERT OR REPLACE INTO run_pages
+               (run_id, page_offset, record_count, content_hash,
+                tenders_parsed, tenders_saved, deduped_count, completed_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (run_id, offset, record_count, content_hash, parsed, saved, deduped,
+             datetime.now(timezone.utc).isoformat()),
+        )
+        conn.commit()
+        conn.close()
+    except Exception as exc:
+        log.warning("Could not write checkpoint for offset %d: %s", offset, exc)
+
+
+def gap_pages(pages: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """
+    (offset, size) requests that cover the gaps between committed `pages`,
+    given as (offset, record_count) in offset order. Each gap is cut at the
+    page size the run was using there: the record_count of the page before
+    it (the crawl advanced by that much), or of the page after a gap at
+    offset 0. The last request of a gap ends at the gap's end.
+    """
+    requests = []
+    end      = 0                    # runs start at offset 0
+    size     = pages[0][1] if pages else 0
+    for offset, count in pages:
+        if offset > end:
+            step = size or offset - end
+            requests.extend((s, min(step, offset - s)) for s in range(end, offset, step))
+        if offset + count >= end:
+            end, size = offset + count, count
+    return requests
+
+
+def load_checkpoint(db_path: str, run_id: str) -> Optional[dict]:
+    """
+    Progress of an earlier run: the offset to continue from, how many pages
+    and raw records were already committed (and the tenders parsed, saved
+    and deduplicated on them), and the (start, length) gaps below that
+    offset -- pages that were deferred, failed the retry pass or were still
+    in flight when the run stopped -- with `retry_pages`, the gap_pages()
+    requests that refetch them. None if nothing was recorded.
+    """
+    if not os.path.exists(db_path):
+        return None
+    try:
+        conn = _get_conn(db_path)
+        rows = conn.execute(
+            "SELECT page_offset, record_count FROM run_pages WHERE run_id=? ORDER BY page_offset",
+            (run_id,),
+        ).fetchall()
+        parsed, saved, deduped = conn.execute(
+            """SELECT COALESCE(SUM(tenders_parsed), 0), COALESCE(SUM(tenders_saved), 0),
+                      COALESCE(SUM(deduped_count), 0)
+               FROM run_pages WHERE run_id=?""",
+            (run_id,),
+        ).fetchone()
+        conn.close()
+    except Exception as exc:
+        log.warning("Could not read checkpoint for run_id=%s: %s", run_id, exc)
+        return None
+    if not rows:
+        return None
+    gaps = []
+    end  = 0                        # runs start at offset 0
+    for offset, count in rows:
+        if offset > end:
+            gaps.append((end, offset - end))
+        end = max(end, offset + count)
+    return {
+        "next_offset": end,
+        "pages":       len(rows),
+        "records":     sum(count for _, count in rows),
+        "parsed":      parsed,
+        "saved":       saved,
+        "deduped":     deduped,
+        "gaps":        gaps,
+        "retry_pages": gap_pages(rows),
+    }
+
+
 def start_run_metadata(
     db_path: str,
     run_id: str,
     config: dict,
     dry_run: bool = False,
-) -> None:
+    resume: bool = False,
+) -> datetime:
+    """
+    Insert the run's row and return its start time. With `resume`, an
+    existing row keeps its start_time (returned, so the duration covers the
+    whole run) and only gets the new config.
+    """
+    start_time = datetime.now(timezone.utc)
     if dry_run:
-        return
+        return start_time
     try:
         conn = _get_conn(db_path)
-        conn.execute(
-            """INSERT OR REPLACE INTO runs_metadata
-               (run_id, start_time, scraper_version, config)
-               VALUES (?, ?, ?, ?)""",
-            (
-                run_id,
-                datetime.now(timezone.utc).isoformat(),
-                "1.0.0",
-                json.dumps(config),
-            ),
-        )
+        row  = None
+        if resume:
+            row = conn.execute("SELECT start_time FROM runs_metadata WHERE run_id=?", (run_id,)).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE runs_metadata SET scraper_version=?, config=? WHERE run_id=?",
+                ("1.0.0", json.dumps(config), run_id),
+            )
+            start_time = datetime.fromisoformat(row[0])
+        else:
+            conn.execute(
+                """INSERT OR REPLACE INTO runs_metadata
+                   (run_id, start_time, scraper_version, config)
+                   VALUES (?, ?, ?, ?)""",
+                (
+                    run_id,
+                    start_time.isoformat(),
+                    "1.0.0",
+                    json.dumps(config),
+                ),
+            )
         conn.commit()
         conn.close()
-        log.debug("Run metadata row inserted for run_id=%s", run_id)
+        log.debug("Run metadata row %s for run_id=%s", "resumed" if row else "inserted", run_id)
     except Exception as exc:
         log.warning("Could not write start metadata: %s", exc)
+    return start_time
 
 
 def finish_run_metadata(
@@ -169,6 +572,7 @@ def finish_run_metadata(
     error_summary: list[str],
     tender_types: list[str],
     dry_run: bool = False,
+    failed_offsets: list[int] | None = None,
 ) -> None:
     end_time = datetime.now(timezone.utc)
     duration = (end_time - start_time).total_seconds()
@@ -185,6 +589,7 @@ def finish_run_metadata(
             "tenders_saved": tenders_saved,
             "failures": failures,
             "deduped_count": deduped_count,
+            "failed_offsets": failed_offsets or [],
             "duration_seconds": round(duration, 2),
         }, indent=2))
         return
@@ -195,7 +600,8 @@ def finish_run_metadata(
             """UPDATE runs_metadata SET
                end_time=?, duration_seconds=?, tender_types_processed=?,
                pages_visited=?, tenders_parsed=?, tenders_saved=?,
-               failures=?, deduped_count=?, error_summary=?
+               failures=?, deduped_count=?, error_summary=?,
+               failed_offsets=?
                WHERE run_id=?""",
             (
                 end_time.isoformat(),
@@ -207,6 +613,7 @@ def finish_run_metadata(
                 failures,
                 deduped_count,
                 json.dumps(error_summary),
+                json.dumps(failed_offsets or []),
                 run_id,
             ),
         )
@@ -0,0 +1,172 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+_DONE = object()
+
+
+class _Failure:
+    """An exception raised in a stage thread, passed downstream to the consumer."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class StageStats:
+
+    def __init__(self, name: str):
+        self.name   = name
+        self.items  = 0
+        self.busy   = 0.0     # seconds spent doing the stage's own work
+        self.waited = 0.0     # seconds blocked on an empty inbox or a full outbox
+
+    def __repr__(self) -> str:
+        return f"{self.name}: {self.items} items, busy {self.busy:.2f}s, waited {self.waited:.2f}s"
+
+
+class Pipeline:
+    """
+    Run `source` and each (name, fn) stage on its own thread, connected by
+    queues of at most `maxsize` items. A full queue blocks the stage feeding
+    it, so a slow consumer throttles the fetcher instead of letting pages
+    pile up in memory. Iterating the pipeline yields the last stage's
+    results in source order; the consumer's own time between items is
+    reported as the `sink` stage.
+
+    An exception in any stage is re-raised from the iterator. close() (also
+    called when iteration ends) stops every thread and closes the source.
+    """
+
+    def __init__(
+        self,
+        source: Iterable,
+        stages: list[tuple[str, Callable[[Any], Any]]],
+        maxsize: int = 4,
+        source_name: str = "source",
+        sink_name: str = "sink",
+    ):
+        self._source = source
+        self._stages = stages
+        self._stop   = threading.Event()
+        self._queues = [queue.Queue(maxsize=max(1, maxsize)) for _ in stages + [None]]
+        self.stats   = [StageStats(source_name)] + [StageStats(name) for name, _ in stages]
+        self.stats.append(StageStats(sink_name))
+        self._threads: list[threading.Thread] = []
+
+    def _put(self, q: queue.Queue, item, stats: StageStats) -> bool:
+        t0 = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            stats.waited += time.perf_counter() - t0
+
+    def _get(self, q: queue.Queue, stats: StageStats):
+        t0 = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _DONE
+        finally:
+            stats.waited += time.perf_counter() - t0
+
+    def _run_source(self) -> None:
+        stats = self.stats[0]
+        out   = self._queues[0]
+        it    = iter(self._source)
+        try:
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    stats.busy += time.perf_counter() - t0
+                stats.items += 1
+                if not self._put(out, item, stats):
+                    break
+        except BaseException as exc:
+            self._put(out, _Failure(exc), stats)
+            return
+        finally:
+            close = getattr(it, "close", None)
+            if close:
+                close()
+        self._put(out, _DONE, stats)
+
+    def _run_stage(self, index: int, fn: Callable) -> None:
+        stats = self.stats[index + 1]
+        inbox = self._queues[index]
+        out   = self._queues[index + 1]
+        while True:
+            item = self._get(inbox, stats)
+            if item is _DONE or isinstance(item, _Failure):
+                self._put(out, item, stats)
+                return
+            t0 = time.perf_counter()
+            try:
+                result = fn(item)
+            except BaseException as exc:
+                self._put(out, _Failure(exc), stats)
+                return
+            finally:
+                stats.busy += time.perf_counter() - t0
+            stats.items += 1
+            if not self._put(out, result, stats):
+                return
+
+    def _start(self) -> None:
+        self._threads.append(threading.Thread(
+            target=self._run_source, daemon=True, name=f"pipeline-{self.stats[0].name}",
+        ))
+        for i, (name, fn) in enumerate(self._stages):
+            self._threads.append(threading.Thread(
+                target=self._run_stage, args=(i, fn), daemon=True, name=f"pipeline-{name}",
+            ))
+        for t in self._threads:
+            t.start()
+
+    def __iter__(self) -> Iterator:
+        self._start()
+        sink  = self.stats[-1]
+        inbox = self._queues[-1]
+        try:
+            while True:
+                item = self._get(inbox, sink)
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+                sink.items += 1
+                t0 = time.perf_counter()
+                yield item
+                sink.busy += time.perf_counter() - t0
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join(timeout=5)
+
+    def log_stats(self) -> None:
+        for s in self.stats:
+            log.info(
+                "Stage %-8s %5d items | busy %7.2fs | waiting %7.2fs",
+                s.name, s.items, s.busy, s.waited,
+            )
@@ -0,0 +1,193 @@
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(RuntimeError):
+    """The portal has been failing for longer than the breaker will wait."""
+
+
+class CircuitBreaker:
+    """
+    Shared by every fetch worker of a run.
+
+    closed     requests flow; failures are counted over a sliding window.
+    open       `threshold` failures inside `window` seconds: every worker
+               pauses until the cooldown ends.
+    half-open  one worker is let through as a probe. Success closes the
+               breaker for everyone; failure re-opens it with a doubled
+               cooldown (capped at `max_cooldown`).
+
+    A probe that has not reported back after `probe_timeout` seconds is
+    presumed lost and another worker is let through. If the breaker stays
+    open for `give_up_after` seconds, waiting workers raise CircuitOpenError
+    instead of queueing behind a dead server.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(
+        self,
+        threshold: int = 5,
+        window: float = 30.0,
+        cooldown: float = 5.0,
+        max_cooldown: float = 60.0,
+        give_up_after: float = 300.0,
+        probe_timeout: float = 60.0,
+    ):
+        self.threshold     = max(1, threshold)
+        self.window        = window
+        self.base_cooldown = cooldown
+        self.max_cooldown  = max_cooldown
+        self.give_up_after = give_up_after
+        self.probe_timeout = probe_timeout
+
+        self.state       = self.CLOSED
+        self.trips       = 0
+        self._cooldown   = cooldown
+        self._failures: deque[float] = deque()
+        self._open_until = 0.0
+        self._opened_at  = 0.0
+        self._probe_at   = 0.0
+        self._cond       = threading.Condition()
+
+    def before_request(self) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.state == self.CLOSED:
+                    return
+                if self.give_up_after and now - self._opened_at > self.give_up_after:
+                    raise CircuitOpenError(
+                        f"circuit open for {now - self._opened_at:.0f}s -- giving up"
+                    )
+                if self.state == self.OPEN and now >= self._open_until:
+                    self.state     = self.HALF_OPEN
+                    self._probe_at = now
+                    log.info("Circuit half-open -- sending one probe request")
+                    return
+                if self.state == self.HALF_OPEN and now - self._probe_at > self.probe_timeout:
+                    # The probe never reported back; let another one through.
+                    self._probe_at = now
+                    return
+                wake = self._open_until if self.state == self.OPEN else self._probe_at + self.probe_timeout
+                if self.give_up_after:
+                    wake = min(wake, self._opened_at + self.give_up_after + 0.001)
+                self._cond.wait(max(0.01, wake - now))
+
+    def record_success(self) -> None:
+        with self._cond:
+            if self.state != self.CLOSED:
+                log.info("Circuit closed -- server is answering again")
+            self.state     = self.CLOSED
+            self._cooldown = self.base_cooldown
+            self._opened_at = 0.0
+            self._failures.clear()
+            self._cond.notify_all()
+
+    def record_failure(self) -> None:
+        with self._cond:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+                self._open(now, "probe failed")
+                return
+            if self.state == self.OPEN:
+                return
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window:
+                self._failures.popleft()
+            if len(self._failures) >= self.threshold:
+                self._open(now, f"{len(self._failures)} failures in {self.window:.0f}s")
+
+    def _open(self, now: float, reason: str) -> None:
+        if not self._opened_at:
+            self._opened_at = now
+        self.state       = self.OPEN
+        self.trips      += 1
+        self._open_until = now + self._cooldown
+        self._failures.clear()
+        log.warning("Circuit open (%s) -- pausing all workers for %.1fs", reason, self._cooldown)
+        self._cond.notify_all()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    How fetch_page retries: `retries` extra attempts, each after a
+    decorrelated-jitter delay (uniform between `base` and 3x the previous
+    delay, capped at `cap`). A Retry-After header overrides the jitter,
+    up to `max_retry_after`. An optional CircuitBreaker is consulted before
+    every attempt and told about every outcome.
+    """
+
+    def __init__(
+        self,
+        retries: int = 3,
+        base: float = 1.0,
+        cap: float = 30.0,
+        max_retry_after: float = 120.0,
+        breaker: Optional[CircuitBreaker] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        self.retries         = retries
+        self.base            = base
+        self.cap             = cap
+        self.max_retry_after = max_retry_after
+        self.breaker         = breaker
+        self._rng            = rng or random.Random()
+
+    def next_delay(self, previous: float, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        upper = max(self.base, previous * 3)
+        return min(self.cap, self._rng.uniform(self.base, upper))
+
+    def before_attempt(self) -> None:
+        if self.breaker:
+            self.breaker.before_request()
+
+    def record_success(self) -> None:
+        if self.breaker:
+            self.breaker.record_success()
+
+    def record_failure(self) -> None:
+        if self.breaker:
+            self.breaker.record_failure()
+
+
+def policy_from_config(config: dict) -> RetryPolicy:
+    breaker = None
+    if config.get("breaker_threshold", 0) > 0:
+        breaker = CircuitBreaker(
+            threshold = config["breaker_threshold"],
+            cooldown  = config.get("breaker_cooldown", 5.0),
+        )
+    return RetryPolicy(retries=config["retries"], breaker=breaker)
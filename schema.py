@@ -0,0 +1,123 @@
+from collections.abc import Mapping
+from operator import attrgetter
+
+# Key order of a cleaned record (and of cleaner.clean_columns' columns).
+RECORD_FIELDS = (
+    "tender_id", "tender_type", "title", "organisation", "publish_date", "closing_date",
+    "description", "source_url", "estimated_value", "attachments", "corrigendum",
+    "raw_html_snippet",
+)
+
+_FIELD_SET = frozenset(RECORD_FIELDS)
+_values    = attrgetter(*RECORD_FIELDS)
+
+
+class TenderRecord(Mapping):
+    """
+    One cleaned tender, with the fields and types of schema.md. Reads like
+    a read-only dict (record["tender_id"], .get, .items, == dict) but keeps
+    its fields in slots, without a per-record hash table. The types are
+    checked once, when the record is built.
+    """
+
+    __slots__ = RECORD_FIELDS
+
+    def __init__(
+        self,
+        tender_id: str,
+        tender_type: str,
+        title: str,
+        organisation: str,
+        publish_date,
+        closing_date,
+        description: str,
+        source_url: str,
+        estimated_value,
+        attachments: int,
+        corrigendum: str,
+        raw_html_snippet: str,
+    ):
+        if not (
+            type(tender_id) is str and tender_id
+            and type(tender_type) is str and tender_type
+            and type(title) is str
+            and type(organisation) is str
+            and (publish_date is None or type(publish_date) is str)
+            and (closing_date is None or type(closing_date) is str)
+            and type(description) is str
+            and type(source_url) is str
+            and (estimated_value is None or type(estimated_value) is float)
+            and type(attachments) is int
+            and type(corrigendum) is str
+            and type(raw_html_snippet) is str
+        ):
+            _reject(locals())
+        self.tender_id        = tender_id
+        self.tender_type      = tender_type
+        self.title            = title
+        self.organisation     = organisation
+        self.publish_date     = publish_date
+        self.closing_date     = closing_date
+        self.description      = description
+        self.source_url       = source_url
+        self.estimated_value  = estimated_value
+        self.attachments      = attachments
+        self.corrigendum      = corrigendum
+        self.raw_html_snippet = raw_html_snippet
+
+    def __getitem__(self, key: str):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(RECORD_FIELDS)
+
+    def __len__(self) -> int:
+        return len(RECORD_FIELDS)
+
+    def __contains__(self, key) -> bool:
+        return key in _FIELD_SET
+
+    def __eq__(self, other):
+        if type(other) is TenderRecord:
+            return _values(self) == _values(other)
+        return super().__eq__(other)
+
+    def __reduce__(self):
+        return TenderRecord, _values(self)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in zip(RECORD_FIELDS, _values(self)))
+        return f"TenderRecord({fields})"
+
+    def to_dict(self) -> dict:
+        return dict(zip(RECORD_FIELDS, _values(self)))
+
+
+_OPTIONAL = {"publish_date": str, "closing_date": str, "estimated_value": float}
+
+
+def _reject(fields: dict) -> None:
+    for name in RECORD_FIELDS:
+        value = fields[name]
+        if name in _OPTIONAL:
+            if value is None or type(value) is _OPTIONAL[name]:
+                continue
+            expected = f"{_OPTIONAL[name].__name__} or None"
+        elif name == "attachments":
+            if type(value) is int:
+                continue
+            expected = "int"
+        else:
+            if type(value) is str and (value or name not in ("tender_id", "tender_type")):
+                continue
+            expected = "a non-empty str" if name in ("tender_id", "tender_type") else "str"
+        raise ValueError(f"TenderRecord.{name} must be {expected}, got {value!r}")
+
+
+def json_default(obj):
+    """`default=` for json.dump(s): writes a TenderRecord as its dict."""
+    if isinstance(obj, TenderRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
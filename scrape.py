@@ -9,12 +9,14 @@ Usage:
     python scrape.py --limit 50 --dry-run
     python scrape.py --limit 200 --rate-limit 1.0 --output tenders.ndjson
     python scrape.py --output sample-output.json
+    python scrape.py --resume 1a2b3c4d --output tenders.ndjson
 """
 
 import sys
+import threading
 import uuid
 from collections import Counter
-from datetime import datetime, timezone
+from functools import partial
 
 # Bootstrap logger before importing anything else
 import logger as _logger_mod
@@ -24,13 +26,25 @@ _logger_mod.setup_logger(RUN_ID)
 log = _logger_mod.get_logger("scrape")
 
 from config import parse_args, build_config
-from fetcher import make_session, iter_raw_pages
-from parser import parse_page
-from cleaner import clean_records
+from fetcher import make_session, iter_raw_pages, retry_failed_pages
+from async_fetcher import iter_raw_pages_concurrent
+from sessions import SessionCache, SessionPool
+from parser import ParsePool, parse_page, parse_rows, raw_tender_id, resolve_backend
+from parsecache import ParseCache
+from cleaner import clean_columns, columns_to_records
+from classifier import load_type_model
+from pipeline import Pipeline
 from persistence import (
-    save_records,
+    RecordStore,
     start_run_metadata,
     finish_run_metadata,
+    known_tender_ids,
+    KnownPageStreak,
+    load_checkpoint,
+    page_hash,
+    record_page_checkpoint,
+    record_row_hashes,
+    TenderIndex,
 )
 
 SCRAPER_VERSION = "1.0.0"
@@ -39,79 +53,280 @@ SCRAPER_VERSION = "1.0.0"
 def main() -> int:
     args   = parse_args()
     config = build_config(args)
+    try:
+        html_backend = resolve_backend(config["html_backend"])
+    except ValueError as exc:
+        log.error("%s", exc)
+        return 2
+
+    run_id = RUN_ID
+    # A resumed run's counters start from what its committed pages
+    # recorded; failures describe this session only, since the earlier
+    # ones are retried.
+    pages_visited  = 0
+    tenders_parsed = 0
+    saved          = 0
+    deduped        = 0
+    failed         = []
+    if config["resume"]:
+        run_id = config["resume"]
+        _logger_mod.setup_logger(run_id)
+        checkpoint = load_checkpoint(config["metadata_db"], run_id)
+        if checkpoint:
+            config["start_offset"] = checkpoint["next_offset"]
+            pages_visited          = checkpoint["pages"]
+            tenders_parsed         = checkpoint["parsed"]
+            saved                  = checkpoint["saved"]
+            deduped                = checkpoint["deduped"]
+            log.info(
+                "Resuming run %s at offset %d (%d pages / %d records already committed)",
+                run_id, checkpoint["next_offset"], checkpoint["pages"], checkpoint["records"],
+            )
+            # Uncommitted pages below the resume point go to the deferred
+            # retry pass instead of being skipped, cut as the first session
+            # cut them rather than at the current --page-size.
+            failed.extend(checkpoint["retry_pages"])
+            if failed:
+                log.info("%d uncommitted page(s) before offset %d are retried after the main pass",
+                         len(failed), checkpoint["next_offset"])
+        else:
+            log.warning("No checkpoint found for run_id=%s -- starting from offset 0", run_id)
 
     log.info("=" * 60)
     log.info("nprocure.com Tender Scraper  v%s", SCRAPER_VERSION)
-    log.info("run_id=%s  dry_run=%s  limit=%s", RUN_ID, config["dry_run"], config["limit"])
-    log.info("rate_limit=%.1fs  retries=%d  timeout=%ds",
-             config["rate_limit"], config["retries"], config["timeout"])
-    log.info("output=%s  metadata_db=%s", config["output"], config["metadata_db"])
+    log.info("run_id=%s  dry_run=%s  limit=%s", run_id, config["dry_run"], config["limit"])
+    log.info("rate_limit=%.1fs  concurrency=%d  retries=%d  timeout=%ds",
+             config["rate_limit"], config["concurrency"], config["retries"], config["timeout"])
+    log.info("output=%s  metadata_db=%s  html_backend=%s", config["output"], config["metadata_db"], html_backend)
     log.info("=" * 60)
 
-    start_time = datetime.now(timezone.utc)
-    start_run_metadata(config["metadata_db"], RUN_ID, config, config["dry_run"])
+    start_time = start_run_metadata(
+        config["metadata_db"], run_id, config, config["dry_run"], resume=bool(config["resume"]),
+    )
 
-    all_clean      = []
-    pages_visited  = 0
-    tenders_parsed = 0
+    known_skipped  = 0
     failures       = 0
     error_summary  = []
     type_counter   = Counter()
 
-    session = make_session(config["user_agent"], config["timeout"])
+    # The output file is read once; `store` keeps its ids current after that.
+    stored_ids = known_tender_ids(config["output"])
+    store      = RecordStore(config["output"], stored_ids)
+
+    early_stop = None
+    if config["incremental"]:
+        early_stop = KnownPageStreak(stored_ids, config["stop_after_known"])
+        log.info(
+            "Incremental mode: stop after %d all-known pages while pages come newest first (%d ids stored)",
+            early_stop.threshold, len(early_stop.known_ids),
+        )
+
+    tender_index = None
+    if not config["parse_known"]:
+        tender_index = TenderIndex.load(config["output"], config["metadata_db"], stored_ids)
+        log.info("Rows of %d stored tenders are skipped before parsing unless changed", len(tender_index))
+
+    cache = None
+    if config["session_cache"]:
+        cache = SessionCache(config["session_cache"], config["session_ttl"])
+    def new_session():
+        return make_session(
+            config["user_agent"], config["timeout"], config["base_url"], cache,
+            transport=config["transport"], pool_size=config["concurrency"],
+        )
+
+    session = SessionPool(new_session, config["sessions"])
+    pages   = iter_raw_pages_concurrent if config["concurrency"] > 1 else iter_raw_pages
+    stop_main_pass = threading.Event()
+
+    def check_early_stop(raw_items, offset):
+        # Needs only the raw rows' tender_ids, so it runs as each page is
+        # fetched rather than after it is saved, and the fetcher stops
+        # requesting pages as soon as it can.
+        stop = early_stop.update([raw_tender_id(item) for item in raw_items], offset)
+        if not early_stop.newest_first:
+            log.warning(
+                "Page at offset %d is not in newest-first tender_id order -- "
+                "--incremental fetches every page this run", offset,
+            )
+        elif stop:
+            log.info(
+                "%d consecutive pages of known tenders -- stopping at offset %d",
+                early_stop.streak, offset,
+            )
+            stop_main_pass.set()
+
+    def fetch_stage():
+        # The main pass, then (even after an early stop) the deferred pages,
+        # retried on a fresh session in case the failures were tied to the
+        # old one. The fetcher checks stop_main_pass before requesting each
+        # page; pages already requested are still saved.
+        main_pass = pages(session, config, failed, stop_main_pass)
+        total     = 0
+        try:
+            for raw_items, total, offset in main_pass:
+                if early_stop and early_stop.newest_first and not stop_main_pass.is_set():
+                    check_early_stop(raw_items, offset)
+                yield raw_items, total, offset
+        finally:
+            main_pass.close()
+        if not failed:
+            return
+        log.info("Retrying %d deferred page(s) on a fresh session", len(failed))
+        fresh = SessionPool(new_session, 1)
+        try:
+            yield from retry_failed_pages(fresh, config, failed, total)
+        finally:
+            fresh.close()
+
+    parse_pool = None
+    parse      = partial(parse_page, backend=html_backend)
+    rows       = partial(parse_rows, backend=html_backend)
+    if config["parse_workers"] > 1:
+        parse_pool = ParsePool(config["parse_workers"], run_id, html_backend)
+        parse      = parse_pool.parse_page
+        rows       = parse_pool.parse_rows
+        log.info("Parsing on %d worker processes", config["parse_workers"])
+    parse_cache = None
+    if config["parse_cache_size"] > 0:
+        parse_cache = ParseCache(config["parse_cache_size"], config["parse_cache"], html_backend)
+        parse       = partial(parse_cache.parse_page, parse_rows=rows)
+
+    type_model = load_type_model(config["type_model"])
+
+    def parse_stage(page):
+        # Rows of stored, unchanged tenders are dropped here, before any
+        # HTML parsing; `known` is (rows skipped, tender_id -> row hash).
+        to_parse, known = page[0], (0, {})
+        if tender_index is not None:
+            to_parse, skipped, hashes = tender_index.split(page[0], raw_tender_id)
+            known = (skipped, hashes)
+        try:
+            return page, parse(to_parse) if to_parse else [], known, None
+        except Exception as exc:
+            return page, None, known, exc
+
+    def page_written(offset, record_count, content_hash, row_hashes, parsed, page_saved, page_deduped):
+        record_page_checkpoint(
+            config["metadata_db"], run_id, offset, record_count, content_hash,
+            parsed, page_saved, page_deduped,
+        )
+        record_row_hashes(config["metadata_db"], row_hashes)
+
+    def clean_stage(item):
+        page, parsed, known, error = item
+        if error is not None:
+            return page, parsed, known, None, error
+        return page, parsed, known, clean_columns(parsed, type_model), None
 
+    pipeline = Pipeline(
+        fetch_stage(),
+        [("parse", parse_stage), ("clean", clean_stage)],
+        maxsize     = config["pipeline_depth"],
+        source_name = "fetch",
+        sink_name   = "persist",
+    )
     try:
-        for raw_items, total in iter_raw_pages(session, config):
+        for (raw_items, total, offset), parsed, (skipped_known, row_hashes), result, error in pipeline:
             pages_visited += 1
 
-            try:
-                parsed = parse_page(raw_items)
-            except Exception as exc:
-                log.error("Parse error on page %d: %s", pages_visited, exc)
+            if error is not None:
+                log.error("Parse error on page %d: %s", pages_visited, error)
                 failures += 1
-                error_summary.append(f"page {pages_visited}: parse error -- {exc}")
+                error_summary.append(f"page {pages_visited}: parse error -- {error}")
                 continue
 
             tenders_parsed += len(parsed)
-            cleaned, skipped = clean_records(parsed)
+            known_skipped  += skipped_known
+            # Cleaned pages stay in columns (cleaner.clean_columns) until
+            # they are written.
+            columns, skipped = result
+            cleaned_ids      = columns["tender_id"]
 
             if skipped:
                 log.debug("Skipped %d records on page %d", skipped, pages_visited)
 
-            for r in cleaned:
-                type_counter[r["tender_type"]] += 1
-
-            all_clean.extend(cleaned)
+            type_counter.update(columns["tender_type"])
 
             log.info(
-                "Page %d: %d raw -> %d parsed -> %d cleaned",
-                pages_visited, len(raw_items), len(parsed), len(cleaned),
+                "Page %d: %d raw -> %d known, unchanged -> %d parsed -> %d cleaned",
+                pages_visited, len(raw_items), skipped_known, len(parsed), len(cleaned_ids),
             )
 
+            if config["dry_run"]:
+                saved += len(cleaned_ids)
+            else:
+                refresh = frozenset()
+                stored  = {}
+                if tender_index is not None:
+                    refresh = frozenset(tid for tid in cleaned_ids if tid in tender_index)
+                    # Only rows whose tender is now stored; anything the
+                    # cleaner dropped is parsed again next run.
+                    kept   = set(cleaned_ids)
+                    stored = {tid: h for tid, h in row_hashes.items()
+                              if tid in kept or tid in tender_index}
+                try:
+                    # The page is checkpointed only once its records are on
+                    # disk, so --resume never skips records that did not
+                    # reach the output file.
+                    page_saved, page_deduped = store.save(
+                        columns_to_records(columns), refresh=refresh,
+                        on_written=partial(
+                            page_written, offset, len(raw_items), page_hash(raw_items), stored,
+                            len(parsed),
+                        ),
+                    )
+                except Exception as exc:
+                    log.error("Failed to save page at offset %d: %s", offset, exc)
+                    failures += 1
+                    error_summary.append(f"save offset {offset}: {exc}")
+                    break
+                saved   += page_saved
+                deduped += page_deduped
+                if tender_index is not None:
+                    tender_index.update(stored)
+
+
     except KeyboardInterrupt:
-        log.warning("Interrupted -- saving what we have...")
+        log.warning("Interrupted -- completed pages are saved; continue with --resume %s", run_id)
     except Exception as exc:
         log.error("Fatal fetch error: %s", exc)
         failures += 1
         error_summary.append(f"fatal: {exc}")
-
-    saved   = 0
-    deduped = 0
-
-    if config["dry_run"]:
-        log.info("[dry-run] Would write %d records. Nothing saved.", len(all_clean))
-        saved = len(all_clean)
-    else:
+    finally:
+        pipeline.close()
+        if parse_pool:
+            parse_pool.close()
+    if not config["dry_run"]:
         try:
-            saved, deduped = save_records(all_clean, config["output"])
+            store.close()
         except Exception as exc:
-            log.error("Failed to save records: %s", exc)
+            log.error("Failed to write %s: %s", config["output"], exc)
             failures += 1
             error_summary.append(f"save: {exc}")
+    pipeline.log_stats()
+    if parse_cache:
+        parse_cache.log_stats()
+        parse_cache.close()
+    if known_skipped:
+        log.info("Skipped parsing %d rows of stored, unchanged tenders", known_skipped)
+
+    if failed:
+        offsets = [start for start, _ in failed]
+        log.error("%d page(s) could not be fetched: offsets %s", len(offsets), offsets)
+        failures += len(offsets)
+        error_summary.append(f"unrecoverable offsets: {offsets}")
+
+    session.close()
+    if session.refreshes:
+        log.info("Session pool re-authenticated %d time(s)", session.refreshes)
+
+    if config["dry_run"]:
+        log.info("[dry-run] Would write %d records. Nothing saved.", saved)
 
     finish_run_metadata(
         db_path        = config["metadata_db"],
-        run_id         = RUN_ID,
+        run_id         = run_id,
         start_time     = start_time,
         pages_visited  = pages_visited,
         tenders_parsed = tenders_parsed,
@@ -121,6 +336,7 @@ def main() -> int:
         error_summary  = error_summary,
         tender_types   = list(type_counter.keys()),
         dry_run        = config["dry_run"],
+        failed_offsets = [start for start, _ in failed],
     )
 
     log.info("Tender type breakdown: %s", dict(type_counter))
@@ -0,0 +1,251 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import requests
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+# The portal answers an expired TSESSIONID with a bare HTTP 500 (not
+# 502/503/504). This many in a row on one session means it has expired.
+EXPIRED_AFTER_500S   = 2
+_REFRESH_BACKOFF_CAP = 30
+# Once an expiry has been seen, sessions are renewed in the background when
+# they reach this fraction of the shortest lifetime observed so far.
+_PROACTIVE_FRACTION  = 0.8
+_PROACTIVE_MIN_AGE   = 5.0
+
+
+def session_id(session: requests.Session) -> str:
+    m = re.match(r"TSESSIONID=([^;]*)", session.headers.get("Cookie", ""))
+    return m.group(1) if m else ""
+
+
+class SessionCache:
+    """
+    TSESSIONIDs kept across runs in a small JSON file, keyed by base URL.
+    Entries older than `ttl` seconds are ignored. Within one process each
+    cached id is handed out at most once, so pooled sessions stay distinct.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl  = ttl
+        self._lock       = threading.Lock()
+        self._handed_out: set[str] = set()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, data: dict) -> None:
+        tmp = f"{self.path}.tmp"
+        try:
+            # Owner-only: the ids are live session cookies.
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            log.warning("Could not write session cache %s: %s", self.path, exc)
+
+    def _fresh(self, data: dict, base_url: str) -> list[dict]:
+        now = time.time()
+        return [e for e in data.get(base_url, []) if now - e.get("created", 0) < self.ttl]
+
+    def checkout(self, base_url: str) -> str:
+        """Newest unexpired cached id not yet used by this process, or ""."""
+        with self._lock:
+            entries = self._fresh(self._read(), base_url)
+            for entry in sorted(entries, key=lambda e: e["created"], reverse=True):
+                if entry["id"] not in self._handed_out:
+                    self._handed_out.add(entry["id"])
+                    return entry["id"]
+        return ""
+
+    def store(self, base_url: str, sid: str) -> None:
+        with self._lock:
+            data = self._read()
+            data[base_url] = self._fresh(data, base_url) + [{"id": sid, "created": time.time()}]
+            self._handed_out.add(sid)
+            self._write(data)
+
+    def discard(self, base_url: str, sid: str) -> None:
+        with self._lock:
+            data = self._read()
+            data[base_url] = [e for e in self._fresh(data, base_url) if e["id"] != sid]
+            self._write(data)
+
+
+class _Slot:
+
+    def __init__(self, index: int, session: requests.Session):
+        self.index      = index
+        self.session    = session
+        self.created    = time.monotonic()
+        self.first_500  = 0.0
+        self.healthy    = bool(session_id(session))
+        self.refreshing = False
+        self.fails      = 0
+        self.in_flight  = 0
+        self.served     = 0
+
+
+class SessionPool:
+    """
+    Several warm portal sessions behind a requests.Session-like `post`, so
+    fetch_page can use a pool anywhere it takes a session.
+
+    Each call goes to the healthy session with the fewest requests in flight.
+    A session that returns EXPIRED_AFTER_500S consecutive HTTP 500s is taken
+    out of rotation and re-authenticated on a background thread while the
+    others keep serving. The age at which it started failing becomes the
+    pool's TTL estimate, and other sessions nearing that age are renewed
+    before they expire.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], requests.Session],
+        size: int,
+        wait_timeout: float = 30.0,
+    ):
+        self._factory      = factory
+        self._wait_timeout = wait_timeout
+        self._cond         = threading.Condition()
+        self._closed       = False
+        self.refreshes     = 0
+        self.observed_ttl  = None
+
+        size = max(1, size)
+        with ThreadPoolExecutor(max_workers=size, thread_name_prefix="session-warm") as ex:
+            sessions = list(ex.map(lambda _: factory(), range(size)))
+        self._slots = [_Slot(i, s) for i, s in enumerate(sessions)]
+        for slot in self._slots:
+            if not slot.healthy:
+                self._start_refresh(slot)
+        log.info("Session pool ready: %d/%d sessions healthy", self.healthy_count, size)
+
+    @property
+    def healthy_count(self) -> int:
+        return sum(1 for slot in self._slots if slot.healthy)
+
+    def _acquire(self) -> _Slot:
+        deadline = time.monotonic() + self._wait_timeout
+        with self._cond:
+            while True:
+                healthy = [slot for slot in self._slots if slot.healthy]
+                if healthy:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Nothing recovered in time; let the request go out and
+                    # fail through fetch_page's normal retry path.
+                    log.warning("No healthy session after %.0fs -- using a stale one",
+                                self._wait_timeout)
+                    healthy = self._slots
+                    break
+                self._cond.wait(remaining)
+            if self.observed_ttl:
+                now = time.monotonic()
+                renew_at = max(_PROACTIVE_MIN_AGE, self.observed_ttl * _PROACTIVE_FRACTION)
+                for sl in healthy:
+                    if now - sl.created >= renew_at:
+                        self._start_refresh(sl)
+            slot = min(healthy, key=lambda sl: (sl.in_flight, sl.served))
+            slot.in_flight += 1
+            slot.served    += 1
+            return slot
+
+    def _release(self, slot: _Slot, session: requests.Session, status: int | None) -> None:
+        with self._cond:
+            slot.in_flight -= 1
+            if slot.session is not session:
+                return                       # answer from a session already replaced
+            if status == 500:
+                slot.fails += 1
+                if slot.fails == 1:
+                    slot.first_500 = time.monotonic()
+                if slot.healthy and slot.fails >= EXPIRED_AFTER_500S:
+                    lifetime = slot.first_500 - slot.created
+                    if self.observed_ttl is None or lifetime < self.observed_ttl:
+                        self.observed_ttl = lifetime
+                    log.warning(
+                        "Session %d (%s…) returned %d consecutive HTTP 500s -- refreshing",
+                        slot.index, session_id(session)[:8], slot.fails,
+                    )
+                    slot.healthy = False
+                    self._start_refresh(slot)
+            elif status is not None:
+                slot.fails = 0
+
+    def _start_refresh(self, slot: _Slot) -> None:
+        if slot.refreshing:
+            return
+        slot.refreshing = True
+        threading.Thread(
+            target=self._refresh, args=(slot,),
+            daemon=True, name=f"session-refresh-{slot.index}",
+        ).start()
+
+    def _refresh(self, slot: _Slot) -> None:
+        # Keep trying with capped backoff: a slot that gives up would never
+        # be picked again, since only a used session can be marked expired.
+        attempt = 0
+        fresh   = None
+        while not self._closed:
+            attempt += 1
+            try:
+                fresh = self._factory()
+                if session_id(fresh):
+                    break
+                log.warning("Session %d refresh attempt %d: no TSESSIONID", slot.index, attempt)
+                fresh.close()
+            except Exception as exc:
+                log.warning("Session %d refresh attempt %d failed: %s", slot.index, attempt, exc)
+            fresh = None
+            time.sleep(min(_REFRESH_BACKOFF_CAP, 2 ** attempt))
+
+        if fresh is None:
+            return
+
+        with self._cond:
+            old = slot.session
+            slot.session    = fresh
+            slot.created    = time.monotonic()
+            slot.healthy    = True
+            slot.refreshing = False
+            slot.fails      = 0
+            self.refreshes += 1
+            self._cond.notify_all()
+        old.close()
+        log.info(
+            "Session %d refreshed (%s…) -- %d/%d healthy",
+            slot.index, session_id(fresh)[:8], self.healthy_count, len(self._slots),
+        )
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        slot    = self._acquire()
+        session = slot.session
+        status  = None
+        try:
+            resp   = session.post(url, **kwargs)
+            status = resp.status_code
+            return resp
+        finally:
+            self._release(slot, session, status)
+
+    def close(self) -> None:
+        self._closed = True
+        for slot in self._slots:
+            slot.session.close()
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import async_fetcher
+from async_fetcher import TokenBucket, iter_raw_pages_concurrent
+
+
+def make_config(**kwargs):
+    config = {
+        "limit":       None,
+        "rate_limit":  0,
+        "concurrency": 4,
+        "retries":     0,
+        "timeout":     5,
+        "page_size":   10,
+    }
+    config.update(kwargs)
+    return config
+
+
+class FakeServer:
+    """Stands in for fetcher.fetch_page; slower for low offsets so pages finish out of order."""
+
+    def __init__(self, total):
+        self.total      = total
+        self.calls      = []
+        self.active     = 0
+        self.max_active = 0
+        self._lock      = threading.Lock()
+
+    def fetch_page(self, session, start, length, timeout, retries, envelopes=None, api_url=None, stats=None, policy=None):
+        with self._lock:
+            self.calls.append(start)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02 if start % 20 == 0 else 0.005)
+        with self._lock:
+            self.active -= 1
+        rows = [{"1": str(i)} for i in range(start, min(start + length, self.total))]
+        return {"iTotalRecords": self.total, "data": rows}
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    server = FakeServer(total=95)
+    monkeypatch.setattr(async_fetcher.fetcher, "fetch_page", server.fetch_page)
+    return server
+
+
+class TestTokenBucket:
+
+    def test_zero_rate_never_waits(self):
+        async def run():
+            bucket = TokenBucket(0)
+            t0 = time.monotonic()
+            for _ in range(100):
+                await bucket.acquire()
+            return time.monotonic() - t0
+        assert asyncio.run(run()) < 0.1
+
+    def test_rate_is_enforced(self):
+        async def run():
+            bucket = TokenBucket(50, capacity=1)
+            t0 = time.monotonic()
+            for _ in range(6):
+                await bucket.acquire()
+            return time.monotonic() - t0
+        # first token is free, the remaining 5 need ~0.1s at 50/s
+        assert asyncio.run(run()) >= 0.09
+
+
+class TestIterRawPagesConcurrent:
+
+    def test_pages_yielded_in_offset_order(self, fake_server):
+        pages = list(iter_raw_pages_concurrent(None, make_config()))
+        ids = [int(r["1"]) for rows, _, _ in pages for r in rows]
+        assert ids == list(range(95))
+
+    def test_total_reported_on_every_page(self, fake_server):
+        pages = list(iter_raw_pages_concurrent(None, make_config()))
+        assert {total for _, total, _ in pages} == {95}
+        assert len(pages) == 10
+
+    def test_offsets_reported_with_each_page(self, fake_server):
+        pages = list(iter_raw_pages_concurrent(None, make_config()))
+        assert [offset for _, _, offset in pages] == list(range(0, 95, 10))
+
+    def test_start_offset_skips_committed_pages(self, fake_server):
+        pages = list(iter_raw_pages_concurrent(None, make_config(start_offset=60)))
+        assert [offset for _, _, offset in pages] == [60, 70, 80, 90]
+        assert 0 not in fake_server.calls
+
+    def test_limit_caps_offsets(self, fake_server):
+        pages = list(iter_raw_pages_concurrent(None, make_config(limit=25)))
+        assert len(pages) == 3
+        assert sorted(fake_server.calls) == [0, 10, 20]
+
+    def test_requests_overlap_up_to_concurrency(self, fake_server):
+        list(iter_raw_pages_concurrent(None, make_config(concurrency=3)))
+        assert 1 < fake_server.max_active <= 3
+
+    def test_early_break_stops_fetching(self, fake_server):
+        for i, _ in enumerate(iter_raw_pages_concurrent(None, make_config(concurrency=2))):
+            if i == 1:
+                break
+        assert len(fake_server.calls) < 10
+
+    def test_stop_schedules_no_new_pages(self, fake_server):
+        stop  = threading.Event()
+        pages = []
+        for rows, _, offset in iter_raw_pages_concurrent(None, make_config(concurrency=2), stop=stop):
+            pages.append(offset)
+            if offset == 10:
+                stop.set()
+        # The page already in flight when the stop came is still handed back.
+        assert pages == [0, 10, 20]
+        assert sorted(fake_server.calls) == [0, 10, 20]
+
+    def test_page_waiting_on_rate_limit_not_requested_after_stop(self, fake_server):
+        stop  = threading.Event()
+        pages = []
+        config = make_config(concurrency=4, rate_limit=0.1)
+        for rows, _, offset in iter_raw_pages_concurrent(None, config, stop=stop):
+            pages.append(offset)
+            if offset == 10:
+                stop.set()
+        assert pages == [0, 10]
+        assert sorted(fake_server.calls) == [0, 10]
+
+    def test_fetch_error_propagates(self, monkeypatch):
+        def failing(session, start, length, timeout, retries, envelopes=None, api_url=None, stats=None, policy=None):
+            if start == 20:
+                raise RuntimeError("All 1 attempts failed for start=20")
+            return {"iTotalRecords": 50, "data": [{"1": str(start)}]}
+
+        monkeypatch.setattr(async_fetcher.fetcher, "fetch_page", failing)
+        with pytest.raises(RuntimeError):
+            list(iter_raw_pages_concurrent(None, make_config()))
+
+    def test_failed_page_is_deferred(self, monkeypatch):
+        def failing(session, start, length, timeout, retries, envelopes=None, api_url=None, stats=None, policy=None):
+            if start == 20:
+                raise RuntimeError("All 1 attempts failed for start=20")
+            return {"iTotalRecords": 50, "data": [{"1": str(start)}]}
+
+        monkeypatch.setattr(async_fetcher.fetcher, "fetch_page", failing)
+        failed = []
+        pages  = list(iter_raw_pages_concurrent(None, make_config(), failed))
+        assert [offset for _, _, offset in pages] == [0, 10, 30, 40]
+        assert failed == [(20, 10)]
+
+    def test_open_circuit_is_not_deferred(self, monkeypatch):
+        def failing(session, start, length, timeout, retries, envelopes=None, api_url=None, stats=None, policy=None):
+            if start == 20:
+                raise async_fetcher.fetcher.CircuitOpenError("circuit open")
+            return {"iTotalRecords": 50, "data": [{"1": str(start)}]}
+
+        monkeypatch.setattr(async_fetcher.fetcher, "fetch_page", failing)
+        with pytest.raises(RuntimeError, match="circuit open"):
+            list(iter_raw_pages_concurrent(None, make_config(), []))
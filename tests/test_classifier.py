@@ -0,0 +1,205 @@
+import json
+import os
+import random
+import re
+import tempfile
+
+import pytest
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import classifier
+import mock_server
+from classifier import KeywordClassifier, Match, RULES_PATH, _trie_pattern
+
+RULES = [
+    ("Goods",    ["supply", "drug", "drugs"]),
+    ("Services", ["service", "O&M", "housekeep"]),
+    ("Works",    ["work", "road"]),
+]
+
+
+@pytest.fixture
+def clf():
+    return KeywordClassifier(RULES, "Works")
+
+
+class TestTriePattern:
+
+    def test_matches_exactly_the_words(self):
+        words = ["dam", "drug", "drugs", "d", "road"]
+        pattern = re.compile(f"(?:{_trie_pattern(words)})$")
+        for w in words:
+            assert pattern.match(w)
+        for w in ["dru", "drugss", "roa", "da", ""]:
+            assert not pattern.match(w)
+
+
+class TestKeywordClassifier:
+
+    def test_first_rule_wins(self, clf):
+        assert clf.classify("road service and supply") == "Goods"
+        assert clf.classify("road service") == "Services"
+
+    def test_default_when_nothing_matches(self, clf):
+        assert clf.classify("nothing relevant here") == "Works"
+        assert clf.classify("") == "Works"
+
+    def test_whole_words_only(self, clf):
+        assert clf.classify("housekeeping of premises") == "Works"
+        assert clf.classify("drugstore") == "Works"
+        assert clf.classify("drugs and road") == "Goods"
+
+    def test_case_insensitive_and_symbols(self, clf):
+        assert clf.classify("Annual o&m contract") == "Services"
+        assert clf.classify("SUPPLY OF DRUGS") == "Goods"
+
+    def test_unicode_case_folding_matches_re(self, clf):
+        # re.I matches the long s to "s"; str.lower() does not.
+        assert clf.classify("ſupply of kits") == "Goods"
+
+    def test_matches_reports_labels_and_positions(self, clf):
+        text = "Road work, O&M service"
+        assert clf.matches(text) == [
+            Match("Works", "Road", 0, 4),
+            Match("Works", "work", 5, 9),
+            Match("Services", "O&M", 11, 14),
+            Match("Services", "service", 15, 22),
+        ]
+
+    def test_keyword_in_two_rules_keeps_first(self):
+        clf = KeywordClassifier([("A", ["pump"]), ("B", ["pump", "valve"])], "B")
+        assert clf.classify("pump") == "A"
+
+    def test_rejects_keywords_with_edge_symbols(self):
+        with pytest.raises(ValueError):
+            KeywordClassifier([("A", ["&co"])], "A")
+
+    def test_rejects_empty_rules(self):
+        with pytest.raises(ValueError):
+            KeywordClassifier([], "Works")
+
+
+class TestRulesFile:
+
+    def test_loads_from_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "rules.json")
+            with open(path, "w") as f:
+                json.dump({"default": "Other", "rules": [{"label": "Goods", "keywords": ["supply"]}]}, f)
+            clf = KeywordClassifier.from_file(path)
+        assert clf.classify("supply of pumps") == "Goods"
+        assert clf.classify("repair") == "Other"
+
+    def test_shipped_rules_match_original_regexes(self):
+        # The rule table cleaner used before it moved to tender_types.json.
+        old = [
+            ("Goods", re.compile(
+                r"\b(supply|purchase|procurement|material|equipment|goods|item|"
+                r"glassware|drugs?|medicine|instruments?|furnish)\b", re.I)),
+            ("Services", re.compile(
+                r"\b(service|maintenance|housekeep|security|consultanc|management|"
+                r"operation|O&M|hire|outsourc|facility|software|AMC|annual)\b", re.I)),
+            ("Works", re.compile(
+                r"\b(construct|civil|erect|repair|renovate|road|building|pipeline|"
+                r"bridge|dam|canal|laying|install|work)\b", re.I)),
+        ]
+
+        def classify_old(text):
+            return next((label for label, p in old if p.search(text)), "Works")
+
+        clf   = KeywordClassifier.from_file(RULES_PATH)
+        words = " ".join(mock_server._WORKS).split() + ["O&M", "drugs", "housekeeping", "AMC", "-"]
+        rng   = random.Random(0)
+        for _ in range(3000):
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 20)))
+            assert clf.classify(text) == classify_old(text), text
+
+
+needs_numpy = pytest.mark.skipif(classifier.np is None, reason="numpy not installed")
+
+TEXTS = [
+    "supply of pumps", "supply of pipes", "purchase of drugs", "supply of cement bags",
+    "repair of road", "construction of canal", "repair of school building", "laying of road",
+]
+LABELS = ["Goods"] * 4 + ["Works"] * 4
+
+
+@pytest.fixture
+def model():
+    return classifier.train_model(TEXTS, LABELS, n_features=2 ** 12, epochs=100)
+
+
+@needs_numpy
+class TestHashedNgramModel:
+
+    def test_learns_training_labels(self, model):
+        assert model.predict(TEXTS) == LABELS
+
+    def test_generalises_to_new_text(self, model):
+        assert model.predict(["supply of valves", "repair of bridge road"]) == ["Goods", "Works"]
+
+    def test_unsure_or_unseen_text_is_none(self, model):
+        assert model.predict(["", "xyzzy plugh"]) == [None, None]
+        model.threshold = 1.01
+        assert model.predict(TEXTS) == [None] * len(TEXTS)
+
+    def test_features_stay_within_each_text(self, model):
+        rows, cols = model.features(["a b", "", "c\x00d", "e"])
+        # 2 words + 1 bigram, nothing, 2 words + 1 bigram, 1 word.
+        assert sorted(rows.tolist()) == [0, 0, 0, 2, 2, 2, 3]
+        assert cols.max() < model.n_features
+
+    def test_page_matches_one_by_one(self, model):
+        texts = TEXTS + ["supply and repair", "road supply"]
+        assert model.predict(texts) == [model.predict([t])[0] for t in texts]
+
+    def test_save_and_load(self, model):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "model.npz")
+            model.save(path)
+            loaded = classifier.load_type_model(path)
+        assert loaded.labels == model.labels
+        assert loaded.threshold == model.threshold
+        assert loaded.predict(TEXTS) == model.predict(TEXTS)
+
+
+class TestLoadTypeModel:
+
+    def test_empty_path_means_rules_only(self):
+        assert classifier.load_type_model("") is None
+
+    def test_unreadable_file_falls_back_to_rules(self):
+        assert classifier.load_type_model("/nonexistent/model.npz") is None
+
+
+@needs_numpy
+class TestCleanRecordsWithModel:
+
+    def test_confident_predictions_replace_rule_type(self, model, raw_works_item):
+        from cleaner import clean_records
+        from parser import parse_raw_record
+        raw = parse_raw_record(raw_works_item)
+        raw["name_of_work"] = "Pipes and pumps for the village"    # no keyword: rules say Works
+        assert clean_records([raw])[0][0]["tender_type"] == "Works"
+        assert clean_records([raw], model)[0][0]["tender_type"] == "Goods"
+
+    def test_unsure_predictions_keep_rule_type(self, model, raw_works_item):
+        from cleaner import clean_records
+        from parser import parse_raw_record
+        model.threshold = 1.01
+        raw = parse_raw_record(raw_works_item)
+        assert clean_records([raw], model) == clean_records([raw])
+
+    def test_rules_only_run_on_unsure_rows(self, model, raw_works_item, monkeypatch):
+        import cleaner
+        from parser import parse_raw_record
+        sure, unsure = parse_raw_record(raw_works_item), parse_raw_record(raw_works_item)
+        sure["name_of_work"]   = "Pipes and pumps for the village"
+        unsure["name_of_work"] = "xyzzy plugh"
+        seen = []
+        rules = cleaner._classify_tender_type
+        monkeypatch.setattr(cleaner, "_classify_tender_type", lambda text: seen.append(text) or rules(text))
+        records, _ = cleaner.clean_records([sure, unsure], model)
+        assert [r["tender_type"] for r in records] == ["Goods", "Works"]
+        assert seen == ["xyzzy plugh"]
@@ -10,9 +10,13 @@ from cleaner import (
     _clean_description,
     _parse_value,
     _parse_doc_count,
+    RECORD_FIELDS,
+    clean_columns,
     clean_record,
     clean_records,
+    columns_to_records,
 )
+from schema import TenderRecord
 
 
 
@@ -75,6 +79,39 @@ class TestParseDate:
         result = _parse_date("01-01-2026")
         assert result == "2026-01-01"
 
+    def test_unpadded_date_falls_back_to_strptime(self):
+        assert _parse_date("5-3-2026 9:05") == "2026-03-05"
+
+    def test_impossible_date_returns_none(self):
+        assert _parse_date("31-02-2026 10:00:00") is None
+        assert _parse_date("05-03-2026 24:00") is None
+
+    def test_mixed_separators_return_none(self):
+        assert _parse_date("05-03/2026") is None
+
+    @pytest.mark.parametrize("raw", [
+        "05-03-2026 18:05:00", "05/03/2026 18:05", "29-02-2024", "5/3/2026",
+        "05-03-0999", "05-03-2026 18:05:60", "05-03-2026T18:05", "٠٥-٠٣-٢٠٢٦",
+    ])
+    def test_matches_strptime_formats(self, raw):
+        from datetime import datetime
+        from cleaner import _DATE_FORMATS
+        expected = None
+        for fmt in _DATE_FORMATS:
+            try:
+                expected = datetime.strptime(raw, fmt).strftime("%Y-%m-%d")
+                break
+            except ValueError:
+                pass
+        assert _parse_date(raw) == expected
+
+    def test_repeated_dates_are_cached(self):
+        _parse_date.cache_clear()
+        for _ in range(3):
+            _parse_date("07-04-2026 12:00:00")
+        info = _parse_date.cache_info()
+        assert (info.hits, info.misses) == (2, 1)
+
 
 
 class TestClassifyTenderType:
@@ -237,6 +274,12 @@ class TestCleanRecord:
     def test_missing_tender_id_returns_none(self, parsed_missing_id_record):
         assert clean_record(parsed_missing_id_record) is None
 
+    def test_returns_tender_record(self, parsed_works_record):
+        parsed_works_record["source_url"] = None
+        result = clean_record(parsed_works_record)
+        assert isinstance(result, TenderRecord)
+        assert result["source_url"] == ""
+
     def test_output_has_all_required_fields(self, parsed_works_record):
         result = clean_record(parsed_works_record)
         required = ["tender_id", "tender_type", "title", "organisation",
@@ -278,3 +321,46 @@ class TestCleanRecords:
         cleaned, skipped = clean_records([parsed_works_record, parsed_goods_record])
         assert len(cleaned) == 2
         assert skipped == 0
+
+
+class TestCleanColumns:
+    def test_matches_clean_record_row_by_row(self, parsed_works_record, parsed_goods_record,
+                                             parsed_missing_id_record):
+        raw_list = [parsed_works_record, parsed_missing_id_record, parsed_goods_record]
+        columns, skipped = clean_columns(raw_list)
+        assert skipped == 1
+        assert columns_to_records(columns) == [clean_record(parsed_works_record),
+                                               clean_record(parsed_goods_record)]
+
+    def test_one_column_per_field_in_record_order(self, parsed_works_record):
+        columns, _ = clean_columns([parsed_works_record, parsed_works_record])
+        assert list(columns) == list(RECORD_FIELDS)
+        assert all(len(values) == 2 for values in columns.values())
+        assert list(columns_to_records(columns)[0]) == list(clean_record(parsed_works_record))
+
+    def test_missing_and_none_fields(self):
+        raw = {"tender_id": "7", "name_of_work": None, "corrigendum": None}
+        columns, _ = clean_columns([raw, {"tender_id": " 8 "}])
+        assert columns["tender_id"] == ["7", "8"]
+        assert columns["description"] == ["", ""]
+        assert columns["corrigendum"] == ["", ""]
+        assert columns["attachments"] == [0, 0]
+        assert columns["source_url"] == ["", ""]
+
+    def test_values_containing_separator_fall_back(self, parsed_works_record):
+        parsed_works_record["name_of_work"] = "Road\x00  work\n"
+        parsed_works_record["ifb_no"] = "A\x00B"
+        columns, _ = clean_columns([parsed_works_record, {"tender_id": "9", "ifb_no": "C  D"}])
+        assert columns["description"][0] == clean_record(parsed_works_record)["description"]
+        assert columns["title"] == ["A\x00B", "C D"]
+
+    def test_boilerplate_removed_per_value(self):
+        raw_list = [{"tender_id": str(i), "name_of_work": name}
+                    for i, name in enumerate(["Bid documents for  road  work", "  supply of pipes  "])]
+        columns, _ = clean_columns(raw_list)
+        assert columns["description"] == [clean_record(r)["description"] for r in raw_list]
+
+    def test_empty_batch(self):
+        columns, skipped = clean_columns([])
+        assert skipped == 0
+        assert columns_to_records(columns) == []
@@ -12,13 +12,30 @@ def make_args(**kwargs):
         "limit":       None,
         "rate_limit":  1.5,
         "concurrency": 1,
+        "sessions":    1,
+        "transport":   "requests",
+        "session_cache": "",
+        "session_ttl": 1200.0,
         "retries":     3,
+        "breaker_threshold": 5,
+        "breaker_cooldown":  5.0,
         "timeout":     60,
         "output":      "sample-output.json",
         "metadata_db": "runs_metadata.db",
         "user_agent":  "TestAgent/1.0",
         "page_size":   50,
+        "pipeline_depth": 4,
+        "parse_workers":  1,
+        "html_backend":   "auto",
+        "parse_cache_size": 10000,
+        "parse_cache":    "",
+        "type_model":     "",
+        "base_url":    "https://tender.nprocure.com",
         "dry_run":     False,
+        "parse_known": False,
+        "resume":      None,
+        "incremental": False,
+        "stop_after_known": 2,
     }
     defaults.update(kwargs)
     return argparse.Namespace(**defaults)
@@ -68,3 +85,35 @@ class TestBuildConfig:
     def test_retries_default(self):
         config = build_config(make_args())
         assert config["retries"] == 3
+
+    def test_base_url_trailing_slash_stripped(self):
+        config = build_config(make_args(base_url="http://127.0.0.1:8080/"))
+        assert config["base_url"] == "http://127.0.0.1:8080"
+
+    def test_resume_none_by_default(self):
+        config = build_config(make_args())
+        assert config["resume"] is None
+
+    def test_resume_run_id(self):
+        config = build_config(make_args(resume="ab12cd34"))
+        assert config["resume"] == "ab12cd34"
+
+    def test_incremental(self):
+        config = build_config(make_args(incremental=True, stop_after_known=3))
+        assert config["incremental"] is True
+        assert config["stop_after_known"] == 3
+
+    def test_page_size_auto(self):
+        config = build_config(make_args(page_size="auto"))
+        assert config["auto_page_size"] is True
+        assert isinstance(config["page_size"], int)
+
+    def test_fixed_page_size_is_not_auto(self):
+        config = build_config(make_args(page_size=100))
+        assert config["auto_page_size"] is False
+        assert config["page_size"] == 100
+
+    def test_breaker_settings(self):
+        config = build_config(make_args(breaker_threshold=0, breaker_cooldown=2.5))
+        assert config["breaker_threshold"] == 0
+        assert config["breaker_cooldown"] == 2.5
@@ -1,11 +1,14 @@
 import base64
 import json
+import threading
 from pydoc import plain
 import pytest
 import sys, os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fetcher import _aes_encrypt, _build_envelope, _build_req_data
+import fetcher
+from fetcher import _aes_encrypt, _build_envelope, _build_req_data, EnvelopeBuilder, PageSizeTuner
+from fetcher import iter_raw_pages, retry_failed_pages
 
 
 
@@ -140,7 +143,175 @@ class TestBuildReqData:
         echos = [e["value"] for e in data["reqData"] if e["name"] == "sEcho"]
         assert echos == [1]
 
+    def test_sort_ascending_on_first_column(self):
+        data  = _build_req_data(0, 50)
+        sort  = {e["name"]: e["value"] for e in data["reqData"] if e["name"] in ("iSortCol_0", "sSortDir_0")}
+        assert sort == {"iSortCol_0": 0, "sSortDir_0": "asc"}
+
     def test_pagination_offset_applied_correctly(self):
         data = _build_req_data(50, 50)
         starts = [e["value"] for e in data["reqData"] if e["name"] == "iDisplayStart"]
         assert starts == [50]
+
+
+
+class TestEnvelopeBuilder:
+
+    def _decrypt(self, envelope):
+        return TestAesEncrypt()._decrypt(envelope["jsonData"], envelope["salt"], envelope["iv"])
+
+    def test_plaintext_matches_build_req_data(self):
+        builder = EnvelopeBuilder(pool_size=1)
+        for start, length in [(0, 50), (150, 100), (3750, 25)]:
+            expected = json.dumps(_build_req_data(start, length), separators=(",", ":"))
+            assert builder.plaintext(start, length) == expected
+
+    def test_envelope_decrypts_to_req_data(self):
+        envelope = EnvelopeBuilder(pool_size=2).build(200, 50)
+        assert json.loads(self._decrypt(envelope)) == _build_req_data(200, 50)
+
+    def test_envelope_has_required_keys(self):
+        envelope = EnvelopeBuilder(pool_size=1).build(0, 50)
+        assert set(envelope.keys()) == {"jsonData", "iv", "salt", "key"}
+        assert envelope["key"] == "ejdNcmw="
+
+    def test_salts_come_from_pool(self):
+        builder = EnvelopeBuilder(pool_size=3)
+        salts = {builder.build(0, 50)["salt"] for _ in range(12)}
+        assert len(salts) == 3
+
+    def test_each_envelope_gets_fresh_iv(self):
+        builder = EnvelopeBuilder(pool_size=1)
+        ivs = {builder.build(0, 50)["iv"] for _ in range(10)}
+        assert len(ivs) == 10
+
+
+
+class TestPageSizeTuner:
+
+    def _ok(self, elapsed):
+        return {"elapsed": elapsed, "bytes": 1000, "errors": 0}
+
+    def test_probes_each_candidate_smallest_first(self):
+        tuner = PageSizeTuner(candidates=(25, 50, 100))
+        sizes = []
+        for _ in range(3):
+            size = tuner.next_size()
+            sizes.append(size)
+            tuner.record(size, size, size, self._ok(0.1))
+        assert sizes == [25, 50, 100]
+
+    def test_settles_on_best_records_per_second(self):
+        tuner = PageSizeTuner(candidates=(25, 50, 100))
+        for size, elapsed in [(25, 0.10), (50, 0.12), (100, 0.40)]:
+            assert tuner.next_size() == size
+            tuner.record(size, size, size, self._ok(elapsed))
+        assert tuner.next_size() == 50
+        assert tuner.chosen == 50
+
+    def test_server_errors_cap_larger_sizes(self):
+        tuner = PageSizeTuner(candidates=(25, 50, 100))
+        tuner.record(25, 25, 25, self._ok(0.1))
+        tuner.record(50, 50, 50, {"elapsed": 0.1, "bytes": 1000, "errors": 2})
+        assert tuner.ceiling == 25
+        assert tuner.next_size() == 25
+
+    def test_backs_off_after_settling(self):
+        tuner = PageSizeTuner(candidates=(25, 50, 100))
+        for size in (25, 50, 100):
+            tuner.record(size, size, size, self._ok(0.1))
+        assert tuner.next_size() == 100
+        tuner.record(100, 100, 100, {"elapsed": 0.1, "bytes": 1000, "errors": 1})
+        assert tuner.next_size() == 50
+
+    def test_clamped_page_lowers_ceiling(self):
+        tuner = PageSizeTuner(candidates=(50, 100, 200))
+        tuner.record(200, 100, 200, self._ok(0.1))
+        assert tuner.ceiling == 100
+
+    def test_last_short_page_is_not_a_clamp(self):
+        tuner = PageSizeTuner(candidates=(50, 100))
+        tuner.record(100, 30, 30, self._ok(0.1))
+        assert tuner.ceiling == 100
+
+    def test_failed_request_shrinks_size(self):
+        tuner = PageSizeTuner(candidates=(25, 50, 100))
+        assert tuner.failed(100) is True
+        assert tuner.ceiling == 50
+        assert tuner.failed(25) is False
+
+
+class FlakyPortal:
+    """Stands in for fetch_page; offsets in `down` fail `times` times each."""
+
+    def __init__(self, total, down, times=1):
+        self.total = total
+        self.fails = {offset: times for offset in down}
+        self.calls = []
+
+    def fetch_page(self, session, start, length, timeout, retries, envelopes=None, api_url=None, stats=None, policy=None):
+        self.calls.append(start)
+        if self.fails.get(start, 0) > 0:
+            self.fails[start] -= 1
+            raise RuntimeError(f"All {retries + 1} attempts failed for start={start}")
+        rows = [{"1": str(i)} for i in range(start, min(start + length, self.total))]
+        return {"iTotalRecords": self.total, "data": rows}
+
+
+def _config(**kwargs):
+    config = {"limit": None, "rate_limit": 0, "timeout": 5, "retries": 0, "page_size": 10}
+    config.update(kwargs)
+    return config
+
+
+class TestDeferredPages:
+
+    def test_failure_raises_without_queue(self, monkeypatch):
+        monkeypatch.setattr(fetcher, "fetch_page", FlakyPortal(40, down=[20]).fetch_page)
+        with pytest.raises(RuntimeError):
+            list(iter_raw_pages(None, _config()))
+
+    def test_failed_page_skipped_and_queued(self, monkeypatch):
+        monkeypatch.setattr(fetcher, "fetch_page", FlakyPortal(40, down=[10, 20]).fetch_page)
+        failed = []
+        pages  = list(iter_raw_pages(None, _config(), failed))
+        assert [offset for _, _, offset in pages] == [0, 30]
+        assert failed == [(10, 10), (20, 10)]
+
+    def test_first_page_is_still_fatal(self, monkeypatch):
+        monkeypatch.setattr(fetcher, "fetch_page", FlakyPortal(40, down=[0]).fetch_page)
+        with pytest.raises(RuntimeError):
+            list(iter_raw_pages(None, _config(), []))
+
+    def test_retry_pass_recovers_pages(self, monkeypatch):
+        portal = FlakyPortal(40, down=[10, 20])
+        monkeypatch.setattr(fetcher, "fetch_page", portal.fetch_page)
+        failed = []
+        list(iter_raw_pages(None, _config(), failed))
+        pages = list(retry_failed_pages(None, _config(), failed, 40))
+        assert [offset for _, _, offset in pages] == [10, 20]
+        assert [r["1"] for r in pages[0][0]] == [str(i) for i in range(10, 20)]
+        assert failed == []
+
+    def test_unrecoverable_pages_stay_queued(self, monkeypatch):
+        monkeypatch.setattr(fetcher, "fetch_page", FlakyPortal(40, down=[10, 20], times=2).fetch_page)
+        failed = []
+        list(iter_raw_pages(None, _config(), failed))
+        assert list(retry_failed_pages(None, _config(), failed, 40)) == []
+        assert failed == [(10, 10), (20, 10)]
+
+
+class TestStopEvent:
+
+    def test_no_request_after_stop(self, monkeypatch):
+        portal = FlakyPortal(100, down=[])
+        monkeypatch.setattr(fetcher, "fetch_page", portal.fetch_page)
+        stop  = threading.Event()
+        pages = []
+        for rows, _, offset in iter_raw_pages(None, _config(), stop=stop):
+            pages.append(offset)
+            if offset == 20:
+                stop.set()
+        assert pages == [0, 10, 20]
+        assert portal.calls == [0, 10, 20]
+
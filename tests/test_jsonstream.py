@@ -0,0 +1,65 @@
+import json
+
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_server
+from jsonstream import StreamDecodeError, iter_rows
+
+
+def _chunks(blob: bytes, size: int):
+    return [blob[i:i + size] for i in range(0, len(blob), size)]
+
+
+PAGE = {
+    "sEcho": 1,
+    "iTotalRecords": 3812,
+    "iTotalDisplayRecords": 3812,
+    "data": [mock_server.synthetic_row(i) for i in range(5)],
+}
+
+
+class TestIterRows:
+
+    @pytest.mark.parametrize("size", [1, 2, 7, 64, 100_000])
+    def test_matches_json_loads_at_any_chunk_size(self, size):
+        blob = json.dumps(PAGE).encode("utf-8")
+        meta = {}
+        rows = list(iter_rows(_chunks(blob, size), meta))
+        assert rows == PAGE["data"]
+        assert meta == {k: v for k, v in PAGE.items() if k != "data"}
+
+    def test_total_available_before_first_row(self):
+        blob = json.dumps(PAGE).encode("utf-8")
+        meta = {}
+        rows = iter_rows(_chunks(blob, 16), meta)
+        next(rows)
+        assert meta["iTotalRecords"] == 3812
+
+    def test_members_after_array_are_read(self):
+        blob = b'{"data": [1, 2], "iTotalRecords": 2}'
+        meta = {}
+        assert list(iter_rows([blob], meta)) == [1, 2]
+        assert meta == {"iTotalRecords": 2}
+
+    def test_number_split_across_chunks(self):
+        meta = {}
+        list(iter_rows([b'{"iTotalRecords": 38', b'12, "data": []}'], meta))
+        assert meta["iTotalRecords"] == 3812
+
+    def test_multibyte_character_split_across_chunks(self):
+        blob = json.dumps({"data": ["કામ"]}, ensure_ascii=False).encode("utf-8")
+        assert list(iter_rows(_chunks(blob, 3), {})) == ["કામ"]
+
+    def test_empty_object_and_array(self):
+        assert list(iter_rows([b"{}"], {})) == []
+        assert list(iter_rows([b' { "data" : [ ] } '], {})) == []
+
+    def test_truncated_body_raises(self):
+        with pytest.raises(ValueError):
+            list(iter_rows([b'{"data": [{"1": "a"}, {"1": '], {}))
+
+    def test_non_object_raises(self):
+        with pytest.raises(StreamDecodeError):
+            list(iter_rows([b"[1, 2]"], {}))
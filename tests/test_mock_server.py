@@ -0,0 +1,142 @@
+import json
+import time
+
+import pytest
+import requests
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_server
+from async_fetcher import iter_raw_pages_concurrent
+from fetcher import EnvelopeBuilder, _build_envelope, _build_req_data, fetch_page, iter_raw_pages, make_session, API_PATH
+from parser import parse_page
+
+
+@pytest.fixture
+def portal():
+    servers = []
+
+    def start(**knobs):
+        server, base_url = mock_server.start_in_thread(**knobs)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestDecryptEnvelope:
+
+    def test_roundtrips_build_envelope(self):
+        plain = _build_req_data(100, 25)
+        assert mock_server.decrypt_envelope(_build_envelope(plain)) == plain
+
+    def test_roundtrips_envelope_builder(self):
+        envelope = EnvelopeBuilder(pool_size=1).build(300, 50)
+        assert mock_server.decrypt_envelope(envelope) == _build_req_data(300, 50)
+
+
+class TestSyntheticRow:
+
+    def test_row_parses_like_fixture(self):
+        parsed = parse_page([mock_server.synthetic_row(3)])[0]
+        assert parsed["tender_id"] == "270003"
+        assert parsed["name_of_work"]
+        assert parsed["last_submission_raw"] == "04-04-2026 18:00:00"
+
+    def test_rows_are_deterministic(self):
+        assert mock_server.synthetic_row(42) == mock_server.synthetic_row(42)
+
+    def test_adversarial_rows_replace_every_nth(self):
+        state = mock_server.PortalState(total=10, adversarial_every=3, adversarial_size=500)
+        page  = state.page(0, 10)
+        assert [i for i, r in enumerate(page) if r["1"].startswith("ADV-")] == [2, 5, 8]
+        assert len(page[2]["2"]) == 500
+
+
+class TestPortal:
+
+    def test_session_handshake_gets_cookie(self, portal):
+        _, base_url = portal()
+        s = make_session("TestAgent/1.0", 5, base_url)
+        assert s.headers["Cookie"].startswith("TSESSIONID=")
+
+    def test_newest_first_listing(self, portal):
+        _, base_url = portal(total=120, newest_first=True)
+        s    = make_session("TestAgent/1.0", 5, base_url)
+        data = fetch_page(s, 0, 3, 5, 0, api_url=base_url + API_PATH)
+        assert [r["tender_id"] for r in parse_page(data["data"])] == ["270119", "270118", "270117"]
+
+    def test_fetch_page_returns_requested_slice(self, portal):
+        _, base_url = portal(total=120)
+        s    = make_session("TestAgent/1.0", 5, base_url)
+        data = fetch_page(s, 100, 50, 5, 0, api_url=base_url + API_PATH)
+        assert data["iTotalRecords"] == 120
+        assert len(data["data"]) == 20
+        assert parse_page(data["data"])[0]["tender_id"] == "270100"
+
+    def test_missing_cookie_returns_500(self, portal):
+        _, base_url = portal()
+        resp = requests.post(base_url + API_PATH, json=_build_envelope(_build_req_data(0, 10)))
+        assert resp.status_code == 500
+
+    def test_expired_cookie_returns_500(self, portal):
+        server, base_url = portal(cookie_ttl=0.01)
+        s = make_session("TestAgent/1.0", 5, base_url)
+        time.sleep(0.05)
+        with pytest.raises(RuntimeError):
+            fetch_page(s, 0, 10, 5, 0, api_url=base_url + API_PATH)
+        assert server.state.rejected == 1
+
+    def test_burst_returns_503(self, portal):
+        _, base_url = portal(burst_every=4, burst_length=2)
+        s = make_session("TestAgent/1.0", 5, base_url)
+        codes = [
+            s.post(base_url + API_PATH, json=_build_envelope(_build_req_data(0, 1))).status_code
+            for _ in range(8)
+        ]
+        assert codes == [200, 200, 503, 503] * 2
+
+    def test_bad_envelope_returns_500(self, portal):
+        _, base_url = portal()
+        s = make_session("TestAgent/1.0", 5, base_url)
+        resp = s.post(base_url + API_PATH, data=json.dumps({"jsonData": "x"}))
+        assert resp.status_code == 500
+
+
+
+class TestAutoPageSize:
+
+    def _config(self, base_url, **kwargs):
+        config = {
+            "limit": None, "rate_limit": 0, "concurrency": 1, "retries": 0,
+            "timeout": 5, "page_size": 50, "auto_page_size": True, "base_url": base_url,
+        }
+        config.update(kwargs)
+        return config
+
+    def _ids(self, pages):
+        return [r["2"].split("value='")[1].split("'")[0] for rows, _, _ in pages for r in rows]
+
+    @pytest.mark.parametrize("engine,concurrency", [
+        (iter_raw_pages, 1),
+        (iter_raw_pages_concurrent, 3),
+    ])
+    def test_clamped_server_yields_every_row_once(self, portal, engine, concurrency):
+        _, base_url = portal(total=700, max_length=60)
+        s = make_session("TestAgent/1.0", 5, base_url)
+        ids = self._ids(engine(s, self._config(base_url, concurrency=concurrency)))
+        assert ids == [str(270000 + i) for i in range(700)]
+
+    @pytest.mark.parametrize("engine,concurrency", [
+        (iter_raw_pages, 1),
+        (iter_raw_pages_concurrent, 3),
+    ])
+    def test_backs_off_from_failing_sizes(self, portal, engine, concurrency):
+        _, base_url = portal(total=900, fail_above=75)
+        s = make_session("TestAgent/1.0", 5, base_url)
+        pages = list(engine(s, self._config(base_url, concurrency=concurrency)))
+        assert len(self._ids(pages)) == 900
+        assert max(len(rows) for rows, _, _ in pages) <= 75
@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import tempfile
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_server
+import parsecache
+import parser
+from parsecache import ParseCache, row_key
+from parser import parse_page, parse_rows
+
+
+class CountingParser:
+
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, raw_items):
+        self.rows += len(raw_items)
+        return parse_rows(raw_items)
+
+
+def rows(n, start=0):
+    return [mock_server.synthetic_row(i) for i in range(start, start + n)]
+
+
+class TestRowKey:
+
+    def test_same_row_same_key(self):
+        assert row_key(mock_server.synthetic_row(1)) == row_key(mock_server.synthetic_row(1))
+
+    def test_any_cell_changes_key(self):
+        row = mock_server.synthetic_row(1)
+        for cell in ("1", "2", "3"):
+            changed = dict(row, **{cell: row[cell] + " "})
+            assert row_key(changed) != row_key(row)
+
+    def test_missing_cells(self):
+        assert row_key({}) == row_key({"1": None, "2": "", "3": None})
+
+
+class TestParseCache:
+
+    def test_matches_parse_page(self):
+        page = rows(10)
+        assert ParseCache().parse_page(page) == parse_page(page)
+
+    def test_repeat_rows_are_not_parsed_again(self):
+        cache, parse = ParseCache(), CountingParser()
+        cache.parse_page(rows(10), parse)
+        cache.parse_page(rows(10, start=5), parse)
+        assert parse.rows == 15
+        assert (cache.hits, cache.misses) == (5, 15)
+        assert cache.hit_rate == 0.25
+
+    def test_mixed_page_keeps_row_order(self):
+        cache = ParseCache()
+        cache.parse_page(rows(3, start=1))
+        page = rows(6)
+        assert [r["tender_id"] for r in cache.parse_page(page)] == [str(270000 + i) for i in range(6)]
+
+    def test_failed_rows_are_dropped_and_not_cached(self):
+        cache, parse = ParseCache(), CountingParser()
+        bad  = {"1": "X", "2": None, "3": None}
+        page = [mock_server.synthetic_row(0), bad]
+        assert len(cache.parse_page(page, parse)) == 1
+        assert len(cache.parse_page(page, parse)) == 1
+        assert parse.rows == 3
+
+    def test_lru_evicts_oldest(self):
+        cache, parse = ParseCache(size=3), CountingParser()
+        cache.parse_page(rows(3), parse)
+        cache.parse_page(rows(1), parse)          # row 0 is now most recent
+        cache.parse_page(rows(1, start=3), parse)  # evicts row 1
+        assert cache.evictions == 1
+        cache.parse_page(rows(1), parse)
+        assert parse.rows == 4
+        cache.parse_page(rows(1, start=1), parse)
+        assert parse.rows == 5
+
+    def test_results_are_copies(self):
+        cache = ParseCache()
+        cache.parse_page(rows(1))[0]["department"] = "changed"
+        assert cache.parse_page(rows(1))[0]["department"] != "changed"
+
+
+class TestDiskTier:
+
+    def _get_db(self):
+        f = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        f.close()
+        return f.name
+
+    def test_survives_between_instances(self):
+        db = self._get_db()
+        try:
+            first = ParseCache(db_path=db)
+            first.parse_page(rows(5))
+            first.close()
+
+            second, parse = ParseCache(db_path=db), CountingParser()
+            assert second.parse_page(rows(5), parse) == parse_page(rows(5))
+            assert parse.rows == 0
+            assert second.disk_hits == 5
+            second.close()
+        finally:
+            os.unlink(db)
+
+    def test_entries_from_older_parser_are_dropped(self, monkeypatch):
+        db = self._get_db()
+        try:
+            first = ParseCache(db_path=db)
+            first.parse_page(rows(2))
+            first.close()
+
+            monkeypatch.setattr(parsecache, "PARSER_VERSION", "changed")
+            second, parse = ParseCache(db_path=db), CountingParser()
+            second.parse_page(rows(2), parse)
+            assert parse.rows == 2
+            second.close()
+            conn = sqlite3.connect(db)
+            assert {v for (v,) in conn.execute("SELECT parser_version FROM parse_cache")} == {second.version}
+            assert second.version.startswith("changed:")
+            conn.close()
+        finally:
+            os.unlink(db)
+
+    def test_entries_from_another_backend_are_dropped(self, monkeypatch):
+        monkeypatch.setitem(parser.BACKENDS, "other", parser.BACKENDS["bs4"])
+        db = self._get_db()
+        try:
+            first = ParseCache(db_path=db, backend="bs4")
+            first.parse_page(rows(2))
+            first.close()
+
+            second, parse = ParseCache(db_path=db, backend="other"), CountingParser()
+            second.parse_page(rows(2), parse)
+            assert parse.rows == 2
+            second.close()
+        finally:
+            os.unlink(db)
+
+    def test_auto_backend_keyed_as_resolved(self):
+        assert ParseCache(backend="auto").version == ParseCache(backend=parser.DEFAULT_BACKEND).version
+
+    def test_unusable_path_falls_back_to_memory(self):
+        cache = ParseCache(db_path="/nonexistent/dir/cache.db")
+        assert len(cache.parse_page(rows(2))) == 2
+        assert cache.parse_page(rows(2)) and cache.hits == 2
@@ -2,7 +2,12 @@ import pytest
 import sys, os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from parser import parse_raw_record, parse_page
+import random
+import time
+
+import mock_server
+import parser as parser_mod
+from parser import BACKENDS, MAX_CELL_CHARS, ParsePool, parse_raw_record, parse_page, raw_tender_id, resolve_backend
 
 
 class TestParseRawRecord:
@@ -83,6 +88,24 @@ class TestParseRawRecord:
         assert result["name_of_work"] == ""
 
 
+class TestRawTenderId:
+
+    def test_matches_parsed_tender_id(self, raw_works_item, raw_goods_item, raw_services_item):
+        for item in (raw_works_item, raw_goods_item, raw_services_item):
+            assert raw_tender_id(item) == parse_raw_record(item)["tender_id"]
+
+    def test_mock_rows(self):
+        rows = [mock_server.synthetic_row(i) for i in range(20)]
+        assert [raw_tender_id(r) for r in rows] == [str(270000 + i) for i in range(20)]
+
+    def test_attribute_order_and_quotes(self):
+        assert raw_tender_id({"2": '<INPUT value="42" type=hidden name=tenderid>'}) == "42"
+
+    def test_missing_input(self, raw_no_id_item):
+        assert raw_tender_id(raw_no_id_item) == ""
+        assert raw_tender_id({"2": None}) == ""
+
+
 class TestParsePage:
 
     def test_parses_multiple_items(self, raw_works_item, raw_goods_item):
@@ -103,3 +126,219 @@ class TestParsePage:
         results = parse_page([raw_works_item])
         assert isinstance(results, list)
         assert isinstance(results[0], dict)
+
+
+@pytest.fixture(scope="module")
+def parse_pool():
+    pool = ParsePool(3, "test-run")
+    yield pool
+    pool.close()
+
+
+class TestParsePool:
+
+    def test_backend_passed_to_workers(self):
+        pool = ParsePool(2, "test-run", backend="bs4")
+        try:
+            rows = [mock_server.synthetic_row(i) for i in range(4)]
+            assert pool.parse_page(rows) == parse_page(rows, "bs4")
+        finally:
+            pool.close()
+
+    def test_matches_in_process_parse(self, parse_pool):
+        rows = [mock_server.synthetic_row(i) for i in range(20)]
+        assert parse_pool.parse_page(rows) == parse_page(rows)
+
+    def test_keeps_row_order(self, parse_pool):
+        rows = [mock_server.synthetic_row(i) for i in range(7)]
+        ids  = [r["tender_id"] for r in parse_pool.parse_page(rows)]
+        assert ids == [str(270000 + i) for i in range(7)]
+
+    def test_bad_item_skipped_like_parse_page(self, parse_pool):
+        rows = [mock_server.synthetic_row(0), {"1": "X", "2": None, "3": None}, mock_server.synthetic_row(1)]
+        assert [r["tender_id"] for r in parse_pool.parse_page(rows)] == ["270000", "270001"]
+
+    def test_empty_page(self, parse_pool):
+        assert parse_pool.parse_page([]) == []
+
+
+
+def _edited(item, old, new):
+    return {**item, "2": item["2"].replace(old, new, 1)}
+
+
+@pytest.fixture
+def corpus(raw_works_item, raw_goods_item, raw_services_item, raw_no_id_item):
+    """Fixture cells plus mock-portal rows, and markup the fast backends should hand back to html.parser."""
+    works = raw_works_item
+    return [
+        # Stray, misnested and unclosed tags: the HTML5 tree builders drop
+        # or move these, html.parser keeps them where they stand.
+        _edited(works, "R&B-R&B", "R&B</a>-R&B"),
+        _edited(works, "Division, ", "Division,<td> "),
+        _edited(works, "5998400.40", "59984<html>00.40"),
+        _edited(works, "05-03-2026 18", "05-03-2026 1</a>8"),
+        _edited(works, "</a>\n</form></span>", "</form></a></span>"),
+        _edited(works, "Mahisagar\n", "Mahisagar\n<b>"),
+        _edited(works, "<strong style='color: maroon;'>", "<strong><p>"),
+        _edited(works, "<span style=color:#FF9933; >", "<span/><div>"),
+        _edited(works, "</body>", "</body><body>x"),
+        _edited(works, "Khanpur", "Khan<br>pur</br>"),
+        _edited(works, "Khanpur", "Khan<i x='y>pur</i>"),
+        _edited(works, "Khanpur", "Khan<pur"),
+        works, raw_goods_item, raw_services_item, raw_no_id_item,
+        {"1": "", "2": "", "3": ""},
+        {"1": "X", "2": "<span style=color:#f44336;>Dept &amp; Co<form><a>Tender Id :9</a>", "3": "<a>Total&nbsp;No:2</a"},
+        {"1": "X", "2": "<!-- x --><p>Name Of Work : a < b", "3": "<!-- 5 --><a>Total No:<b>3</b></a>"},
+        {"1": "X", "2": '<p>Tender Id :4<script>var a="Tender Id :5"</script>y</p>', "3": ""},
+        {"1": "X", "2": "<p>Tender Id :4<STYLE>p{}</STYLE>Name Of Work : y</p>", "3": ""},
+        {"1": "X", "2": "<p>Name Of Work : x<![CDATA[Tender Id :7]]>y</p>", "3": ""},
+        {"1": "X", "2": "<p>Tender Id :4<template>Tender Id :3</template>y</p>", "3": ""},
+        {"1": "X", "2": "<p>Name Of Work : x<textarea>t<b>u</b></textarea>y</p>", "3": ""},
+    ] + [mock_server.synthetic_row(i) for i in range(60)]
+
+
+@pytest.mark.parametrize("backend", [b for b in BACKENDS if b != "bs4"])
+class TestBackendsAgree:
+
+    def test_same_records_as_bs4(self, backend, corpus):
+        for item in corpus:
+            assert parse_raw_record(item, backend) == parse_raw_record(item, "bs4"), item["2"][:80]
+
+    def test_falls_back_to_bs4_on_parser_error(self, backend, raw_works_item, monkeypatch):
+        def broken(html_cell):
+            raise ValueError("cannot parse")
+
+        monkeypatch.setitem(BACKENDS, backend, broken)
+        assert parse_raw_record(raw_works_item, backend)["department"] == "R&B-R&B Division, Mahisagar"
+
+    def test_falls_back_when_department_span_missed(self, backend, raw_works_item, monkeypatch):
+        monkeypatch.setitem(BACKENDS, backend, lambda html_cell: ("Tender Id :1", ""))
+        assert parse_raw_record(raw_works_item, backend)["tender_id"] == "280210"
+
+
+class TestPlainMarkup:
+
+    def test_fixture_cells_take_fast_path(self, raw_works_item, raw_goods_item, raw_services_item, raw_no_id_item):
+        for item in (raw_works_item, raw_goods_item, raw_services_item, raw_no_id_item):
+            assert parser_mod._plain_markup(item["2"])
+
+    def test_open_paragraphs_and_void_tags(self):
+        assert parser_mod._plain_markup("<P>a<br>b<p>c<div>d</div><img src='x'/>")
+
+    @pytest.mark.parametrize("cell", [
+        "a</a>b", "<b><i>x</b></i>", "<td>x", "x<html>y", "<span/>x", "<a>x<a>y",
+        "<p><span>x<p>y", "<br></br>", "a < b", "<i x='y>z</i>", "<!-- c -->", "<?x>",
+    ])
+    def test_rejects_markup_parsed_differently(self, cell):
+        assert not parser_mod._plain_markup(cell)
+
+
+class TestBackendSelection:
+
+    def test_auto_picks_default(self):
+        assert resolve_backend("auto") == parser_mod.DEFAULT_BACKEND
+        assert resolve_backend(None) == parser_mod.DEFAULT_BACKEND
+
+    def test_bs4_always_available(self):
+        assert resolve_backend("bs4") == "bs4"
+
+    def test_missing_backend_rejected(self, monkeypatch):
+        monkeypatch.delitem(BACKENDS, "lxml", raising=False)
+        with pytest.raises(ValueError, match="not installed"):
+            resolve_backend("lxml")
+
+
+class TestScanFields:
+
+    def test_all_fields(self):
+        fields = parser_mod._scan_fields(
+            "Dept Tender Id :12 Name Of Work : Road repair Corrigendum : Date extended "
+            "Estimated Contract Value : 100.50 Last Date & Time For Submission : 01-04-2026 12:00:00"
+        )
+        assert fields == {
+            "tender_id":           "12",
+            "name_of_work":        "Road repair",
+            "corrigendum":         "Date extended Estimated Contract Value : 100.50 "
+                                   "Last Date & Time For Submission : 01-04-2026 12:00:00",
+            "estimated_value_raw": "100.50",
+            "last_submission_raw": "01-04-2026 12:00:00",
+        }
+
+    def test_missing_fields_are_empty(self):
+        assert set(parser_mod._scan_fields("nothing here").values()) == {""}
+
+    def test_first_matching_occurrence_wins(self):
+        fields = parser_mod._scan_fields("Tender Id : x Tender Id :7 Tender Id :8")
+        assert fields["tender_id"] == "7"
+
+    def test_name_of_work_ends_at_bare_label(self):
+        fields = parser_mod._scan_fields("Name Of Work : Bridge Last Date unknown Tender Id :3")
+        assert fields["name_of_work"] == "Bridge"
+        assert fields["last_submission_raw"] == ""
+        assert fields["tender_id"] == "3"
+
+    def test_name_of_work_runs_to_end(self):
+        assert parser_mod._scan_fields("Name Of Work : Tender Id :3 culvert")["name_of_work"] == "Tender Id :3 culvert"
+
+
+class TestDocText:
+
+    def test_plain_markup_skips_the_dom(self, raw_works_item, monkeypatch):
+        monkeypatch.setattr(parser_mod, "BeautifulSoup", None)
+        assert parser_mod._doc_text(raw_works_item["3"]) == "Total No:8"
+
+    def test_comment_uses_bs4(self):
+        assert parser_mod._doc_text("<!-- 5 --><a>Total No:3</a>") == "Total No:3"
+
+    @pytest.mark.parametrize("cell", ["<&amp;>", "a <b c> d", "x<1>y", "a</>b", "<?x?>Total No:1", "a <b title='>'>c</b>"])
+    def test_same_text_as_bs4(self, cell):
+        assert parser_mod._doc_text(cell) == parser_mod.BeautifulSoup(cell, "html.parser").get_text(strip=True)
+
+
+class TestDefuse:
+
+    def test_wellformed_markup_unchanged(self):
+        row = mock_server.synthetic_row(7)
+        assert parser_mod._defuse(row["2"]) is row["2"]
+
+    def test_malformed_markup_in_real_sized_cells_unchanged(self):
+        cell = "<p>Name Of Work : a <input <b>bold</b></p>"
+        assert parser_mod._defuse(cell) is cell
+        assert parser_mod._extract_bs4(parser_mod._defuse(cell))[0] == "Name Of Work : a bold"
+        assert parser_mod._extract_bs4(parser_mod._defuse("<p>a<b</p>"))[0] == "a"
+
+    def test_unclosable_lt_escaped_in_oversized_cells(self):
+        pad = "x" * parser_mod.DEFUSE_ABOVE_CHARS
+        assert parser_mod._defuse(pad + "a < b <p>c</p> <input <i>") == pad + "a &lt; b <p>c</p> &lt;input <i>"
+
+    def test_caps_cell_size(self):
+        assert len(parser_mod._defuse("x" * (MAX_CELL_CHARS + 10))) == MAX_CELL_CHARS
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+@pytest.mark.parametrize("kind", list(mock_server.ADVERSARIAL_CELLS))
+def test_adversarial_cell_parses_quickly(kind, backend):
+    item = mock_server.adversarial_row(kind, 2 * MAX_CELL_CHARS)
+    t0 = time.perf_counter()
+    raw_tender_id(item)
+    parse_raw_record(item, backend)
+    # Typical worst case is well under half a second; the margin is for slow CI.
+    assert time.perf_counter() - t0 < 2.0
+
+
+def test_fuzzed_cells_never_raise():
+    fragments = ["Tender Id", " :", "Name Of Work", "Corrigendum", "Last Date", "<", ">",
+                 "<input name=tenderid value=", "<span style=color:#f44336;>", "&", "<!--", "9", " "]
+    rng = random.Random(0)
+    for _ in range(300):
+        cell = "".join(rng.choice(fragments) for _ in range(rng.randint(0, 60)))
+        for backend in BACKENDS:
+            record = parse_raw_record({"1": "F", "2": cell, "3": cell}, backend)
+            assert record["tender_id"].isdigit() or record["tender_id"] == ""
+
+
+def test_raw_tender_id_linear_on_unclosed_inputs():
+    t0 = time.perf_counter()
+    assert raw_tender_id({"2": "<input " * 200_000}) == ""
+    assert time.perf_counter() - t0 < 1.0
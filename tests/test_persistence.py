@@ -13,7 +13,17 @@ from persistence import (
     save_records,
     start_run_metadata,
     finish_run_metadata,
-    _load_existing_ids,
+    KnownPageStreak,
+    load_checkpoint,
+    gap_pages,
+    page_hash,
+    record_page_checkpoint,
+    load_row_hashes,
+    record_row_hashes,
+    row_hash,
+    TenderIndex,
+    load_records,
+    RecordStore,
 )
 
 
@@ -111,6 +121,14 @@ class TestSaveRecordsJSON:
         finally:
             os.unlink(path)
 
+    def test_tender_records_written_as_objects(self):
+        from schema import TenderRecord
+        with tempfile.TemporaryDirectory() as d:
+            for name in ("out.json", "out.ndjson"):
+                path = os.path.join(d, name)
+                save_records([TenderRecord(**make_record("280210"))], path)
+                assert load_records(path) == [make_record("280210")]
+
     def test_incremental_adds_new_records(self):
         with tempfile.NamedTemporaryFile(suffix=".json", delete=False, mode="w") as f:
             path = f.name
@@ -201,6 +219,18 @@ class TestSaveRecordsNDJSON:
         finally:
             os.unlink(path)
 
+    def test_load_records_keeps_latest_line(self):
+        with tempfile.NamedTemporaryFile(suffix=".ndjson", delete=False) as f:
+            path = f.name
+        try:
+            save_records([make_record("111"), make_record("222")], path)
+            save_records([make_record("111", tender_type="Goods")], path, refresh=frozenset({"111"}))
+            records = {r["tender_id"]: r for r in load_records(path)}
+            assert len(records) == 2
+            assert records["111"]["tender_type"] == "Goods"
+        finally:
+            os.unlink(path)
+
 
 
 class TestCSVOutput:
@@ -436,3 +466,407 @@ class TestRunMetadata:
             assert errors == ["page 2: timeout"]
         finally:
             os.unlink(db)
+
+    def test_failed_offsets_stored_as_json(self):
+        db = self._get_db()
+        try:
+            start_run_metadata(db, "run-005", {}, dry_run=False)
+            finish_run_metadata(
+                db_path=db, run_id="run-005", start_time=datetime.now(timezone.utc),
+                pages_visited=8, tenders_parsed=400, tenders_saved=400,
+                failures=2, deduped_count=0, error_summary=[],
+                tender_types=["Works"], dry_run=False, failed_offsets=[150, 300],
+            )
+            conn = sqlite3.connect(db)
+            row = conn.execute(
+                "SELECT failed_offsets FROM runs_metadata WHERE run_id='run-005'"
+            ).fetchone()
+            conn.close()
+            assert json.loads(row[0]) == [150, 300]
+        finally:
+            os.unlink(db)
+
+    def test_resume_keeps_start_time(self):
+        db = self._get_db()
+        try:
+            first = start_run_metadata(db, "run-007", {"limit": 1}, dry_run=False)
+            again = start_run_metadata(db, "run-007", {"limit": 2}, dry_run=False, resume=True)
+            assert again == first
+            conn = sqlite3.connect(db)
+            row = conn.execute("SELECT start_time, config FROM runs_metadata WHERE run_id='run-007'").fetchone()
+            conn.close()
+            assert row == (first.isoformat(), json.dumps({"limit": 2}))
+        finally:
+            os.unlink(db)
+
+    def test_resume_without_row_inserts_one(self):
+        db = self._get_db()
+        try:
+            start_run_metadata(db, "run-008", {}, dry_run=False, resume=True)
+            conn = sqlite3.connect(db)
+            assert conn.execute("SELECT COUNT(*) FROM runs_metadata").fetchone() == (1,)
+            conn.close()
+        finally:
+            os.unlink(db)
+
+    def test_old_database_gains_failed_offsets_column(self):
+        db = self._get_db()
+        try:
+            conn = sqlite3.connect(db)
+            conn.execute("CREATE TABLE runs_metadata (run_id TEXT PRIMARY KEY, start_time TEXT NOT NULL, "
+                         "end_time TEXT, duration_seconds REAL, scraper_version TEXT, config TEXT, "
+                         "tender_types_processed TEXT, pages_visited INTEGER, tenders_parsed INTEGER, "
+                         "tenders_saved INTEGER, failures INTEGER, deduped_count INTEGER, error_summary TEXT)")
+            conn.commit()
+            conn.close()
+            start_run_metadata(db, "run-006", {}, dry_run=False)
+            conn = sqlite3.connect(db)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(runs_metadata)")}
+            conn.close()
+            assert "failed_offsets" in columns
+        finally:
+            os.unlink(db)
+
+
+
+class TestGapPages:
+
+    def test_no_gaps(self):
+        assert gap_pages([(0, 50), (50, 50), (100, 20)]) == []
+        assert gap_pages([]) == []
+
+    def test_cut_at_the_size_before_the_gap(self):
+        # Run at --page-size 50; a resume with another size must not matter.
+        assert gap_pages([(0, 50), (150, 50)]) == [(50, 50), (100, 50)]
+
+    def test_leading_gap_uses_the_page_after_it(self):
+        assert gap_pages([(100, 25), (125, 25)]) == [(0, 25), (25, 25), (50, 25), (75, 25)]
+
+    def test_sizes_change_between_gaps(self):
+        # --page-size auto: the run grew its pages from 20 to 80 rows.
+        pages = [(0, 20), (40, 20), (60, 80), (220, 80)]
+        assert gap_pages(pages) == [(20, 20), (140, 80)]
+
+    def test_last_request_ends_at_the_gap(self):
+        assert gap_pages([(0, 40), (100, 40)]) == [(40, 40), (80, 20)]
+
+
+class TestPageCheckpoints:
+
+    def _get_db(self):
+        f = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        f.close()
+        return f.name
+
+    def test_no_checkpoint_for_unknown_run(self):
+        db = self._get_db()
+        try:
+            assert load_checkpoint(db, "nope") is None
+        finally:
+            os.unlink(db)
+
+    def test_missing_db_returns_none(self):
+        assert load_checkpoint("/nonexistent/dir/runs.db", "run-x") is None
+
+    def test_next_offset_follows_last_committed_page(self):
+        db = self._get_db()
+        try:
+            record_page_checkpoint(db, "run-010", 0, 50, "h0")
+            record_page_checkpoint(db, "run-010", 50, 50, "h1")
+            record_page_checkpoint(db, "run-010", 100, 50, "h2")
+            cp = load_checkpoint(db, "run-010")
+            assert cp == {"next_offset": 150, "pages": 3, "records": 150,
+                          "parsed": 0, "saved": 0, "deduped": 0, "gaps": [], "retry_pages": []}
+        finally:
+            os.unlink(db)
+
+    def test_counters_summed_over_committed_pages(self):
+        db = self._get_db()
+        try:
+            record_page_checkpoint(db, "run-011", 0, 50, "h0", parsed=48, saved=45, deduped=3)
+            record_page_checkpoint(db, "run-011", 50, 50, "h1", parsed=50, saved=50, deduped=0)
+            cp = load_checkpoint(db, "run-011")
+            assert (cp["parsed"], cp["saved"], cp["deduped"]) == (98, 95, 3)
+        finally:
+            os.unlink(db)
+
+    def test_pages_from_older_database_count_zero(self):
+        db = self._get_db()
+        try:
+            conn = sqlite3.connect(db)
+            conn.execute("CREATE TABLE run_pages (run_id TEXT NOT NULL, page_offset INTEGER NOT NULL, "
+                         "record_count INTEGER NOT NULL, content_hash TEXT, completed_at TEXT NOT NULL, "
+                         "PRIMARY KEY (run_id, page_offset))")
+            conn.execute("INSERT INTO run_pages VALUES ('run-012', 0, 50, 'h0', '2026-01-01')")
+            conn.commit()
+            conn.close()
+            cp = load_checkpoint(db, "run-012")
+            assert (cp["pages"], cp["parsed"], cp["saved"], cp["deduped"]) == (1, 0, 0, 0)
+        finally:
+            os.unlink(db)
+
+    def test_gaps_below_next_offset_are_reported(self):
+        # Page 50 was deferred (or still in flight) when the run stopped.
+        db = self._get_db()
+        try:
+            record_page_checkpoint(db, "run-014", 0, 50, "h0")
+            record_page_checkpoint(db, "run-014", 100, 50, "h2")
+            cp = load_checkpoint(db, "run-014")
+            assert cp["next_offset"] == 150
+            assert cp["gaps"] == [(50, 50)]
+        finally:
+            os.unlink(db)
+
+    def test_first_page_missing_is_a_gap(self):
+        db = self._get_db()
+        try:
+            record_page_checkpoint(db, "run-015", 100, 50, "h2")
+            record_page_checkpoint(db, "run-015", 300, 20, "h6")
+            cp = load_checkpoint(db, "run-015")
+            assert cp["gaps"] == [(0, 100), (150, 150)]
+            assert cp["retry_pages"] == [(0, 50), (50, 50), (150, 50), (200, 50), (250, 50)]
+        finally:
+            os.unlink(db)
+
+    def test_short_last_page(self):
+        db = self._get_db()
+        try:
+            record_page_checkpoint(db, "run-011", 0, 50, "h0")
+            record_page_checkpoint(db, "run-011", 50, 12, "h1")
+            assert load_checkpoint(db, "run-011")["next_offset"] == 62
+        finally:
+            os.unlink(db)
+
+    def test_rewriting_a_page_is_idempotent(self):
+        db = self._get_db()
+        try:
+            record_page_checkpoint(db, "run-012", 0, 50, "h0")
+            record_page_checkpoint(db, "run-012", 0, 50, "h0")
+            assert load_checkpoint(db, "run-012")["pages"] == 1
+        finally:
+            os.unlink(db)
+
+    def test_checkpoints_are_per_run(self):
+        db = self._get_db()
+        try:
+            record_page_checkpoint(db, "run-a", 0, 50, "h0")
+            record_page_checkpoint(db, "run-b", 0, 50, "h0")
+            record_page_checkpoint(db, "run-b", 50, 50, "h1")
+            assert load_checkpoint(db, "run-a")["next_offset"] == 50
+            assert load_checkpoint(db, "run-b")["next_offset"] == 100
+        finally:
+            os.unlink(db)
+
+    def test_content_hash_stored(self):
+        db = self._get_db()
+        try:
+            rows = [{"1": "a", "2": "<html/>", "3": ""}]
+            record_page_checkpoint(db, "run-013", 0, 1, page_hash(rows))
+            conn = sqlite3.connect(db)
+            stored = conn.execute("SELECT content_hash FROM run_pages").fetchone()[0]
+            conn.close()
+            assert stored == page_hash(list(rows))
+            assert len(stored) == 40
+        finally:
+            os.unlink(db)
+
+
+
+class TestKnownPageStreak:
+
+    def test_stops_after_threshold_known_pages(self):
+        streak = KnownPageStreak({"1", "2", "3", "4"}, threshold=2)
+        assert streak.update(["4", "3"]) is False
+        assert streak.update(["2", "1"]) is True
+
+    def test_new_id_resets_streak(self):
+        streak = KnownPageStreak({"1", "2", "3"}, threshold=2)
+        streak.update(["1000"])
+        assert streak.update(["999", "3"]) is False
+        assert streak.streak == 0
+        assert streak.update(["2"]) is False
+
+    def test_empty_page_does_not_count(self):
+        streak = KnownPageStreak({"1"}, threshold=1)
+        assert streak.update([]) is False
+        assert streak.update(["", ""]) is False
+
+    def test_blank_ids_ignored(self):
+        streak = KnownPageStreak({"1"}, threshold=1)
+        assert streak.update(["1", ""]) is True
+
+    def test_nothing_stored_never_stops(self):
+        streak = KnownPageStreak(set(), threshold=1)
+        assert streak.update(["2", "1"]) is False
+
+    def test_rising_ids_within_page_turn_it_off(self):
+        streak = KnownPageStreak({"1", "2", "3", "4"}, threshold=1)
+        assert streak.update(["1", "2"], offset=0) is False
+        assert streak.newest_first is False
+        assert streak.update(["4", "3"], offset=2) is False
+
+    def test_rising_ids_across_pages_turn_it_off(self):
+        # Sorted on anything but recency (e.g. the IFB No column), ids
+        # jump back up from one page to the next.
+        streak = KnownPageStreak({"3", "4", "5", "6"}, threshold=2)
+        assert streak.update(["4", "3"], offset=0) is False
+        assert streak.update(["6", "5"], offset=2) is False
+        assert streak.newest_first is False
+
+    def test_retried_page_not_checked(self):
+        streak = KnownPageStreak({"1", "2", "5", "6"}, threshold=3)
+        streak.update(["6", "5"], offset=0)
+        streak.update(["2", "1"], offset=4)
+        assert streak.update(["4", "3"], offset=2) is False
+        assert streak.newest_first is True
+        assert streak.streak == 2
+
+
+def raw_row(tender_id, work="Road repair"):
+    return {"1": "1 of 2026", "2": f"<input name='tenderid' value='{tender_id}'/>{work}", "3": ""}
+
+
+def id_of(item):
+    return item["2"].split("value='")[1].split("'")[0] if "value='" in item["2"] else ""
+
+
+class TestTenderIndex:
+
+    def test_new_rows_are_parsed(self):
+        to_parse, skipped, hashes = TenderIndex({}).split([raw_row("1"), raw_row("2")], id_of)
+        assert [id_of(r) for r in to_parse] == ["1", "2"]
+        assert skipped == 0
+        assert set(hashes) == {"1", "2"}
+
+    def test_unchanged_rows_are_skipped(self):
+        index = TenderIndex({"1": row_hash(raw_row("1"))})
+        to_parse, skipped, _ = index.split([raw_row("1"), raw_row("2")], id_of)
+        assert [id_of(r) for r in to_parse] == ["2"]
+        assert skipped == 1
+
+    def test_changed_rows_are_parsed(self):
+        index = TenderIndex({"1": row_hash(raw_row("1"))})
+        to_parse, skipped, hashes = index.split([raw_row("1", "Road repair (corrigendum)")], id_of)
+        assert len(to_parse) == 1
+        assert skipped == 0
+        assert hashes["1"] != index.hashes["1"]
+
+    def test_stored_without_hash_is_skipped(self):
+        to_parse, skipped, hashes = TenderIndex({"1": None}).split([raw_row("1")], id_of)
+        assert to_parse == []
+        assert skipped == 1
+        assert "1" in hashes
+
+    def test_row_without_id_is_parsed(self):
+        row = {"1": "x", "2": "<p>no id</p>", "3": ""}
+        to_parse, _, hashes = TenderIndex({"1": None}).split([row], id_of)
+        assert to_parse == [row]
+        assert hashes == {}
+
+    def test_load_joins_output_ids_with_stored_hashes(self):
+        with tempfile.TemporaryDirectory() as d:
+            out, db = os.path.join(d, "out.json"), os.path.join(d, "runs.db")
+            save_records([make_record("1"), make_record("2")], out)
+            record_row_hashes(db, {"1": "abc", "9": "not-in-output"})
+            index = TenderIndex.load(out, db)
+            assert index.hashes == {"1": "abc", "2": None}
+
+    def test_row_hashes_round_trip(self):
+        with tempfile.TemporaryDirectory() as d:
+            db = os.path.join(d, "runs.db")
+            record_row_hashes(db, {"1": "a", "2": "b"})
+            record_row_hashes(db, {"1": "c"})
+            assert load_row_hashes(db) == {"1": "c", "2": "b"}
+
+    def test_missing_db_has_no_hashes(self):
+        assert load_row_hashes("/nonexistent/dir/runs.db") == {}
+
+
+class TestSaveRecordsRefresh:
+
+    def test_refresh_replaces_json_record(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "out.json")
+            save_records([make_record("1"), make_record("2")], path)
+            changed = make_record("1")
+            changed["corrigendum"] = "Date extended"
+            saved, deduped = save_records([changed, make_record("2")], path, refresh=frozenset({"1"}))
+            assert (saved, deduped) == (1, 1)
+            with open(path) as f:
+                data = json.load(f)
+            assert [r["tender_id"] for r in data] == ["1", "2"]
+            assert data[0]["corrigendum"] == "Date extended"
+
+    def test_refresh_appends_newer_ndjson_line(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "out.ndjson")
+            save_records([make_record("1")], path)
+            changed = make_record("1")
+            changed["corrigendum"] = "Date extended"
+            save_records([changed], path, refresh=frozenset({"1"}))
+            with open(path) as f:
+                lines = [json.loads(l) for l in f]
+            assert [r["corrigendum"] for r in lines] == ["", "Date extended"]
+
+    def test_without_refresh_stored_records_are_kept(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "out.json")
+            save_records([make_record("1")], path)
+            changed = make_record("1")
+            changed["corrigendum"] = "Date extended"
+            assert save_records([changed], path) == (0, 1)
+
+
+class TestRecordStore:
+
+    def test_stored_ids_read_once(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "out.ndjson")
+            save_records([make_record("1")], path)
+            store = RecordStore(path)
+            assert store.ids == {"1"}
+            with open(path, "w") as f:
+                f.write("not json\n")         # later saves must not re-read the file
+            assert store.save([make_record("1"), make_record("2")]) == (1, 1)
+            assert store.save([make_record("2")]) == (0, 1)
+            assert store.ids == {"1", "2"}
+
+    def test_ndjson_written_and_callback_run_per_save(self):
+        with tempfile.TemporaryDirectory() as d:
+            path    = os.path.join(d, "out.ndjson")
+            written = []
+            store   = RecordStore(path, set())
+            store.save([make_record("1"), make_record("1")], on_written=lambda *counts: written.append(counts))
+            assert written == [(1, 1)]
+            assert [r["tender_id"] for r in load_records(path)] == ["1"]
+
+    def test_json_written_atomically_at_flush(self):
+        with tempfile.TemporaryDirectory() as d:
+            path    = os.path.join(d, "out.json")
+            save_records([make_record("1")], path)
+            written = []
+            store   = RecordStore(path, flush_every=3600)
+            store.save([make_record("2")], on_written=lambda saved, deduped: written.append(2))
+            store.save([make_record("3")], on_written=lambda saved, deduped: written.append(3))
+            # Buffered: the file and the checkpoints wait for the flush.
+            assert written == []
+            assert [r["tender_id"] for r in load_records(path)] == ["1"]
+            store.close()
+            assert written == [2, 3]
+            assert [r["tender_id"] for r in load_records(path)] == ["1", "2", "3"]
+            assert os.listdir(d) == ["out.json"]
+
+    def test_json_flushed_when_interval_passed(self):
+        with tempfile.TemporaryDirectory() as d:
+            path  = os.path.join(d, "out.json")
+            store = RecordStore(path, set(), flush_every=0)
+            store.save([make_record("1")])
+            assert [r["tender_id"] for r in load_records(path)] == ["1"]
+
+    def test_dry_run_writes_nothing(self):
+        with tempfile.TemporaryDirectory() as d:
+            path  = os.path.join(d, "out.json")
+            store = RecordStore(path, set(), dry_run=True)
+            assert store.save([make_record("1")]) == (1, 0)
+            store.close()
+            assert not os.path.exists(path)
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import Pipeline
+
+
+def slow(fn, seconds):
+    def stage(item):
+        time.sleep(seconds)
+        return fn(item)
+    return stage
+
+
+class TestPipeline:
+
+    def test_results_in_source_order(self):
+        p = Pipeline(range(50), [("double", lambda x: x * 2), ("inc", lambda x: x + 1)])
+        assert list(p) == [x * 2 + 1 for x in range(50)]
+
+    def test_stages_overlap(self):
+        def source():
+            for i in range(10):
+                time.sleep(0.02)
+                yield i
+
+        p  = Pipeline(source(), [("a", slow(lambda x: x, 0.02)), ("b", slow(lambda x: x, 0.02))])
+        t0 = time.monotonic()
+        assert list(p) == list(range(10))
+        # Sequential would be 10 * 0.06s; pipelined is close to 10 * 0.02s.
+        assert time.monotonic() - t0 < 0.45
+
+    def test_backpressure_bounds_read_ahead(self):
+        produced = []
+
+        def source():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        p  = Pipeline(source(), [("id", lambda x: x)], maxsize=2)
+        it = iter(p)
+        next(it)
+        time.sleep(0.2)
+        # two queues of two, plus one item held by each thread
+        assert len(produced) <= 8
+        p.close()
+
+    def test_stage_exception_reraised(self):
+        def boom(x):
+            if x == 3:
+                raise ValueError("bad item")
+            return x
+
+        with pytest.raises(ValueError, match="bad item"):
+            list(Pipeline(range(10), [("boom", boom)]))
+
+    def test_source_exception_reraised_after_earlier_items(self):
+        def source():
+            yield 1
+            raise RuntimeError("fetch failed")
+
+        seen = []
+        with pytest.raises(RuntimeError, match="fetch failed"):
+            for item in Pipeline(source(), [("id", lambda x: x)]):
+                seen.append(item)
+        assert seen == [1]
+
+    def test_early_break_closes_source(self):
+        closed = threading.Event()
+
+        def source():
+            try:
+                for i in range(1000):
+                    yield i
+            finally:
+                closed.set()
+
+        for item in Pipeline(source(), [("id", lambda x: x)], maxsize=1):
+            if item == 2:
+                break
+        assert closed.wait(1)
+
+    def test_stats_count_items_and_time(self):
+        p = Pipeline(range(5), [("parse", slow(lambda x: x, 0.01))], source_name="fetch", sink_name="persist")
+        list(p)
+        names = [s.name for s in p.stats]
+        assert names == ["fetch", "parse", "persist"]
+        assert all(s.items == 5 for s in p.stats)
+        assert p.stats[1].busy >= 0.05
+        assert p.stats[2].waited > 0
@@ -0,0 +1,235 @@
+import random
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fetcher
+import mock_server
+from fetcher import fetch_page, make_session, API_PATH
+from retry import CircuitBreaker, CircuitOpenError, RetryPolicy, parse_retry_after, policy_from_config
+
+
+class FakeResponse:
+
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers     = headers or {}
+        self.content     = b'{"data": []}'
+
+    def iter_content(self, chunk_size=1):
+        yield self.content
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        raise fetcher.requests.HTTPError(f"HTTP {self.status_code}")
+
+
+class ScriptedSession:
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls     = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waited = []
+    monkeypatch.setattr(fetcher.time, "sleep", waited.append)
+    return waited
+
+
+class TestParseRetryAfter:
+
+    def test_seconds(self):
+        assert parse_retry_after("7") == 7.0
+
+    def test_fractional_seconds(self):
+        assert parse_retry_after(" 0.5 ") == 0.5
+
+    def test_http_date(self):
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        assert 25 <= parse_retry_after(format_datetime(when, usegmt=True)) <= 30
+
+    def test_past_date_is_zero(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_missing_or_garbage(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+class TestRetryPolicy:
+
+    def test_delays_stay_within_decorrelated_bounds(self):
+        policy = RetryPolicy(base=1.0, cap=30.0, rng=random.Random(1))
+        delay  = policy.base
+        for _ in range(50):
+            nxt = policy.next_delay(delay)
+            assert 1.0 <= nxt <= min(30.0, delay * 3)
+            delay = nxt
+
+    def test_delays_are_jittered(self):
+        policy = RetryPolicy(rng=random.Random(2))
+        assert len({round(policy.next_delay(4.0), 6) for _ in range(10)}) > 1
+
+    def test_retry_after_overrides_jitter(self):
+        assert RetryPolicy().next_delay(1.0, retry_after=12) == 12
+
+    def test_retry_after_is_capped(self):
+        assert RetryPolicy(max_retry_after=60).next_delay(1.0, retry_after=3600) == 60
+
+    def test_policy_from_config(self):
+        policy = policy_from_config({"retries": 2, "breaker_threshold": 4, "breaker_cooldown": 1.5})
+        assert policy.retries == 2
+        assert policy.breaker.threshold == 4
+        assert policy.breaker.base_cooldown == 1.5
+
+    def test_zero_threshold_disables_breaker(self):
+        assert policy_from_config({"retries": 2, "breaker_threshold": 0}).breaker is None
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(threshold=3, cooldown=10)
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(threshold=3)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_old_failures_fall_out_of_window(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr("retry.time.monotonic", lambda: now[0])
+        breaker = CircuitBreaker(threshold=2, window=10)
+        breaker.record_failure()
+        now[0] += 11
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_open_breaker_lets_one_probe_through(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+        breaker.record_failure()
+        passed = []
+
+        def worker(i):
+            breaker.before_request()
+            passed.append(i)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        time.sleep(0.2)
+        assert len(passed) == 1
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        breaker.record_success()
+        for t in threads:
+            t.join(timeout=1)
+        assert len(passed) == 4
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_probe_doubles_cooldown(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0.02, max_cooldown=0.05)
+        breaker.record_failure()
+        breaker.before_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker._cooldown == 0.04
+        breaker.before_request()
+        breaker.record_failure()
+        assert breaker._cooldown == 0.05
+        assert breaker.trips == 3
+
+    def test_gives_up_after_long_outage(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=10, give_up_after=0.05)
+        breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+
+
+class TestFetchPageRetries:
+
+    def test_honours_retry_after(self, sleeps):
+        session = ScriptedSession([FakeResponse(503, {"Retry-After": "4"}), FakeResponse(200)])
+        fetch_page(session, 0, 10, 5, 3)
+        assert sleeps == [4.0]
+
+    def test_retries_429(self, sleeps):
+        session = ScriptedSession([FakeResponse(429), FakeResponse(200)])
+        fetch_page(session, 0, 10, 5, 3)
+        assert session.calls == 2
+        assert len(sleeps) == 1
+
+    def test_gives_up_after_retries(self, sleeps):
+        session = ScriptedSession([FakeResponse(500)] * 3)
+        with pytest.raises(RuntimeError, match="All 3 attempts failed"):
+            fetch_page(session, 0, 10, 5, 2)
+        assert len(sleeps) == 2
+
+    def test_breaker_shared_across_calls(self, sleeps):
+        policy  = RetryPolicy(retries=0, breaker=CircuitBreaker(threshold=2, cooldown=60, give_up_after=0.01))
+        session = ScriptedSession([FakeResponse(500)] * 2)
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                fetch_page(session, 0, 10, 5, 0, policy=policy)
+        time.sleep(0.02)
+        with pytest.raises(CircuitOpenError):
+            fetch_page(session, 0, 10, 5, 0, policy=policy)
+        assert session.calls == 2
+
+    def test_truncated_body_is_retried(self, sleeps):
+        broken = FakeResponse(200)
+
+        def cut_off(chunk_size=1):
+            yield b'{"data": [{"1": '
+            raise fetcher.ChunkedEncodingError("connection reset")
+
+        broken.iter_content = cut_off
+        session = ScriptedSession([broken, FakeResponse(200)])
+        assert fetch_page(session, 0, 10, 5, 3)["data"] == []
+        assert session.calls == 2
+
+    def test_client_error_is_not_retried(self, sleeps):
+        session = ScriptedSession([FakeResponse(404)])
+        with pytest.raises(fetcher.requests.HTTPError):
+            fetch_page(session, 0, 10, 5, 3)
+        assert sleeps == []
+
+
+class TestAgainstMockPortal:
+
+    def test_burst_with_retry_after(self):
+        server, base_url = mock_server.start_in_thread(
+            total=20, burst_every=4, burst_length=1, retry_after=0.05,
+        )
+        try:
+            s = make_session("test", 5, base_url=base_url)
+            t0 = time.monotonic()
+            for start in range(0, 20, 5):
+                data = fetch_page(s, start, 5, 5, 2, api_url=base_url + API_PATH)
+                assert len(data["data"]) == 5
+            # Three bursts, each waited out for Retry-After rather than 1s+.
+            assert time.monotonic() - t0 < 1.0
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,86 @@
+import json
+import os
+import pickle
+
+import pytest
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schema import RECORD_FIELDS, TenderRecord, json_default
+
+
+def fields(**overrides):
+    values = {
+        "tender_id":        "280210",
+        "tender_type":      "Works",
+        "title":            "76-2025/2026",
+        "organisation":     "R&B Division, Mahisagar",
+        "publish_date":     None,
+        "closing_date":     "2026-03-17",
+        "description":      "Road repair",
+        "source_url":       "https://tender.nprocure.com/view-nit-home?tenderid=280210",
+        "estimated_value":  1003246.62,
+        "attachments":      10,
+        "corrigendum":      "",
+        "raw_html_snippet": "<p>",
+    }
+    values.update(overrides)
+    return values
+
+
+class TestTenderRecord:
+
+    def test_reads_like_a_dict(self):
+        record = TenderRecord(**fields())
+        assert record["tender_id"] == "280210"
+        assert record.get("publish_date", "x") is None
+        assert record.get("missing", "x") == "x"
+        assert "closing_date" in record and "missing" not in record
+        assert list(record) == list(RECORD_FIELDS)
+        assert len(record) == 12
+        assert dict(record) == fields()
+
+    def test_unknown_key_raises_keyerror(self):
+        with pytest.raises(KeyError):
+            TenderRecord(**fields())["to_dict"]
+
+    def test_equality(self):
+        record = TenderRecord(**fields())
+        assert record == TenderRecord(**fields())
+        assert record == fields() and fields() == record
+        assert record != TenderRecord(**fields(attachments=3))
+        assert record != fields(attachments=3)
+
+    def test_no_instance_dict(self):
+        record = TenderRecord(**fields())
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.extra = 1
+
+    @pytest.mark.parametrize("name, value", [
+        ("tender_id", ""),
+        ("tender_id", 280210),
+        ("tender_type", None),
+        ("title", None),
+        ("closing_date", 20260317),
+        ("estimated_value", 100),
+        ("estimated_value", "100.0"),
+        ("attachments", "10"),
+        ("attachments", None),
+        ("raw_html_snippet", b"<p>"),
+    ])
+    def test_rejects_values_outside_schema(self, name, value):
+        with pytest.raises(ValueError, match=f"TenderRecord.{name} "):
+            TenderRecord(**fields(**{name: value}))
+
+    def test_optional_fields_accept_none(self):
+        record = TenderRecord(**fields(closing_date=None, estimated_value=None))
+        assert record["closing_date"] is None and record["estimated_value"] is None
+
+    def test_json_and_pickle(self):
+        record = TenderRecord(**fields())
+        assert json.loads(json.dumps([record], default=json_default)) == [fields()]
+        assert list(json.loads(json.dumps(record, default=json_default))) == list(RECORD_FIELDS)
+        assert pickle.loads(pickle.dumps(record)) == record
+        with pytest.raises(TypeError):
+            json.dumps(object(), default=json_default)
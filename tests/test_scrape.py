@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import tempfile
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_server
+import scrape
+from persistence import load_checkpoint, load_records
+
+
+def run_scrape(monkeypatch, base_url, d, *extra):
+    monkeypatch.setattr(sys, "argv", [
+        "scrape.py", "--base-url", base_url, "--rate-limit", "0", "--retries", "0",
+        "--output", os.path.join(d, "out.ndjson"), "--metadata-db", os.path.join(d, "runs.db"),
+        *extra,
+    ])
+    return scrape.main()
+
+
+class TestResume:
+
+    def test_interrupt_then_resume_saves_every_tender_once(self, monkeypatch):
+        # Two API calls in every five fail, so the first session defers
+        # pages and is then interrupted before its retry pass.
+        server, base_url = mock_server.start_in_thread(total=200, burst_every=5, burst_length=2)
+        real_record = scrape.record_row_hashes
+        committed   = []
+
+        def interrupt_after_five_pages(db_path, hashes):
+            real_record(db_path, hashes)
+            committed.append(1)
+            if len(committed) == 5:
+                raise KeyboardInterrupt
+
+        try:
+            with tempfile.TemporaryDirectory() as d:
+                monkeypatch.setattr(scrape, "record_row_hashes", interrupt_after_five_pages)
+                assert run_scrape(monkeypatch, base_url, d, "--page-size", "20") == 0
+                conn = sqlite3.connect(os.path.join(d, "runs.db"))
+                (run_id,) = conn.execute("SELECT run_id FROM runs_metadata").fetchone()
+                conn.close()
+                checkpoint = load_checkpoint(os.path.join(d, "runs.db"), run_id)
+                assert checkpoint["gaps"] and checkpoint["next_offset"] < 200
+
+                server.state.burst_every = 0
+                monkeypatch.setattr(scrape, "record_row_hashes", real_record)
+                assert run_scrape(monkeypatch, base_url, d, "--page-size", "30", "--resume", run_id) == 0
+
+                ids = [r["tender_id"] for r in load_records(os.path.join(d, "out.ndjson"))]
+                assert sorted(ids) == sorted(str(270000 + i) for i in range(200))
+                conn = sqlite3.connect(os.path.join(d, "runs.db"))
+                row = conn.execute("SELECT tenders_saved, failures, failed_offsets FROM runs_metadata").fetchone()
+                # The gaps were refetched at the first session's 20 rows a page.
+                retried = [o for (o,) in conn.execute(
+                    "SELECT page_offset FROM run_pages WHERE page_offset < ?", (checkpoint["next_offset"],)
+                )]
+                conn.close()
+                assert row == (200, 0, "[]")
+                assert all(o % 20 == 0 for o in retried)
+        finally:
+            server.shutdown()
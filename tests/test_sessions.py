@@ -0,0 +1,230 @@
+import threading
+import time
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_server
+import sessions
+from fetcher import _build_envelope, _build_req_data, make_session, API_PATH
+from sessions import SessionCache, SessionPool, session_id
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeSession:
+    """requests.Session stand-in whose post() answers from a script of status codes."""
+
+    _counter = 0
+
+    def __init__(self, statuses=None, sid=None):
+        FakeSession._counter += 1
+        sid = sid if sid is not None else f"{FakeSession._counter:032X}"
+        self.headers  = {"Cookie": f"TSESSIONID={sid}; {sid}"}
+        self.statuses = list(statuses or [])
+        self.posts    = 0
+        self.closed   = False
+
+    def post(self, url, **kwargs):
+        self.posts += 1
+        return FakeResponse(self.statuses.pop(0) if self.statuses else 200)
+
+    def close(self):
+        self.closed = True
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestSessionId:
+
+    def test_reads_cookie_header(self):
+        assert session_id(FakeSession(sid="ABC123")) == "ABC123"
+
+    def test_empty_when_handshake_failed(self):
+        assert session_id(FakeSession(sid="")) == ""
+
+
+class TestSessionCache:
+
+    def test_store_then_checkout_in_new_process(self, tmp_path):
+        path = str(tmp_path / "cache.json")
+        SessionCache(path, ttl=60).store("http://portal", "AAA")
+        assert SessionCache(path, ttl=60).checkout("http://portal") == "AAA"
+
+    def test_each_id_handed_out_once_per_process(self, tmp_path):
+        path = str(tmp_path / "cache.json")
+        SessionCache(path, ttl=60).store("http://portal", "AAA")
+        cache = SessionCache(path, ttl=60)
+        assert cache.checkout("http://portal") == "AAA"
+        assert cache.checkout("http://portal") == ""
+
+    def test_expired_entries_ignored(self, tmp_path):
+        path = str(tmp_path / "cache.json")
+        SessionCache(path, ttl=60).store("http://portal", "AAA")
+        assert SessionCache(path, ttl=0).checkout("http://portal") == ""
+
+    def test_file_readable_by_owner_only(self, tmp_path):
+        path = str(tmp_path / "cache.json")
+        SessionCache(path, ttl=60).store("http://portal", "AAA")
+        assert os.stat(path).st_mode & 0o777 == 0o600
+
+    def test_keyed_by_base_url(self, tmp_path):
+        path = str(tmp_path / "cache.json")
+        SessionCache(path, ttl=60).store("http://portal", "AAA")
+        assert SessionCache(path, ttl=60).checkout("http://other") == ""
+
+    def test_discard_removes_entry(self, tmp_path):
+        path = str(tmp_path / "cache.json")
+        cache = SessionCache(path, ttl=60)
+        cache.store("http://portal", "AAA")
+        cache.discard("http://portal", "AAA")
+        assert SessionCache(path, ttl=60).checkout("http://portal") == ""
+
+    def test_missing_or_corrupt_file_is_empty(self, tmp_path):
+        path = tmp_path / "cache.json"
+        assert SessionCache(str(path), ttl=60).checkout("http://portal") == ""
+        path.write_text("{not json")
+        assert SessionCache(str(path), ttl=60).checkout("http://portal") == ""
+
+
+class TestSessionPool:
+
+    def test_warms_requested_number_of_sessions(self):
+        made = []
+        pool = SessionPool(lambda: made.append(1) or FakeSession(), 3)
+        assert len(made) == 3
+        assert pool.healthy_count == 3
+
+    def test_spreads_requests_across_sessions(self):
+        made = []
+        pool = SessionPool(lambda: made.append(FakeSession()) or made[-1], 3)
+        for _ in range(9):
+            pool.post("http://x")
+        assert [s.posts for s in made] == [3, 3, 3]
+
+    def test_consecutive_500s_trigger_refresh(self):
+        first = FakeSession(statuses=[500, 500])
+        made  = iter([first, FakeSession()])
+        pool  = SessionPool(lambda: next(made), 1)
+        assert pool.post("http://x").status_code == 500
+        assert pool.post("http://x").status_code == 500
+        assert wait_for(lambda: pool.refreshes == 1)
+        assert pool.post("http://x").status_code == 200
+        assert first.closed
+
+    def test_single_500_does_not_refresh(self):
+        pool = SessionPool(lambda: FakeSession(statuses=[500, 200, 500]), 1)
+        for _ in range(3):
+            pool.post("http://x")
+        assert pool.refreshes == 0
+        assert pool.healthy_count == 1
+
+    def test_other_5xx_does_not_count_as_expiry(self):
+        pool = SessionPool(lambda: FakeSession(statuses=[503, 503, 503]), 1)
+        for _ in range(3):
+            pool.post("http://x")
+        assert pool.refreshes == 0
+
+    def test_healthy_sessions_keep_serving_during_refresh(self):
+        gate  = threading.Event()
+        made  = [FakeSession(statuses=[500, 500]), FakeSession()]
+        calls = iter(made)
+
+        def factory():
+            try:
+                return next(calls)
+            except StopIteration:
+                gate.wait(2)
+                return FakeSession()
+
+        pool = SessionPool(factory, 2)
+        for _ in range(4):
+            pool.post("http://x")
+        assert pool.healthy_count == 1
+        for _ in range(4):
+            assert pool.post("http://x").status_code == 200
+        gate.set()
+        assert wait_for(lambda: pool.healthy_count == 2)
+
+    def test_session_without_cookie_is_refreshed_at_startup(self, monkeypatch):
+        monkeypatch.setattr(sessions.time, "sleep", lambda s: None)
+        made = iter([FakeSession(sid=""), FakeSession()])
+        pool = SessionPool(lambda: next(made), 1)
+        assert wait_for(lambda: pool.healthy_count == 1)
+
+
+    def test_expiry_sets_observed_ttl_and_renews_aging_sessions(self, monkeypatch):
+        monkeypatch.setattr(sessions, "_PROACTIVE_MIN_AGE", 0.0)
+        made = [FakeSession(statuses=[500, 500]), FakeSession()]
+        warm = iter(list(made))
+
+        def factory():
+            fresh = next(warm, None)
+            if fresh is None:
+                fresh = FakeSession()
+                made.append(fresh)
+            return fresh
+
+        pool = SessionPool(factory, 2)
+        pool.post("http://x")
+        pool.post("http://x")
+        pool.post("http://x")                   # second 500 on session 0
+        assert pool.observed_ttl is not None
+        assert wait_for(lambda: pool.refreshes >= 1)
+        # session 1 is as old as session 0 was when it expired: renewed too
+        pool.post("http://x")
+        assert wait_for(lambda: made[1].closed)
+
+class TestSessionPoolAgainstMockPortal:
+
+    def test_cached_cookie_skips_handshake(self, tmp_path):
+        path = str(tmp_path / "cache.json")
+        server, base_url = mock_server.start_in_thread()
+        try:
+            first = make_session("TestAgent/1.0", 5, base_url, SessionCache(path, 60))
+            again = make_session("TestAgent/1.0", 5, base_url, SessionCache(path, 60))
+            assert len(server.state.sessions) == 1
+            assert session_id(again) == session_id(first)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_rejected_cookie_falls_back_to_handshake(self, tmp_path):
+        path = str(tmp_path / "cache.json")
+        server, base_url = mock_server.start_in_thread()
+        try:
+            SessionCache(path, 60).store(base_url, "DEADBEEF")
+            s = make_session("TestAgent/1.0", 5, base_url, SessionCache(path, 60))
+            assert session_id(s) not in ("", "DEADBEEF")
+            assert len(server.state.sessions) == 1
+            assert SessionCache(path, 60).checkout(base_url) == session_id(s)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_recovers_from_cookie_expiry(self):
+        server, base_url = mock_server.start_in_thread(cookie_ttl=0.2)
+        try:
+            pool = SessionPool(lambda: make_session("TestAgent/1.0", 5, base_url), 2)
+            body = _build_envelope(_build_req_data(0, 5))
+            time.sleep(0.3)
+            codes = [pool.post(base_url + API_PATH, json=body, timeout=5).status_code
+                     for _ in range(4)]
+            assert codes == [500] * 4
+            assert wait_for(lambda: pool.healthy_count == 2)
+            assert pool.post(base_url + API_PATH, json=body, timeout=5).status_code == 200
+            pool.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
@@ -0,0 +1,74 @@
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mock_server
+import transport
+from fetcher import API_PATH, fetch_page, make_session
+from transport import PooledAdapter, new_http_session
+
+needs_httpx = pytest.mark.skipif(transport.httpx is None, reason="httpx not installed")
+
+
+@pytest.fixture
+def portal():
+    server, base_url = mock_server.start_in_thread(total=200, latency=0.01)
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def _closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestPooledTransport:
+
+    def test_pool_follows_size(self):
+        s = new_http_session("requests", pool_size=12)
+        adapter = s.get_adapter("https://tender.nprocure.com/")
+        assert isinstance(adapter, PooledAdapter)
+        assert adapter._pool_maxsize == 12
+        assert adapter._pool_block is True
+
+    def test_connections_bounded_by_pool(self, portal):
+        server, base_url = portal
+        s = make_session("test", 5, base_url, pool_size=3)
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            list(ex.map(lambda i: fetch_page(s, i * 10, 10, 5, 0, api_url=base_url + API_PATH), range(20)))
+        # one connection for the handshake GET plus at most three pooled ones
+        assert server.state.connections <= 4
+        assert server.state.served == 20
+
+
+@needs_httpx
+class TestHttp2Transport:
+
+    def test_crawls_mock_portal(self, portal):
+        server, base_url = portal
+        s = make_session("test", 5, base_url, transport="http2", pool_size=2)
+        data = fetch_page(s, 50, 10, 5, 0, api_url=base_url + API_PATH)
+        assert [r["1"] for r in data["data"]][0] == mock_server.synthetic_row(50)["1"]
+        assert data["iTotalRecords"] == 200
+        s.close()
+
+    def test_network_errors_become_requests_errors(self):
+        s = new_http_session("http2", pool_size=1)
+        with pytest.raises(requests.ConnectionError):
+            s.post(f"http://127.0.0.1:{_closed_port()}/", json={}, timeout=2)
+        s.close()
+
+    def test_client_errors_raise_requests_http_error(self, portal):
+        _, base_url = portal
+        s = new_http_session("http2", pool_size=1)
+        resp = s.get(base_url + "/nowhere", timeout=5)
+        assert resp.status_code == 404
+        with pytest.raises(requests.HTTPError):
+            resp.raise_for_status()
+        s.close()
@@ -0,0 +1,102 @@
+"""
+train_classifier.py
+-------------------
+Trains the --type-model tender_type classifier (classifier.HashedNgramModel,
+needs numpy) from stored scraper output.
+
+Records whose description contains one of the tender_types.json keywords
+are the training set, labelled with their stored tender_type. Records that
+only got the default type are left out (unless --include-default), since
+those are the ones the model is meant to improve on. A --holdout share is
+scored first, then the model is refit on every example and saved.
+
+Usage:
+    python train_classifier.py tenders.ndjson --output tender_type_model.npz
+    python train_classifier.py tenders.json --epochs 300 --threshold 0.8
+    python scrape.py --type-model tender_type_model.npz --output tenders.ndjson
+"""
+
+import argparse
+import random
+import sys
+from collections import Counter
+
+import logger as _logger_mod
+
+_logger_mod.setup_logger("train")
+log = _logger_mod.get_logger("train_classifier")
+
+import classifier
+from cleaner import _TYPE_CLASSIFIER
+from persistence import load_records
+
+
+def training_set(records: list[dict], include_default: bool) -> tuple[list[str], list[str]]:
+    texts, labels = [], []
+    for r in records:
+        text = r.get("description") or ""
+        if r.get("tender_type") and (include_default or _TYPE_CLASSIFIER.matches(text)):
+            texts.append(text)
+            labels.append(r["tender_type"])
+    return texts, labels
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("records", help="Scraper output (.json or .ndjson).")
+    ap.add_argument("--output", default="tender_type_model.npz", metavar="PATH")
+    ap.add_argument("--epochs", type=int, default=200)
+    ap.add_argument("--features", type=int, default=18, metavar="BITS",
+                    help="Hash 2**BITS feature buckets.")
+    ap.add_argument("--threshold", type=float, default=0.7,
+                    help="Minimum probability for a prediction to replace the rule-based type.")
+    ap.add_argument("--holdout", type=float, default=0.2)
+    ap.add_argument("--include-default", action="store_true",
+                    help="Also train on records no keyword matched.")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if classifier.np is None:
+        log.error("Training needs numpy: pip install numpy")
+        return 2
+
+    records = load_records(args.records)
+    texts, labels = training_set(records, args.include_default)
+    if len(set(labels)) < 2:
+        log.error("Need examples of at least two tender types, got %s", dict(Counter(labels)))
+        return 2
+    log.info("%d of %d records used for training: %s", len(texts), len(records), dict(Counter(labels)))
+
+    fit = dict(n_features=2 ** args.features, epochs=args.epochs, threshold=args.threshold)
+    order = list(range(len(texts)))
+    random.Random(args.seed).shuffle(order)
+    cut = int(len(order) * args.holdout)
+    if cut:
+        test, train = order[:cut], order[cut:]
+        model = classifier.train_model([texts[i] for i in train], [labels[i] for i in train], **fit)
+        predicted = model.predict([texts[i] for i in test])
+        sure    = [(p, labels[i]) for p, i in zip(predicted, test) if p is not None]
+        correct = sum(p == want for p, want in sure)
+        log.info(
+            "Holdout: %d records, %d confident, %.1f%% of those correct",
+            len(test), len(sure), 100 * correct / len(sure) if sure else 0.0,
+        )
+
+    model = classifier.train_model(texts, labels, **fit)
+    model.save(args.output)
+
+    unmatched = [r.get("description") or "" for r in records
+                 if not _TYPE_CLASSIFIER.matches(r.get("description") or "")]
+    changed = Counter(
+        p for p in model.predict(unmatched) if p is not None and p != _TYPE_CLASSIFIER.default
+    )
+    log.info(
+        "Of %d records no keyword matched (typed %s by default), the model retypes: %s",
+        len(unmatched), _TYPE_CLASSIFIER.default, dict(changed),
+    )
+    log.info("Model written to %s", args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
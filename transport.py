@@ -0,0 +1,140 @@
+import ssl
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ChunkedEncodingError
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import httpx
+except ImportError:          # optional: only needed for --transport http2
+    httpx = None
+
+TRANSPORTS = ("requests", "http2")
+
+
+def _insecure_context() -> ssl.SSLContext:
+    # Sessions run with verify=False (see fetcher._new_session). One context
+    # per session saves building (and loading CA certs into) a new one for
+    # every connection. It does not resume TLS sessions: a reconnect is a
+    # full handshake, and handshakes are avoided only by the keep-alive pool.
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode    = ssl.CERT_NONE
+    return ctx
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pool holds `pool_size` keep-alive
+    connections per host and blocks (rather than opening throwaway
+    connections) when all of them are busy.
+    """
+
+    def __init__(self, pool_size: int):
+        self._ssl_context = _insecure_context()
+        super().__init__(
+            pool_connections = 1,
+            pool_maxsize     = max(1, pool_size),
+            pool_block       = True,
+            max_retries      = 0,
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = self._ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+
+class Http2Response:
+    """The slice of requests.Response that the fetcher uses, over httpx."""
+
+    def __init__(self, resp: "httpx.Response"):
+        self._resp       = resp
+        self.status_code = resp.status_code
+        self.headers     = resp.headers
+        self.http_version = resp.http_version
+
+    @property
+    def content(self) -> bytes:
+        return self._resp.read()
+
+    def json(self):
+        self._resp.read()
+        return self._resp.json()
+
+    def iter_content(self, chunk_size: int = 65536):
+        try:
+            yield from self._resp.iter_bytes(chunk_size)
+        except httpx.TransportError as exc:
+            raise ChunkedEncodingError(str(exc)) from exc
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+    def close(self) -> None:
+        self._resp.close()
+
+
+class Http2Session:
+    """
+    requests.Session look-alike over an httpx.Client with HTTP/2 enabled,
+    so concurrent workers multiplex one connection instead of each holding
+    their own. HTTP/2 is negotiated via ALPN, so plain-http URLs (the mock
+    portal) still run over HTTP/1.1. httpx errors are re-raised as the
+    requests exceptions fetch_page already handles.
+    """
+
+    def __init__(self, pool_size: int):
+        if httpx is None:
+            raise RuntimeError("--transport http2 needs httpx: pip install 'httpx[http2]'")
+        self.verify  = False
+        self._client = httpx.Client(
+            http2            = True,
+            verify           = _insecure_context(),
+            follow_redirects = True,
+            limits           = httpx.Limits(
+                max_connections           = max(1, pool_size),
+                max_keepalive_connections = max(1, pool_size),
+            ),
+        )
+
+    @property
+    def headers(self):
+        return self._client.headers
+
+    @property
+    def cookies(self):
+        return self._client.cookies
+
+    def request(self, method: str, url: str, timeout=None, stream: bool = False, **kwargs) -> Http2Response:
+        try:
+            req = self._client.build_request(method, url, timeout=timeout, **kwargs)
+            return Http2Response(self._client.send(req, stream=stream))
+        except httpx.TimeoutException as exc:
+            raise requests.Timeout(str(exc)) from exc
+        except httpx.TransportError as exc:
+            raise requests.ConnectionError(str(exc)) from exc
+
+    def get(self, url: str, **kwargs) -> Http2Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> Http2Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def new_http_session(transport: str = "requests", pool_size: int = 10):
+    """A bare HTTP session for `transport`, sized for `pool_size` concurrent requests."""
+    if transport == "http2":
+        return Http2Session(pool_size)
+    s = requests.Session()
+    adapter = PooledAdapter(pool_size)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s